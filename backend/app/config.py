@@ -13,6 +13,33 @@ class Settings(BaseSettings):
     # Security: require a short-lived export token (separate from session token).
     # Improvement: stolen session tokens alone cannot export vault data.
     export_token_ttl_seconds: int = 60
+    # Performance: long-lived read-only connections for search and export.
+    # Improvement: avoids reconnecting and reloading the schema per request.
+    read_pool_size: int = 4
+    read_mmap_bytes: int = 256 * 1024 * 1024
+    read_cache_kib: int = 16 * 1024
+    # Performance: bm25 column weights for ranking search hits.
+    # Improvement: a title match outranks a passing mention in notes.
+    jobs_fts_weights: list[float] = [10.0, 5.0, 2.0, 1.0]  # title, organisation, location, notes
+    captures_fts_weights: list[float] = [5.0, 1.0]  # page_title, text_snapshot
+    # Performance: cache recent search pages until the FTS data changes.
+    search_cache_size: int = 256
+    # Performance: slow work runs on a durable background task queue.
+    # Improvement: handlers return immediately; queued work survives restarts.
+    task_io_workers: int = 4
+    task_cpu_workers: int = 2
+    task_max_attempts: int = 3
+    task_retry_backoff_seconds: float = 2.0
+    task_retention_days: float = 7.0  # succeeded tasks are deleted after this long
+    # Security/Performance: document text extraction runs in capped worker processes.
+    # Improvement: a slow or hostile PDF cannot hang a request or exhaust memory.
+    extract_workers: int = 2
+    extract_timeout_seconds: float = 30.0
+    extract_memory_limit_mb: int = 1024
+    extract_pages_per_task: int = 20
+    # Performance: near-duplicate captures (MinHash) are not ingested twice.
+    # Improvement: mirrors and tracking-parameter URLs resolve to the existing job.
+    capture_duplicate_threshold: float = 0.8
     api_prefix: str = "/api/v1"
     host: str = "127.0.0.1"
     port: int = 8000
@@ -1,20 +1,35 @@
+import logging
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from urllib.parse import quote
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.config import settings
+from app.utils.compression import compress_text, decompress_text
+
+logger = logging.getLogger("app")
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def register_sql_functions(conn):
+    """Functions the schema's views and triggers call: needed on any connection writing captures."""
+    conn.create_function("snapshot_text", 2, decompress_text, deterministic=True)
+
+
 def _set_sqlite_pragmas(dbapi_conn, connection_record):
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
+    register_sql_functions(dbapi_conn)
 
 
 def get_engine(db_path: Path | None = None):
@@ -39,6 +54,120 @@ def get_db():
         db.close()
 
 
+def get_async_engine(db_path: Path | None = None):
+    path = db_path or settings.db_path
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+async_engine = get_async_engine()
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """Async session dependency; queries run on aiosqlite's thread, not the event loop."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class ReadOnlyPool:
+    """Thread-safe pool of long-lived, read-tuned SQLite connections.
+
+    Connections are opened read-only in autocommit mode, so each statement
+    sees the latest committed WAL state, and each keeps its own prepared
+    statement cache across requests.
+    """
+
+    def __init__(self, db_path: Path, size: int):
+        self.db_path = db_path
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{quote(str(self.db_path))}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size={int(settings.read_mmap_bytes)}")
+        conn.execute(f"PRAGMA cache_size=-{int(settings.read_cache_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA query_only=ON")
+        register_sql_functions(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_read_pool: ReadOnlyPool | None = None
+_read_pool_lock = threading.Lock()
+
+
+def read_connection():
+    """Borrow a pooled read-only connection to the current vault database."""
+    global _read_pool
+    path = settings.db_path
+    with _read_pool_lock:
+        if _read_pool is None or _read_pool.db_path != path:
+            if _read_pool is not None:
+                _read_pool.close()
+            _read_pool = ReadOnlyPool(path, settings.read_pool_size)
+        pool = _read_pool
+    return pool.connection()
+
+
+def close_read_pool():
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is not None:
+            _read_pool.close()
+            _read_pool = None
+
+
+# Captures are indexed through a view that decompresses capture_texts, so
+# snippets work while the text itself is only stored compressed.
+CAPTURES_FTS_SQL = """\
+CREATE VIEW IF NOT EXISTS captures_fts_content AS
+SELECT c.rowid AS capture_rowid, c.page_title, snapshot_text(t.codec, t.body) AS text_snapshot
+FROM captures c LEFT JOIN capture_texts t ON t.capture_id = c.id;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS captures_fts USING fts5(
+    page_title, text_snapshot,
+    content='captures_fts_content', content_rowid='capture_rowid'
+);
+"""
+
 SCHEMA_SQL = """\
 -- ============================================================
 -- VAULT CONFIGURATION
@@ -66,6 +195,7 @@ CREATE TABLE IF NOT EXISTS jobs (
     title         TEXT NOT NULL,
     organisation  TEXT,
     url           TEXT,
+    canonical_url TEXT,
     location      TEXT,
     salary_range  TEXT,
     deadline_type TEXT CHECK(deadline_type IN ('fixed','rolling','unknown')) DEFAULT 'unknown',
@@ -81,6 +211,9 @@ CREATE TABLE IF NOT EXISTS jobs (
 CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
 CREATE INDEX IF NOT EXISTS idx_jobs_deadline ON jobs(deadline_date);
 CREATE INDEX IF NOT EXISTS idx_jobs_organisation ON jobs(organisation);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs(status, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_canonical_url ON jobs(canonical_url);
 
 -- ============================================================
 -- CAPTURES
@@ -89,10 +222,13 @@ CREATE TABLE IF NOT EXISTS captures (
     id             TEXT PRIMARY KEY,
     job_id         TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
     url            TEXT,
+    canonical_url  TEXT,
     page_title     TEXT,
-    text_snapshot  TEXT,
     html_path      TEXT,
     pdf_path       TEXT,
+    pdf_status     TEXT CHECK(pdf_status IN ('pending','ready','failed')),
+    terms_version  INTEGER,
+    fingerprint    BLOB,
     capture_method TEXT NOT NULL
                    CHECK(capture_method IN ('structured','generic_html','dom_render',
                                             'text_selection','pdf_snapshot','manual_paste')),
@@ -100,6 +236,57 @@ CREATE TABLE IF NOT EXISTS captures (
 );
 
 CREATE INDEX IF NOT EXISTS idx_captures_job ON captures(job_id);
+CREATE INDEX IF NOT EXISTS idx_captures_terms_version ON captures(terms_version);
+CREATE INDEX IF NOT EXISTS idx_captures_unfingerprinted ON captures(id) WHERE fingerprint IS NULL;
+CREATE INDEX IF NOT EXISTS idx_captures_canonical_url ON captures(canonical_url);
+
+-- Captured page text, kept out of the captures rows so scans and listings
+-- never read it. codec 1 is zlib; short texts are stored as plain UTF-8 (0).
+CREATE TABLE IF NOT EXISTS capture_texts (
+    capture_id TEXT PRIMARY KEY REFERENCES captures(id) ON DELETE CASCADE,
+    codec      INTEGER NOT NULL,
+    body       BLOB NOT NULL
+);
+
+-- LSH buckets of each capture's MinHash fingerprint, for near-duplicate lookup.
+CREATE TABLE IF NOT EXISTS capture_bands (
+    band       INTEGER NOT NULL,
+    bucket     INTEGER NOT NULL,
+    capture_id TEXT NOT NULL REFERENCES captures(id) ON DELETE CASCADE,
+    PRIMARY KEY (band, bucket, capture_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_capture_bands_capture ON capture_bands(capture_id);
+
+-- Keyword terms per job (the union over its captures), kept in step with
+-- capture inserts so a CV can be ranked against every job in one pass.
+CREATE TABLE IF NOT EXISTS job_terms (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    term   TEXT NOT NULL,
+    PRIMARY KEY (job_id, term)
+) WITHOUT ROWID;
+
+-- Corpus statistics for weighted matching, maintained by triggers on
+-- job_terms: df = number of jobs whose captures contain the term.
+CREATE TABLE IF NOT EXISTS term_stats (
+    term TEXT PRIMARY KEY,
+    df   INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS term_corpus (
+    id      INTEGER PRIMARY KEY CHECK(id = 1),
+    jobs    INTEGER NOT NULL,
+    changes INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO term_corpus (id, jobs) VALUES (1, 0);
+
+-- Last change (term_corpus.changes at the time) per job whose terms changed,
+-- so the in-memory term index can patch just those jobs. No foreign key:
+-- deleted jobs must stay listed until the index has dropped them.
+CREATE TABLE IF NOT EXISTS job_term_changes (
+    job_id TEXT PRIMARY KEY,
+    seq    INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_job_term_changes_seq ON job_term_changes(seq);
 
 -- ============================================================
 -- EVENTS
@@ -141,7 +328,25 @@ CREATE TABLE IF NOT EXISTS documents (
 
 CREATE INDEX IF NOT EXISTS idx_documents_job ON documents(job_id);
 CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(file_hash);
-CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_path ON documents(stored_path);
+CREATE INDEX IF NOT EXISTS idx_documents_stored_path ON documents(stored_path);
+
+-- Content-addressed file store: one file per unique SHA-256 under
+-- blobs/<hash[:2]>/<hash>, shared by every document row that points at it.
+CREATE TABLE IF NOT EXISTS blobs (
+    hash       TEXT PRIMARY KEY,
+    size_bytes INTEGER NOT NULL,
+    refcount   INTEGER NOT NULL DEFAULT 0
+);
+
+-- Extracted text and keyword tokens per unique document content, so
+-- matching never re-parses an immutable file.
+CREATE TABLE IF NOT EXISTS document_texts (
+    file_hash    TEXT PRIMARY KEY,
+    version      INTEGER NOT NULL,
+    text         TEXT NOT NULL,
+    tokens       TEXT NOT NULL,
+    extracted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+);
 
 -- ============================================================
 -- TAGS
@@ -158,6 +363,28 @@ CREATE TABLE IF NOT EXISTS job_tags (
     PRIMARY KEY (job_id, tag_id)
 );
 
+-- ============================================================
+-- BACKGROUND TASKS
+-- ============================================================
+CREATE TABLE IF NOT EXISTS tasks (
+    id           TEXT PRIMARY KEY,
+    kind         TEXT NOT NULL,
+    payload      TEXT NOT NULL DEFAULT '{}',
+    status       TEXT NOT NULL DEFAULT 'queued'
+                 CHECK(status IN ('queued','running','succeeded','failed')),
+    priority     INTEGER NOT NULL DEFAULT 0,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after    REAL NOT NULL DEFAULT 0,
+    result       TEXT,
+    error        TEXT,
+    created_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+    updated_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+    finished_at  TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_queue ON tasks(status, priority DESC, created_at);
+
 -- ============================================================
 -- FTS5
 -- ============================================================
@@ -166,10 +393,14 @@ CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
     content='jobs', content_rowid='rowid'
 );
 
-CREATE VIRTUAL TABLE IF NOT EXISTS captures_fts USING fts5(
-    page_title, text_snapshot,
-    content='captures', content_rowid='rowid'
+""" + CAPTURES_FTS_SQL + """
+
+-- Bumped by triggers whenever searchable text changes; keys the search cache.
+CREATE TABLE IF NOT EXISTS search_generation (
+    id    INTEGER PRIMARY KEY CHECK(id = 1),
+    value INTEGER NOT NULL
 );
+INSERT OR IGNORE INTO search_generation (id, value) VALUES (1, 0);
 """
 
 FTS_TRIGGERS_SQL = """\
@@ -191,22 +422,114 @@ CREATE TRIGGER IF NOT EXISTS jobs_au AFTER UPDATE ON jobs BEGIN
     VALUES (new.rowid, new.title, new.organisation, new.location, new.notes);
 END;
 
--- Captures FTS sync triggers
+-- Captures FTS sync triggers. A capture is indexed by title when inserted
+-- and again with its text once that is stored in capture_texts.
 CREATE TRIGGER IF NOT EXISTS captures_ai AFTER INSERT ON captures BEGIN
     INSERT INTO captures_fts(rowid, page_title, text_snapshot)
-    VALUES (new.rowid, new.page_title, new.text_snapshot);
+    VALUES (new.rowid, new.page_title, NULL);
+END;
+
+-- BEFORE: ON DELETE CASCADE removes the capture's text before AFTER triggers
+-- run, and the FTS row must be deleted with the values it was indexed with.
+CREATE TRIGGER IF NOT EXISTS captures_bd BEFORE DELETE ON captures BEGIN
+    INSERT INTO captures_fts(captures_fts, rowid, page_title, text_snapshot)
+    VALUES ('delete', old.rowid, old.page_title,
+            (SELECT snapshot_text(codec, body) FROM capture_texts WHERE capture_id = old.id));
 END;
 
-CREATE TRIGGER IF NOT EXISTS captures_ad AFTER DELETE ON captures BEGIN
+CREATE TRIGGER IF NOT EXISTS captures_au AFTER UPDATE OF page_title ON captures BEGIN
     INSERT INTO captures_fts(captures_fts, rowid, page_title, text_snapshot)
-    VALUES ('delete', old.rowid, old.page_title, old.text_snapshot);
+    VALUES ('delete', old.rowid, old.page_title,
+            (SELECT snapshot_text(codec, body) FROM capture_texts WHERE capture_id = old.id));
+    INSERT INTO captures_fts(rowid, page_title, text_snapshot)
+    VALUES (new.rowid, new.page_title,
+            (SELECT snapshot_text(codec, body) FROM capture_texts WHERE capture_id = new.id));
 END;
 
-CREATE TRIGGER IF NOT EXISTS captures_au AFTER UPDATE ON captures BEGIN
+CREATE TRIGGER IF NOT EXISTS capture_texts_ai AFTER INSERT ON capture_texts BEGIN
     INSERT INTO captures_fts(captures_fts, rowid, page_title, text_snapshot)
-    VALUES ('delete', old.rowid, old.page_title, old.text_snapshot);
+    SELECT 'delete', rowid, page_title, NULL FROM captures WHERE id = new.capture_id;
     INSERT INTO captures_fts(rowid, page_title, text_snapshot)
-    VALUES (new.rowid, new.page_title, new.text_snapshot);
+    SELECT rowid, page_title, snapshot_text(new.codec, new.body) FROM captures WHERE id = new.capture_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS capture_texts_ad AFTER DELETE ON capture_texts BEGIN
+    INSERT INTO captures_fts(captures_fts, rowid, page_title, text_snapshot)
+    SELECT 'delete', rowid, page_title, snapshot_text(old.codec, old.body) FROM captures WHERE id = old.capture_id;
+    INSERT INTO captures_fts(rowid, page_title, text_snapshot)
+    SELECT rowid, page_title, NULL FROM captures WHERE id = old.capture_id;
+END;
+
+-- Search cache generation triggers
+CREATE TRIGGER IF NOT EXISTS search_gen_jobs_ai AFTER INSERT ON jobs BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_jobs_ad AFTER DELETE ON jobs BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_jobs_au AFTER UPDATE OF title, organisation, location, notes ON jobs BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_captures_ai AFTER INSERT ON captures BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_captures_ad AFTER DELETE ON captures BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_captures_au AFTER UPDATE OF job_id, page_title ON captures BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_capture_texts_ai AFTER INSERT ON capture_texts BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_gen_capture_texts_ad AFTER DELETE ON capture_texts BEGIN
+    UPDATE search_generation SET value = value + 1 WHERE id = 1;
+END;
+
+-- Match corpus statistics (also fire for ON DELETE CASCADE from jobs)
+CREATE TRIGGER IF NOT EXISTS term_stats_ai AFTER INSERT ON job_terms BEGIN
+    INSERT INTO term_stats (term, df) VALUES (new.term, 1)
+    ON CONFLICT(term) DO UPDATE SET df = df + 1;
+    UPDATE term_corpus SET jobs = jobs + 1 WHERE id = 1
+    AND NOT EXISTS (SELECT 1 FROM job_terms WHERE job_id = new.job_id AND term != new.term);
+END;
+
+CREATE TRIGGER IF NOT EXISTS term_stats_ad AFTER DELETE ON job_terms BEGIN
+    UPDATE term_stats SET df = df - 1 WHERE term = old.term;
+    DELETE FROM term_stats WHERE term = old.term AND df <= 0;
+    UPDATE term_corpus SET jobs = jobs - 1 WHERE id = 1
+    AND NOT EXISTS (SELECT 1 FROM job_terms WHERE job_id = old.job_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS job_term_changes_ai AFTER INSERT ON job_terms BEGIN
+    UPDATE term_corpus SET changes = changes + 1 WHERE id = 1;
+    INSERT INTO job_term_changes (job_id, seq) VALUES (new.job_id, (SELECT changes FROM term_corpus WHERE id = 1))
+    ON CONFLICT(job_id) DO UPDATE SET seq = excluded.seq;
+END;
+
+CREATE TRIGGER IF NOT EXISTS job_term_changes_ad AFTER DELETE ON job_terms BEGIN
+    UPDATE term_corpus SET changes = changes + 1 WHERE id = 1;
+    INSERT INTO job_term_changes (job_id, seq) VALUES (old.job_id, (SELECT changes FROM term_corpus WHERE id = 1))
+    ON CONFLICT(job_id) DO UPDATE SET seq = excluded.seq;
+END;
+
+-- Blob reference counting (also fires for ON DELETE CASCADE from jobs)
+CREATE TRIGGER IF NOT EXISTS blobs_documents_ai AFTER INSERT ON documents
+WHEN new.stored_path LIKE 'blobs/%' BEGIN
+    INSERT INTO blobs (hash, size_bytes, refcount) VALUES (new.file_hash, new.file_size_bytes, 1)
+    ON CONFLICT(hash) DO UPDATE SET refcount = refcount + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blobs_documents_ad AFTER DELETE ON documents
+WHEN old.stored_path LIKE 'blobs/%' BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE hash = old.file_hash;
 END;
 """
 
@@ -216,19 +539,182 @@ MIGRATIONS = [
     "ALTER TABLE documents ADD COLUMN submitted_at TEXT",
     # v0.3: auth throttle table
     "CREATE TABLE IF NOT EXISTS auth_throttle (key TEXT PRIMARY KEY, failed_attempts INTEGER NOT NULL, last_failed_at REAL NOT NULL)",
+    # v0.4: keyset pagination indexes for job listing
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs(status, updated_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at, id)",
+    # v0.5: search cache generation counter
+    "CREATE TABLE IF NOT EXISTS search_generation (id INTEGER PRIMARY KEY CHECK(id = 1), value INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO search_generation (id, value) VALUES (1, 0)",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_jobs_ai AFTER INSERT ON jobs BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_jobs_ad AFTER DELETE ON jobs BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_jobs_au AFTER UPDATE OF title, organisation, location, notes ON jobs BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_captures_ai AFTER INSERT ON captures BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_captures_ad AFTER DELETE ON captures BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_captures_au AFTER UPDATE OF job_id, page_title ON captures BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    # v0.6: background capture PDF rendering
+    "ALTER TABLE captures ADD COLUMN pdf_status TEXT CHECK(pdf_status IN ('pending','ready','failed'))",
+    # v0.7: durable background task queue
+    "CREATE TABLE IF NOT EXISTS tasks (id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL DEFAULT '{}', "
+    "status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued','running','succeeded','failed')), "
+    "priority INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL DEFAULT 3, "
+    "run_after REAL NOT NULL DEFAULT 0, result TEXT, error TEXT, "
+    "created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')), "
+    "updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')), finished_at TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_queue ON tasks(status, priority DESC, created_at)",
+    # v0.8: content-addressed blob store (documents may share a stored_path)
+    "DROP INDEX IF EXISTS idx_documents_path",
+    "CREATE INDEX IF NOT EXISTS idx_documents_stored_path ON documents(stored_path)",
+    "CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size_bytes INTEGER NOT NULL, refcount INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TRIGGER IF NOT EXISTS blobs_documents_ai AFTER INSERT ON documents WHEN new.stored_path LIKE 'blobs/%' BEGIN "
+    "INSERT INTO blobs (hash, size_bytes, refcount) VALUES (new.file_hash, new.file_size_bytes, 1) "
+    "ON CONFLICT(hash) DO UPDATE SET refcount = refcount + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS blobs_documents_ad AFTER DELETE ON documents WHEN old.stored_path LIKE 'blobs/%' BEGIN "
+    "UPDATE blobs SET refcount = refcount - 1 WHERE hash = old.file_hash; END",
+    # v0.9: extracted document text cache
+    "CREATE TABLE IF NOT EXISTS document_texts (file_hash TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+    "text TEXT NOT NULL, tokens TEXT NOT NULL, "
+    "extracted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))",
+    # v0.10: per-job keyword terms for batched matching (backfilled lazily)
+    "ALTER TABLE captures ADD COLUMN terms_version INTEGER",
+    "CREATE INDEX IF NOT EXISTS idx_captures_terms_version ON captures(terms_version)",
+    "CREATE TABLE IF NOT EXISTS job_terms (job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE, "
+    "term TEXT NOT NULL, PRIMARY KEY (job_id, term)) WITHOUT ROWID",
+    # v0.11: corpus statistics for weighted matching
+    "CREATE TABLE IF NOT EXISTS term_stats (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID",
+    "INSERT OR IGNORE INTO term_stats (term, df) SELECT term, COUNT(*) FROM job_terms GROUP BY term",
+    "CREATE TABLE IF NOT EXISTS term_corpus (id INTEGER PRIMARY KEY CHECK(id = 1), jobs INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO term_corpus (id, jobs) SELECT 1, COUNT(DISTINCT job_id) FROM job_terms",
+    "CREATE TRIGGER IF NOT EXISTS term_stats_ai AFTER INSERT ON job_terms BEGIN "
+    "INSERT INTO term_stats (term, df) VALUES (new.term, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1; "
+    "UPDATE term_corpus SET jobs = jobs + 1 WHERE id = 1 "
+    "AND NOT EXISTS (SELECT 1 FROM job_terms WHERE job_id = new.job_id AND term != new.term); END",
+    "CREATE TRIGGER IF NOT EXISTS term_stats_ad AFTER DELETE ON job_terms BEGIN "
+    "UPDATE term_stats SET df = df - 1 WHERE term = old.term; "
+    "DELETE FROM term_stats WHERE term = old.term AND df <= 0; "
+    "UPDATE term_corpus SET jobs = jobs - 1 WHERE id = 1 "
+    "AND NOT EXISTS (SELECT 1 FROM job_terms WHERE job_id = old.job_id); END",
+    # v0.12: job term change log for incremental index updates
+    "ALTER TABLE term_corpus ADD COLUMN changes INTEGER NOT NULL DEFAULT 0",
+    "CREATE TABLE IF NOT EXISTS job_term_changes (job_id TEXT PRIMARY KEY, seq INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_job_term_changes_seq ON job_term_changes(seq)",
+    "CREATE TRIGGER IF NOT EXISTS job_term_changes_ai AFTER INSERT ON job_terms BEGIN "
+    "UPDATE term_corpus SET changes = changes + 1 WHERE id = 1; "
+    "INSERT INTO job_term_changes (job_id, seq) VALUES (new.job_id, (SELECT changes FROM term_corpus WHERE id = 1)) "
+    "ON CONFLICT(job_id) DO UPDATE SET seq = excluded.seq; END",
+    "CREATE TRIGGER IF NOT EXISTS job_term_changes_ad AFTER DELETE ON job_terms BEGIN "
+    "UPDATE term_corpus SET changes = changes + 1 WHERE id = 1; "
+    "INSERT INTO job_term_changes (job_id, seq) VALUES (old.job_id, (SELECT changes FROM term_corpus WHERE id = 1)) "
+    "ON CONFLICT(job_id) DO UPDATE SET seq = excluded.seq; END",
+    # v0.13: near-duplicate capture fingerprints (backfilled by a background task)
+    "ALTER TABLE captures ADD COLUMN fingerprint BLOB",
+    "CREATE INDEX IF NOT EXISTS idx_captures_unfingerprinted ON captures(id) WHERE fingerprint IS NULL",
+    "CREATE TABLE IF NOT EXISTS capture_bands (band INTEGER NOT NULL, bucket INTEGER NOT NULL, "
+    "capture_id TEXT NOT NULL REFERENCES captures(id) ON DELETE CASCADE, "
+    "PRIMARY KEY (band, bucket, capture_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_capture_bands_capture ON capture_bands(capture_id)",
+    # v0.14: canonical URLs for duplicate checks (filled by _backfill_canonical_urls)
+    "ALTER TABLE jobs ADD COLUMN canonical_url TEXT",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_canonical_url ON jobs(canonical_url)",
+    "ALTER TABLE captures ADD COLUMN canonical_url TEXT",
+    "CREATE INDEX IF NOT EXISTS idx_captures_canonical_url ON captures(canonical_url)",
+    # v0.15: compressed snapshots (texts moved by _move_capture_texts, HTML files by a background task)
+    "CREATE TABLE IF NOT EXISTS capture_texts (capture_id TEXT PRIMARY KEY REFERENCES captures(id) ON DELETE CASCADE, "
+    "codec INTEGER NOT NULL, body BLOB NOT NULL)",
+    "INSERT INTO tasks (id, kind) SELECT lower(hex(randomblob(16))), 'compress_html_snapshots' "
+    "WHERE EXISTS (SELECT 1 FROM captures WHERE html_path LIKE '%.html') "
+    "AND NOT EXISTS (SELECT 1 FROM tasks WHERE kind = 'compress_html_snapshots' AND status IN ('queued', 'running'))",
+    # v0.16: search cache also follows capture text changes
+    "CREATE TRIGGER IF NOT EXISTS search_gen_capture_texts_ai AFTER INSERT ON capture_texts BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
+    "CREATE TRIGGER IF NOT EXISTS search_gen_capture_texts_ad AFTER DELETE ON capture_texts BEGIN UPDATE search_generation SET value = value + 1 WHERE id = 1; END",
 ]
 
+_CAPTURE_TEXT_TRIGGERS = (
+    "captures_ai", "captures_ad", "captures_bd", "captures_au", "capture_texts_ai", "capture_texts_ad", "search_gen_captures_au",
+)
 
-def init_db(db_path: Path | None = None):
-    path = db_path or settings.db_path
-    conn = sqlite3.connect(str(path))
-    conn.executescript(SCHEMA_SQL)
-    conn.executescript(FTS_TRIGGERS_SQL)
-    # Run migrations idempotently (ALTER TABLE fails silently if column exists)
+
+def _move_capture_texts(conn: sqlite3.Connection):
+    """Move text snapshots out of captures into compressed capture_texts rows (a no-op once done).
+
+    captures_fts is re-created over the decompressing view, and the file is
+    VACUUMed afterwards so the vault actually shrinks.
+    """
+    fts = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'captures_fts'").fetchone()
+    if fts is not None and "captures_fts_content" in fts[0]:
+        return
+    conn.executescript(
+        "".join(f"DROP TRIGGER IF EXISTS {name};" for name in _CAPTURE_TEXT_TRIGGERS)
+        + "DROP TABLE IF EXISTS captures_fts;"
+    )
+    if "text_snapshot" in {row[1] for row in conn.execute("PRAGMA table_info(captures)")}:
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute("SELECT id, text_snapshot FROM captures WHERE text_snapshot IS NOT NULL")
+            while batch := rows.fetchmany(500):
+                conn.executemany(
+                    "INSERT INTO capture_texts (capture_id, codec, body) VALUES (?, ?, ?)",
+                    [(capture_id, *compress_text(text)) for capture_id, text in batch],
+                )
+            rows.close()
+            conn.execute("ALTER TABLE captures DROP COLUMN text_snapshot")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    conn.executescript(
+        CAPTURES_FTS_SQL + FTS_TRIGGERS_SQL + "INSERT INTO captures_fts(captures_fts) VALUES ('rebuild');"
+    )
+    try:
+        conn.execute("VACUUM")
+    except sqlite3.OperationalError as exc:
+        logger.warning("Could not VACUUM the vault after compressing capture texts: %s", exc)
+
+
+def _backfill_canonical_urls(conn: sqlite3.Connection):
+    """Fill canonical_url for rows stored before it existed (once; recorded in vault_config).
+
+    When several older jobs share a canonical URL only the earliest keeps it,
+    since the column is unique; the others are still found via their captures.
+    """
+    from app.utils.urls import canonical_url
+
+    if conn.execute("SELECT 1 FROM vault_config WHERE key = 'canonical_urls_backfilled'").fetchone():
+        return
+    with conn:
+        for job_id, url in conn.execute(
+            "SELECT id, url FROM jobs WHERE canonical_url IS NULL AND url IS NOT NULL ORDER BY created_at, id"
+        ).fetchall():
+            conn.execute(
+                "UPDATE OR IGNORE jobs SET canonical_url = ? WHERE id = ?", (canonical_url(url), job_id),
+            )
+        conn.executemany(
+            "UPDATE captures SET canonical_url = ? WHERE id = ?",
+            [
+                (canonical_url(url), capture_id) for capture_id, url in conn.execute(
+                    "SELECT id, url FROM captures WHERE canonical_url IS NULL AND url IS NOT NULL"
+                ).fetchall()
+            ],
+        )
+        conn.execute("INSERT INTO vault_config (key, value) VALUES ('canonical_urls_backfilled', '1')")
+
+
+def run_migrations(conn: sqlite3.Connection):
+    """Bring an existing database up to date (ALTER TABLE fails silently if column exists)."""
+    register_sql_functions(conn)
     for migration in MIGRATIONS:
         try:
             conn.execute(migration)
             conn.commit()
         except sqlite3.OperationalError:
-            pass  # column already exists
+            pass  # already applied
+    _move_capture_texts(conn)
+    _backfill_canonical_urls(conn)
+
+
+def init_db(db_path: Path | None = None):
+    path = db_path or settings.db_path
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA_SQL)
+    conn.executescript(FTS_TRIGGERS_SQL)
+    run_migrations(conn)
     conn.close()
@@ -5,7 +5,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.routers import vault, jobs, captures, events, documents, tags, search, calendar, backup, analytics
+from app.routers import vault, jobs, captures, events, documents, tags, search, calendar, backup, analytics, tasks, imports
 
 logger = logging.getLogger("app")
 
@@ -15,14 +15,9 @@ async def lifespan(app: FastAPI):
     # Startup: migrate and integrity-check existing vault database
     if settings.db_path.exists():
         try:
-            from app.database import MIGRATIONS
+            from app.database import run_migrations
             conn = sqlite3.connect(str(settings.db_path))
-            for migration in MIGRATIONS:
-                try:
-                    conn.execute(migration)
-                    conn.commit()
-                except sqlite3.OperationalError:
-                    pass  # already applied
+            run_migrations(conn)
             result = conn.execute("PRAGMA integrity_check").fetchone()
             conn.close()
             if result and result[0] == "ok":
@@ -31,10 +26,23 @@ async def lifespan(app: FastAPI):
                 logger.error("DATABASE INTEGRITY CHECK FAILED: %s — vault may be corrupt.", result)
         except Exception as exc:
             logger.error("Could not run startup migration/integrity check: %s", exc)
+        # Resume tasks queued (or interrupted) before the last shutdown
+        from app.services.task_service import task_queue
+        task_queue.start()
+        # Build the match index now, not on the first /similar or /match-all call
+        from app.services.match_service import refresh_job_term_index
+        refresh_job_term_index()
     yield
     # Shutdown: lock the vault
+    from app.database import async_engine, close_read_pool
+    from app.services.extraction_service import shutdown_extraction_pools
+    from app.services.task_service import task_queue
     from app.services.vault_service import vault_service
     vault_service.lock()
+    task_queue.stop()
+    shutdown_extraction_pools()
+    close_read_pool()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -64,12 +72,15 @@ app.include_router(jobs.router, prefix=settings.api_prefix)
 app.include_router(captures.router, prefix=settings.api_prefix)
 app.include_router(events.router, prefix=settings.api_prefix)
 app.include_router(documents.router, prefix=settings.api_prefix)
+app.include_router(documents.document_router, prefix=settings.api_prefix)
 app.include_router(tags.router, prefix=settings.api_prefix)
 app.include_router(tags.tag_jobs_router, prefix=settings.api_prefix)
 app.include_router(search.router, prefix=settings.api_prefix)
 app.include_router(calendar.router, prefix=settings.api_prefix)
 app.include_router(backup.router, prefix=settings.api_prefix)
 app.include_router(analytics.router, prefix=settings.api_prefix)
+app.include_router(tasks.router, prefix=settings.api_prefix)
+app.include_router(imports.router, prefix=settings.api_prefix)
 
 
 @app.get("/health")
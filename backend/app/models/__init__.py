@@ -4,5 +4,11 @@ from app.models.capture import Capture
 from app.models.event import Event
 from app.models.document import Document
 from app.models.tag import Tag, job_tags
+from app.models.task import Task
+from app.models.blob import Blob
+from app.models.document_text import DocumentText
+from app.models.job_term import job_terms
+from app.models.capture_band import capture_bands
+from app.models.capture_text import capture_texts
 
-__all__ = ["VaultConfig", "Job", "Capture", "Event", "Document", "Tag", "job_tags"]
+__all__ = ["VaultConfig", "Job", "Capture", "Event", "Document", "Tag", "job_tags", "Task", "Blob", "DocumentText", "job_terms", "capture_bands", "capture_texts"]
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, Text
+from app.database import Base
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    hash = Column(Text, primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
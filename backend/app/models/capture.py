@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Text
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, Text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -9,10 +9,14 @@ class Capture(Base):
     id = Column(Text, primary_key=True)
     job_id = Column(Text, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
     url = Column(Text)
+    canonical_url = Column(Text, index=True)
     page_title = Column(Text)
-    text_snapshot = Column(Text)
-    html_path = Column(Text)
+    # The text snapshot lives in capture_texts, compressed, so loading captures never reads it.
+    html_path = Column(Text)  # jobs/<job_id>/captures/<id>.html.gz (plain .html before v0.15)
     pdf_path = Column(Text)
+    pdf_status = Column(Text)
+    terms_version = Column(Integer)  # tokenizer version its job_terms were built with
+    fingerprint = Column(LargeBinary)  # MinHash signature; b"" if too short, NULL if not computed yet
     capture_method = Column(Text, nullable=False)
     captured_at = Column(Text, nullable=False)
 
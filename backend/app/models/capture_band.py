@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, Table, Text
+from app.database import Base
+
+capture_bands = Table(
+    "capture_bands",
+    Base.metadata,
+    Column("band", Integer, primary_key=True),
+    Column("bucket", BigInteger, primary_key=True),
+    Column("capture_id", Text, ForeignKey("captures.id", ondelete="CASCADE"), primary_key=True),
+    sqlite_with_rowid=False,
+)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, Table, Text
+from app.database import Base
+
+capture_texts = Table(
+    "capture_texts",
+    Base.metadata,
+    Column("capture_id", Text, ForeignKey("captures.id", ondelete="CASCADE"), primary_key=True),
+    Column("codec", Integer, nullable=False),  # app.utils.compression.CODEC_*
+    Column("body", LargeBinary, nullable=False),
+)
@@ -10,7 +10,7 @@ class Document(Base):
     job_id = Column(Text, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
     doc_type = Column(Text, nullable=False)
     original_filename = Column(Text, nullable=False)
-    stored_path = Column(Text, nullable=False, unique=True)
+    stored_path = Column(Text, nullable=False, index=True)  # blobs/<hash[:2]>/<hash>
     file_hash = Column(Text, nullable=False)
     file_size_bytes = Column(Integer, nullable=False)
     version_label = Column(Text)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Text
+from app.database import Base
+
+
+class DocumentText(Base):
+    __tablename__ = "document_texts"
+
+    file_hash = Column(Text, primary_key=True)
+    version = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    tokens = Column(Text, nullable=False)  # space-separated, sorted
+    extracted_at = Column(Text, nullable=False)
@@ -10,6 +10,7 @@ class Job(Base):
     title = Column(Text, nullable=False)
     organisation = Column(Text)
     url = Column(Text)
+    canonical_url = Column(Text, unique=True)  # app.utils.urls.canonical_url(url)
     location = Column(Text)
     salary_range = Column(Text)
     deadline_type = Column(Text, default="unknown")
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, ForeignKey, Table, Text
+from app.database import Base
+
+job_terms = Table(
+    "job_terms",
+    Base.metadata,
+    Column("job_id", Text, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True),
+    Column("term", Text, primary_key=True),
+    sqlite_with_rowid=False,
+)
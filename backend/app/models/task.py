@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, Integer, Text
+from app.database import Base
+
+
+class Task(Base):
+    __tablename__ = "tasks"
+
+    id = Column(Text, primary_key=True)
+    kind = Column(Text, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    status = Column(Text, nullable=False, default="queued")
+    priority = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(Float, nullable=False, default=0)
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(Text, nullable=False)
+    updated_at = Column(Text, nullable=False)
+    finished_at = Column(Text)
@@ -1,10 +1,10 @@
 from datetime import datetime, timezone, timedelta
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import func, text
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
 
@@ -22,13 +22,11 @@ def _pct(num: int, denom: int) -> float | None:
 
 
 @router.get("")
-async def get_analytics(db: Session = Depends(get_db)):
+async def get_analytics(db: AsyncSession = Depends(get_async_db)):
     # --- Status breakdown ---
     status_rows = (
-        db.query(Job.status, func.count(Job.id).label("n"))
-        .group_by(Job.status)
-        .all()
-    )
+        await db.execute(select(Job.status, func.count(Job.id).label("n")).group_by(Job.status))
+    ).all()
     by_status: dict[str, int] = {row.status: row.n for row in status_rows}
     total_jobs = sum(by_status.values())
 
@@ -43,18 +41,18 @@ async def get_analytics(db: Session = Depends(get_db)):
     cutoff = (datetime.now(timezone.utc) - timedelta(days=30)).strftime(
         "%Y-%m-%dT%H:%M:%SZ"
     )
-    ghost_row = db.execute(
+    ghost_row = (await db.execute(
         text("""
             SELECT COUNT(*) AS n FROM jobs j
             WHERE j.status = 'SUBMITTED'
             AND (SELECT MAX(occurred_at) FROM events WHERE job_id = j.id) < :cutoff
         """),
         {"cutoff": cutoff},
-    ).fetchone()
+    )).fetchone()
     ghost_count = ghost_row.n if ghost_row else 0
 
     # --- Avg days SUBMITTED → INTERVIEW ---
-    avg_interview_row = db.execute(
+    avg_interview_row = (await db.execute(
         text("""
             SELECT AVG(julianday(i.occurred_at) - julianday(s.occurred_at)) AS avg_days
             FROM events s
@@ -63,7 +61,7 @@ async def get_analytics(db: Session = Depends(get_db)):
                 AND i.occurred_at > s.occurred_at
             WHERE s.event_type = 'SUBMITTED'
         """)
-    ).fetchone()
+    )).fetchone()
     avg_days_to_interview = (
         round(avg_interview_row.avg_days, 1)
         if avg_interview_row and avg_interview_row.avg_days is not None
@@ -71,7 +69,7 @@ async def get_analytics(db: Session = Depends(get_db)):
     )
 
     # --- Avg days SUBMITTED → decision (OFFER / REJECTED / WITHDRAWN) ---
-    avg_decision_row = db.execute(
+    avg_decision_row = (await db.execute(
         text("""
             SELECT AVG(julianday(d.occurred_at) - julianday(s.occurred_at)) AS avg_days
             FROM events s
@@ -80,7 +78,7 @@ async def get_analytics(db: Session = Depends(get_db)):
                 AND d.occurred_at > s.occurred_at
             WHERE s.event_type = 'SUBMITTED'
         """)
-    ).fetchone()
+    )).fetchone()
     avg_days_to_decision = (
         round(avg_decision_row.avg_days, 1)
         if avg_decision_row and avg_decision_row.avg_days is not None
@@ -88,7 +86,7 @@ async def get_analytics(db: Session = Depends(get_db)):
     )
 
     # --- Top orgs with 2+ applications ---
-    org_rows = db.execute(
+    org_rows = (await db.execute(
         text("""
             SELECT
                 organisation,
@@ -103,7 +101,7 @@ async def get_analytics(db: Session = Depends(get_db)):
             ORDER BY total DESC
             LIMIT 10
         """)
-    ).fetchall()
+    )).fetchall()
     top_orgs = [
         {
             "name": r.organisation,
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from fastapi.responses import Response, StreamingResponse
 
 from app.dependencies import require_unlocked_vault, require_export_token
+from app.schemas.backup import BackupManifest
 from app.services.backup_service import export_vault_zip, export_csv, export_json
 
 # Security: exports require both session token and short-lived export token.
@@ -11,16 +12,25 @@ router = APIRouter(tags=["backup"], dependencies=[Depends(require_unlocked_vault
 
 @router.post("/backup/export")
 async def backup_export():
-    buf = export_vault_zip()
     return StreamingResponse(
-        buf,
+        export_vault_zip(),
         media_type="application/zip",
         headers={"Content-Disposition": 'attachment; filename="application_vault_backup.zip"'},
     )
 
 
+@router.post("/backup/export/incremental")
+async def backup_export_incremental(manifest: BackupManifest):
+    """Archive only files that are new or changed since the backup described by ``manifest``."""
+    return StreamingResponse(
+        export_vault_zip(previous_manifest=manifest.model_dump()),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="application_vault_backup_incremental.zip"'},
+    )
+
+
 @router.get("/export/csv")
-async def csv_export():
+def csv_export():
     csv_data = export_csv()
     return Response(
         content=csv_data,
@@ -31,5 +41,4 @@ async def csv_export():
 
 @router.get("/export/json")
 async def json_export():
-    data = export_json()
-    return data
+    return StreamingResponse(export_json(), media_type="application/json")
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
 from app.services.calendar_service import generate_job_ics
@@ -11,8 +12,8 @@ router = APIRouter(tags=["calendar"], dependencies=[Depends(require_unlocked_vau
 
 
 @router.get("/jobs/{job_id}/calendar")
-async def job_calendar(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def job_calendar(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     if not job.deadline_date:
@@ -33,13 +34,12 @@ async def job_calendar(job_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/calendar/deadlines")
-async def all_deadlines(db: Session = Depends(get_db)):
-    jobs = (
-        db.query(Job)
-        .filter(Job.deadline_date.isnot(None))
-        .filter(Job.status.notin_(["REJECTED", "WITHDRAWN", "EXPIRED"]))
-        .all()
-    )
+async def all_deadlines(db: AsyncSession = Depends(get_async_db)):
+    jobs = (await db.scalars(
+        select(Job)
+        .where(Job.deadline_date.isnot(None))
+        .where(Job.status.notin_(["REJECTED", "WITHDRAWN", "EXPIRED"]))
+    )).all()
     if not jobs:
         raise HTTPException(status_code=404, detail="No upcoming deadlines")
 
@@ -1,43 +1,57 @@
 import uuid
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
 from app.models.capture import Capture
+from app.models.capture_text import capture_texts
 from app.models.event import Event
-from app.models.document import Document
-from app.schemas.capture import CaptureCreate, CaptureResponse, QuickCaptureRequest, QuickCaptureResponse
+from app.schemas.capture import (
+    CaptureCreate, CaptureLookupResponse, CaptureResponse, QuickCaptureRequest, QuickCaptureResponse,
+)
 from app.schemas.job import JobResponse
-from app.services.capture_service import store_html_snapshot
-from app.services.document_service import store_document
-from app.services.pdf_service import generate_capture_pdf
+from app.services.capture_service import capture_text_insert, store_html_snapshot
+from app.services.fingerprint_service import best_match, capture_bands_insert, fingerprint, near_duplicate_query
+from app.services.match_service import TEXT_CACHE_VERSION, job_terms_insert, tokenize
+from app.services.task_service import new_task, task_queue
+from app.utils.compression import decompress_text
 from app.utils.filesystem import ensure_job_dirs
+from app.utils.projection import FastJSONResponse, requested_fields
+from app.utils.urls import canonical_url
 
 router = APIRouter(tags=["captures"], dependencies=[Depends(require_unlocked_vault)])
 
+_CAPTURE_SUMMARY = ("id", "job_id", "url", "page_title", "pdf_status", "capture_method", "captured_at")
 
-def _capture_to_response(cap: Capture) -> CaptureResponse:
+
+def _capture_to_response(cap: Capture, text_snapshot: str | None) -> CaptureResponse:
     return CaptureResponse(
         id=cap.id,
         job_id=cap.job_id,
         url=cap.url,
         page_title=cap.page_title,
-        text_snapshot=cap.text_snapshot,
+        text_snapshot=text_snapshot,
         html_path=cap.html_path,
         pdf_path=cap.pdf_path,
+        pdf_status=cap.pdf_status,
         capture_method=cap.capture_method,
         captured_at=cap.captured_at,
     )
 
 
 @router.post("/jobs/{job_id}/captures", response_model=CaptureResponse, status_code=201)
-async def create_capture(job_id: str, req: CaptureCreate, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def create_capture(job_id: str, req: CaptureCreate, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -53,43 +67,96 @@ async def create_capture(job_id: str, req: CaptureCreate, db: Session = Depends(
 
     html_path = None
     if req.html_content:
-        html_path = store_html_snapshot(job_id, capture_id, req.html_content)
+        html_path = await run_in_threadpool(store_html_snapshot, job_id, capture_id, req.html_content)
 
+    signature = await run_in_threadpool(fingerprint, req.text_snapshot)
     capture = Capture(
         id=capture_id,
         job_id=job_id,
         url=req.url,
+        canonical_url=canonical_url(req.url),
         page_title=req.page_title,
-        text_snapshot=req.text_snapshot,
         html_path=html_path,
         capture_method=req.capture_method,
+        terms_version=TEXT_CACHE_VERSION,
+        fingerprint=signature,
         captured_at=now,
     )
     db.add(capture)
-    db.commit()
-    db.refresh(capture)
-    return _capture_to_response(capture)
+    await db.flush()  # the capture row must exist first
+    if req.text_snapshot is not None:
+        await db.execute(await run_in_threadpool(capture_text_insert, capture_id, req.text_snapshot))
+    terms = await run_in_threadpool(tokenize, req.text_snapshot or "")
+    if terms:
+        await db.execute(job_terms_insert(job_id, terms))
+    if signature:
+        await db.execute(capture_bands_insert(capture_id, signature))
+    await db.commit()
+    await db.refresh(capture)
+    return _capture_to_response(capture, req.text_snapshot)
 
 
 @router.get("/jobs/{job_id}/captures", response_model=list[CaptureResponse])
-async def list_captures(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def list_captures(
+    job_id: str,
+    fields: str | None = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List a job's captures, newest first.
+
+    ``fields`` (comma-separated) or ``view=summary`` return only those keys,
+    read straight from the selected columns; the text snapshot is only read
+    and decompressed if ``text_snapshot`` is asked for.
+    """
+    try:
+        names = requested_fields(fields, view, CaptureResponse.model_fields, _CAPTURE_SUMMARY)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    captures = db.query(Capture).filter(Capture.job_id == job_id).order_by(Capture.captured_at.desc()).all()
-    return [_capture_to_response(c) for c in captures]
+    if names is not None:
+        query = (
+            select(*(getattr(Capture, name) for name in names if name != "text_snapshot"))
+            .select_from(Capture)
+            .where(Capture.job_id == job_id)
+            .order_by(Capture.captured_at.desc())
+        )
+        if "text_snapshot" not in names:
+            return FastJSONResponse([row._asdict() for row in await db.execute(query)])
+        query = query.add_columns(capture_texts.c.codec, capture_texts.c.body).outerjoin(
+            capture_texts, capture_texts.c.capture_id == Capture.id,
+        )
+        items = []
+        for row in await db.execute(query):
+            item = row._asdict()
+            item["text_snapshot"] = decompress_text(item.pop("codec"), item.pop("body"))
+            items.append(item)
+        return FastJSONResponse(items)
+
+    rows = (await db.execute(
+        select(Capture, capture_texts.c.codec, capture_texts.c.body)
+        .outerjoin(capture_texts, capture_texts.c.capture_id == Capture.id)
+        .where(Capture.job_id == job_id)
+        .order_by(Capture.captured_at.desc())
+    )).all()
+    return [_capture_to_response(c, decompress_text(codec, body)) for c, codec, body in rows]
 
 
 @router.post("/captures/quick", response_model=QuickCaptureResponse, status_code=201)
-async def quick_capture(req: QuickCaptureRequest, db: Session = Depends(get_db)):
-    # Duplicate check — same URL already in vault
-    if req.url:
-        existing = db.query(Job).filter(Job.url == req.url).first()
-        if existing:
-            raise HTTPException(
-                status_code=409,
-                detail=f'Already captured: "{existing.title}" (id={existing.id})',
-            )
+def quick_capture(req: QuickCaptureRequest, db: Session = Depends(get_db)):
+    # Performance: a plain ``def`` handler runs in the threadpool, so the
+    # file writes and commit below never block the event loop. PDF rendering
+    # is queued on the durable task queue in the same transaction, and the
+    # response returns once the job row is committed, with the capture's PDF
+    # marked pending.
+
+    # Duplicate check — same page already in vault, however the URL is dressed up
+    canonical = canonical_url(req.url)
+    existing = _job_for_url(canonical, db)
+    if existing:
+        return _already_captured(existing, db)
 
     # Security: cap capture payload sizes to prevent oversized content DoS.
     # Improvement: limits memory/disk impact from large snapshots.
@@ -98,6 +165,14 @@ async def quick_capture(req: QuickCaptureRequest, db: Session = Depends(get_db))
     if req.html_content and len(req.html_content) > settings.max_html_content_chars:
         raise HTTPException(status_code=413, detail="html_content too large")
 
+    # Near-duplicate check — the same posting via a mirror, tracking URL or re-capture.
+    # Runs before any file is written, so a duplicate costs one indexed lookup.
+    signature = fingerprint(req.text_snapshot)
+    if signature and not req.allow_duplicate:
+        match = best_match(signature, db.execute(near_duplicate_query(signature)))
+        if match:
+            return _already_captured(db.get(Job, match[0]), db, similarity=match[1])
+
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     job_id = str(uuid.uuid4())
     capture_id = str(uuid.uuid4())
@@ -111,6 +186,7 @@ async def quick_capture(req: QuickCaptureRequest, db: Session = Depends(get_db))
         title=title,
         organisation=req.organisation,
         url=req.url,
+        canonical_url=canonical,
         location=req.location,
         deadline_date=deadline_date,
         deadline_type="fixed" if deadline_date else "unknown",
@@ -129,6 +205,12 @@ async def quick_capture(req: QuickCaptureRequest, db: Session = Depends(get_db))
         occurred_at=now,
     )
     db.add(saved_event)
+    try:
+        db.flush()  # claims the canonical URL before any file is written
+    except IntegrityError:
+        # A concurrent capture of the same page got there first.
+        db.rollback()
+        return _already_captured(_job_for_url(canonical, db), db)
 
     ensure_job_dirs(job_id)
 
@@ -136,56 +218,98 @@ async def quick_capture(req: QuickCaptureRequest, db: Session = Depends(get_db))
     if req.html_content:
         html_path = store_html_snapshot(job_id, capture_id, req.html_content)
 
-    # Generate PDF archive of the posting
-    pdf_bytes = generate_capture_pdf(
-        title=title,
-        organisation=req.organisation,
-        url=req.url,
-        text_snapshot=req.text_snapshot,
-        captured_at=now,
-        deadline=req.deadline,
-    )
-    safe_title = "".join(c for c in title[:40] if c.isalnum() or c in " -_").strip().replace(" ", "_")
-    pdf_filename = f"capture_{safe_title}.pdf"
-    pdf_rel_path, pdf_hash, pdf_size = store_document(job_id, pdf_filename, pdf_bytes)
-
-    # Store PDF as an immutable document record
-    doc = Document(
-        id=str(uuid.uuid4()),
-        job_id=job_id,
-        original_filename=pdf_filename,
-        doc_type="job_posting",
-        stored_path=pdf_rel_path,
-        file_hash=pdf_hash,
-        file_size_bytes=pdf_size,
-        mime_type="application/pdf",
-        created_at=now,
-    )
-    db.add(doc)
-
     capture = Capture(
         id=capture_id,
         job_id=job_id,
         url=req.url,
+        canonical_url=canonical,
         page_title=req.page_title,
-        text_snapshot=req.text_snapshot,
         html_path=html_path,
-        pdf_path=pdf_rel_path,
+        pdf_status="pending",
         capture_method=req.capture_method,
+        terms_version=TEXT_CACHE_VERSION,
+        fingerprint=signature,
         captured_at=now,
     )
     db.add(capture)
+    terms = tokenize(req.text_snapshot or "")
+    db.flush()  # the capture row must exist first
+    if req.text_snapshot is not None:
+        db.execute(capture_text_insert(capture_id, req.text_snapshot))
+    if terms:
+        db.execute(job_terms_insert(job_id, terms))
+    if signature:
+        db.execute(capture_bands_insert(capture_id, signature))
+    _queue_fingerprint_backfill(db)
+
+    # Generate the PDF archive of the posting (stored as an immutable document).
+    # Queued in the same transaction so the render survives a restart; the
+    # handler reads the capture back, so the text is not copied into tasks.
+    db.add(new_task("render_capture_pdf", {"capture_id": capture_id}, priority=10))
     db.commit()
     db.refresh(job)
     db.refresh(capture)
+    task_queue.notify()
 
-    from app.routers.jobs import _job_to_response
+    from app.routers.jobs import job_to_response_sync
     return QuickCaptureResponse(
-        job=_job_to_response(job, db),
-        capture=_capture_to_response(capture),
+        job=job_to_response_sync(job, db),
+        capture=_capture_to_response(capture, req.text_snapshot),
     )
 
 
+@router.get("/captures/lookup", response_model=CaptureLookupResponse)
+def lookup_capture(url: str, db: Session = Depends(get_db)):
+    """Whether a page is already in the vault, so clients can skip sending a full capture."""
+    from app.routers.jobs import job_to_response_sync
+
+    canonical = canonical_url(url)
+    job = _job_for_url(canonical, db)
+    return CaptureLookupResponse(
+        url=url,
+        canonical_url=canonical,
+        job=job_to_response_sync(job, db) if job else None,
+    )
+
+
+def _job_for_url(canonical: str | None, db: Session) -> Job | None:
+    """The job saved from this canonical URL, or holding a capture of it."""
+    if canonical is None:
+        return None
+    job = db.scalar(select(Job).where(Job.canonical_url == canonical))
+    if job is None:
+        job = db.scalar(
+            select(Job).join(Capture, Capture.job_id == Job.id).where(Capture.canonical_url == canonical).limit(1)
+        )
+    return job
+
+
+def _already_captured(job: Job, db: Session, similarity: float | None = None) -> JSONResponse:
+    """409 carrying the existing job, so clients can link to it instead of re-capturing."""
+    from app.routers.jobs import job_to_response_sync
+
+    if similarity is None:
+        detail = f'Already captured: "{job.title}" (id={job.id})'
+    else:
+        detail = f'Already captured as a near-duplicate of "{job.title}" (id={job.id})'
+    return JSONResponse(status_code=409, content={
+        "detail": detail,
+        "job": job_to_response_sync(job, db).model_dump(),
+        "similarity": similarity,
+    })
+
+
+def _queue_fingerprint_backfill(db: Session):
+    """Queue fingerprinting for captures stored before fingerprints existed (once)."""
+    if db.execute(text("SELECT 1 FROM captures WHERE fingerprint IS NULL LIMIT 1")).first() is None:
+        return
+    pending = db.execute(text(
+        "SELECT 1 FROM tasks WHERE kind = 'fingerprint_captures' AND status IN ('queued', 'running') LIMIT 1"
+    )).first()
+    if pending is None:
+        db.add(new_task("fingerprint_captures", {}))
+
+
 def _parse_deadline(raw: str) -> str | None:
     """Try to parse a deadline string into YYYY-MM-DD. Returns None if unparseable."""
     import re
@@ -1,19 +1,32 @@
 import uuid
 from datetime import datetime, timezone
+from pathlib import Path
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
-from app.models.capture import Capture
 from app.models.document import Document
-from app.schemas.document import DocumentResponse
-from app.services.document_service import store_document, get_document_full_path
+from app.models.document_text import DocumentText
+from app.schemas.document import DocumentResponse, MatchAllRequest, MatchAllResponse
+from app.schemas.task import TaskQueuedResponse
+from app.services.blob_service import collect_blobs
+from app.services.document_service import PendingDocument, get_document_full_path
+from app.services.extraction_service import ExtractionError
+from app.services.match_service import (
+    TEXT_CACHE_VERSION, deserialize_tokens, extract_document_text, job_term_weights, match_keywords, rank_jobs,
+    serialize_tokens,
+)
+from app.services.task_service import new_task, task_queue
 from app.utils.hashing import sha256_file
+from app.utils.projection import FastJSONResponse, requested_fields
 
 router = APIRouter(
     prefix="/jobs/{job_id}/documents",
@@ -21,6 +34,15 @@ router = APIRouter(
     dependencies=[Depends(require_unlocked_vault)],
 )
 
+# Endpoints addressing a document by id alone, across all jobs.
+document_router = APIRouter(
+    prefix="/documents",
+    tags=["documents"],
+    dependencies=[Depends(require_unlocked_vault)],
+)
+
+_DOCUMENT_SUMMARY = ("id", "job_id", "doc_type", "original_filename", "version_label", "created_at", "submitted_at")
+
 
 def _doc_to_response(doc: Document) -> DocumentResponse:
     return DocumentResponse(
@@ -48,42 +70,43 @@ async def upload_document(
     file: UploadFile = File(...),
     doc_type: str = Form(...),
     version_label: str | None = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if doc_type not in VALID_DOC_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid doc_type. Must be one of: {VALID_DOC_TYPES}")
 
-    job = db.query(Job).filter(Job.id == job_id).first()
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     # Security: enforce upload size limit to prevent memory/disk DoS.
     # Improvement: rejects oversized files early.
+    # Performance: stream to a temp file, hashing as we go, so memory stays
+    # at one chunk; only a non-duplicate is moved into the blob store.
     max_bytes = settings.max_upload_bytes
-    size = 0
-    chunks: list[bytes] = []
-    while True:
-        chunk = await file.read(1024 * 1024)
-        if not chunk:
-            break
-        size += len(chunk)
-        if size > max_bytes:
-            raise HTTPException(status_code=413, detail=f"File too large (max {max_bytes} bytes)")
-        chunks.append(chunk)
-
-    content = b"".join(chunks)
-    if not content:
-        raise HTTPException(status_code=400, detail="Empty file")
-
-    stored_path, file_hash, file_size = store_document(job_id, file.filename, content)
-
-    # Check for duplicate
-    existing = db.query(Document).filter(
-        Document.job_id == job_id,
-        Document.file_hash == file_hash,
-    ).first()
-    if existing:
-        raise HTTPException(status_code=409, detail="Document with identical content already exists for this job")
+    pending = await run_in_threadpool(PendingDocument)
+    try:
+        while True:
+            chunk = await file.read(1024 * 1024)
+            if not chunk:
+                break
+            if pending.size + len(chunk) > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File too large (max {max_bytes} bytes)")
+            await run_in_threadpool(pending.write, chunk)
+
+        if not pending.size:
+            raise HTTPException(status_code=400, detail="Empty file")
+
+        # Check for duplicate (idx_documents_hash) before anything is stored
+        existing = await db.scalar(select(Document.id).where(
+            Document.file_hash == pending.file_hash,
+            Document.job_id == job_id,
+        ).limit(1))
+        if existing:
+            raise HTTPException(status_code=409, detail="Document with identical content already exists for this job")
+    except BaseException:
+        await run_in_threadpool(pending.discard)
+        raise
 
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     doc = Document(
@@ -91,64 +114,103 @@ async def upload_document(
         job_id=job_id,
         doc_type=doc_type,
         original_filename=file.filename,
-        stored_path=stored_path,
-        file_hash=file_hash,
-        file_size_bytes=file_size,
+        stored_path=pending.stored_path,
+        file_hash=pending.file_hash,
+        file_size_bytes=pending.size,
         version_label=version_label,
         mime_type=file.content_type,
         created_at=now,
     )
     db.add(doc)
-    db.commit()
-    db.refresh(doc)
+    # Warm the text cache off the request path so the first match is cheap too
+    db.add(new_task("extract_document_text", {
+        "file_hash": doc.file_hash,
+        "stored_path": doc.stored_path,
+        "mime_type": doc.mime_type,
+    }))
+    try:
+        # Flush first: the row (and its blob reference) holds the write lock
+        # while the file is placed, so collect_blobs cannot race us.
+        await db.flush()
+        await run_in_threadpool(pending.commit)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        await run_in_threadpool(pending.discard)
+        await run_in_threadpool(collect_blobs, settings.db_path, settings.vault_path, [doc.file_hash])
+        raise
+    task_queue.notify()
+    await db.refresh(doc)
     return _doc_to_response(doc)
 
 
 @router.get("", response_model=list[DocumentResponse])
-async def list_documents(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def list_documents(
+    job_id: str,
+    fields: str | None = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List a job's documents, newest first; ``fields`` or ``view=summary`` select only some columns."""
+    try:
+        names = requested_fields(fields, view, DocumentResponse.model_fields, _DOCUMENT_SUMMARY)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    docs = db.query(Document).filter(Document.job_id == job_id).order_by(Document.created_at.desc()).all()
+    if names is not None:
+        rows = await db.execute(
+            select(*(getattr(Document, name) for name in names))
+            .where(Document.job_id == job_id)
+            .order_by(Document.created_at.desc())
+        )
+        return FastJSONResponse([row._asdict() for row in rows])
+    docs = (await db.scalars(
+        select(Document).where(Document.job_id == job_id).order_by(Document.created_at.desc())
+    )).all()
     return [_doc_to_response(d) for d in docs]
 
 
 @router.put("/{doc_id}/submit", response_model=DocumentResponse)
-async def mark_submitted(job_id: str, doc_id: str, db: Session = Depends(get_db)):
+async def mark_submitted(job_id: str, doc_id: str, db: AsyncSession = Depends(get_async_db)):
     """Mark a document as submitted for this job application."""
-    doc = db.query(Document).filter(Document.id == doc_id, Document.job_id == job_id).first()
+    doc = await db.scalar(select(Document).where(Document.id == doc_id, Document.job_id == job_id))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     doc.submitted_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    db.commit()
-    db.refresh(doc)
+    await db.commit()
+    await db.refresh(doc)
     return _doc_to_response(doc)
 
 
 @router.delete("/{doc_id}/submit", response_model=DocumentResponse)
-async def unmark_submitted(job_id: str, doc_id: str, db: Session = Depends(get_db)):
+async def unmark_submitted(job_id: str, doc_id: str, db: AsyncSession = Depends(get_async_db)):
     """Remove the submitted mark from a document."""
-    doc = db.query(Document).filter(Document.id == doc_id, Document.job_id == job_id).first()
+    doc = await db.scalar(select(Document).where(Document.id == doc_id, Document.job_id == job_id))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     doc.submitted_at = None
-    db.commit()
-    db.refresh(doc)
+    await db.commit()
+    await db.refresh(doc)
     return _doc_to_response(doc)
 
 
-@router.get("/{doc_id}/verify")
-async def verify_document(job_id: str, doc_id: str, db: Session = Depends(get_db)):
-    """Re-hash the stored file and compare against the recorded SHA-256."""
-    doc = db.query(Document).filter(Document.id == doc_id, Document.job_id == job_id).first()
+async def _stored_document(job_id: str, doc_id: str, db: AsyncSession) -> tuple[Document, Path]:
+    doc = await db.scalar(select(Document).where(Document.id == doc_id, Document.job_id == job_id))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-
     full_path = get_document_full_path(doc.stored_path, settings.vault_path)
     if not full_path.exists():
         raise HTTPException(status_code=404, detail="Document file missing from vault")
+    return doc, full_path
+
 
-    actual_hash = sha256_file(full_path)
+@router.get("/{doc_id}/verify")
+async def verify_document(job_id: str, doc_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Re-hash the stored file and compare against the recorded SHA-256."""
+    doc, full_path = await _stored_document(job_id, doc_id, db)
+    actual_hash = await run_in_threadpool(sha256_file, full_path)
     verified = actual_hash == doc.file_hash
 
     return {
@@ -159,10 +221,21 @@ async def verify_document(job_id: str, doc_id: str, db: Session = Depends(get_db
     }
 
 
+@router.post("/{doc_id}/verify", status_code=202, response_model=TaskQueuedResponse)
+async def queue_verify_document(job_id: str, doc_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Queue the integrity check; poll ``GET /tasks/{task_id}`` for the result."""
+    await _stored_document(job_id, doc_id, db)
+    task = new_task("verify_document", {"document_id": doc_id})
+    db.add(task)
+    await db.commit()
+    task_queue.notify()
+    return TaskQueuedResponse(task_id=task.id, status=task.status)
+
+
 @router.get("/{doc_id}/match")
-async def match_document(job_id: str, doc_id: str, db: Session = Depends(get_db)):
+async def match_document(job_id: str, doc_id: str, db: AsyncSession = Depends(get_async_db)):
     """Keyword overlap score between this document and the job's captured text."""
-    doc = db.query(Document).filter(Document.id == doc_id, Document.job_id == job_id).first()
+    doc = await db.scalar(select(Document).where(Document.id == doc_id, Document.job_id == job_id))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -170,19 +243,44 @@ async def match_document(job_id: str, doc_id: str, db: Session = Depends(get_db)
     if not full_path.exists():
         raise HTTPException(status_code=404, detail="Document file missing from vault")
 
-    # Combine all capture text snapshots for this job
-    captures = db.query(Capture).filter(Capture.job_id == job_id).all()
-    job_text = " ".join(c.text_snapshot for c in captures if c.text_snapshot)
-
-    from app.services.match_service import extract_text_from_file, compute_match
-    doc_text = extract_text_from_file(full_path, doc.mime_type)
-
-    return compute_match(job_text, doc_text)
+    # The job's keywords (over all its captures) with their corpus weights
+    weights = await run_in_threadpool(job_term_weights, job_id)
+    doc_tokens = await _document_tokens(db, doc, full_path)
+    return match_keywords(set(weights), doc_tokens, weights)
+
+
+async def _document_tokens(db: AsyncSession, doc: Document, full_path) -> set[str]:
+    """Keyword tokens for a document, from the hash-keyed text cache when possible."""
+    cached = await db.scalar(select(DocumentText.tokens).where(
+        DocumentText.file_hash == doc.file_hash,
+        DocumentText.version == TEXT_CACHE_VERSION,
+    ))
+    if cached is not None:
+        return deserialize_tokens(cached)
+
+    try:
+        text, tokens = await run_in_threadpool(extract_document_text, full_path, doc.mime_type)
+    except ExtractionError as exc:
+        # Not cached: a later request (or the upload's queued task) can retry.
+        raise HTTPException(status_code=422, detail=f"Could not extract document text: {exc}") from exc
+    values = {
+        "version": TEXT_CACHE_VERSION,
+        "text": text,
+        "tokens": serialize_tokens(tokens),
+        "extracted_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    await db.execute(
+        sqlite_insert(DocumentText)
+        .values(file_hash=doc.file_hash, **values)
+        .on_conflict_do_update(index_elements=[DocumentText.file_hash], set_=values)
+    )
+    await db.commit()
+    return tokens
 
 
 @router.get("/{doc_id}/download")
-async def download_document(job_id: str, doc_id: str, db: Session = Depends(get_db)):
-    doc = db.query(Document).filter(Document.id == doc_id, Document.job_id == job_id).first()
+async def download_document(job_id: str, doc_id: str, db: AsyncSession = Depends(get_async_db)):
+    doc = await db.scalar(select(Document).where(Document.id == doc_id, Document.job_id == job_id))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -195,3 +293,21 @@ async def download_document(job_id: str, doc_id: str, db: Session = Depends(get_
         filename=doc.original_filename,
         media_type=doc.mime_type or "application/octet-stream",
     )
+
+
+@document_router.post("/{doc_id}/match-all", response_model=MatchAllResponse)
+async def match_document_against_all_jobs(doc_id: str, req: MatchAllRequest | None = None,
+                                          db: AsyncSession = Depends(get_async_db)):
+    """Rank every job (optionally only some statuses) by keyword overlap with this document."""
+    req = req or MatchAllRequest()
+    doc = await db.get(Document, doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    full_path = get_document_full_path(doc.stored_path, settings.vault_path)
+    if not full_path.exists():
+        raise HTTPException(status_code=404, detail="Document file missing from vault")
+
+    doc_tokens = await _document_tokens(db, doc, full_path)
+    results = await run_in_threadpool(rank_jobs, doc_tokens, req.limit, req.statuses)
+    return MatchAllResponse(document_id=doc_id, doc_keyword_count=len(doc_tokens), results=results)
@@ -1,20 +1,24 @@
 import uuid
 from datetime import date, datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
 from app.models.event import Event
 from app.schemas.event import EventCreate, EventResponse
+from app.utils.projection import FastJSONResponse, requested_fields
 
 router = APIRouter(tags=["events"], dependencies=[Depends(require_unlocked_vault)])
 
 VALID_EVENTS = {"SAVED", "SHORTLISTED", "DRAFTING", "SUBMITTED",
                 "INTERVIEW", "OFFER", "REJECTED", "WITHDRAWN", "EXPIRED"}
 
+_EVENT_SUMMARY = ("id", "job_id", "event_type", "next_action_date", "occurred_at")
+
 
 def _event_to_response(ev: Event) -> EventResponse:
     return EventResponse(
@@ -28,11 +32,11 @@ def _event_to_response(ev: Event) -> EventResponse:
 
 
 @router.post("/jobs/{job_id}/events", response_model=EventResponse, status_code=201)
-async def add_event(job_id: str, req: EventCreate, db: Session = Depends(get_db)):
+async def add_event(job_id: str, req: EventCreate, db: AsyncSession = Depends(get_async_db)):
     if req.event_type not in VALID_EVENTS:
         raise HTTPException(status_code=400, detail=f"Invalid event type. Must be one of: {VALID_EVENTS}")
 
-    job = db.query(Job).filter(Job.id == job_id).first()
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -65,28 +69,46 @@ async def add_event(job_id: str, req: EventCreate, db: Session = Depends(get_db)
     # Update job status
     job.status = req.event_type
     job.updated_at = now
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
     return _event_to_response(event)
 
 
 @router.get("/jobs/{job_id}/events", response_model=list[EventResponse])
-async def list_events(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def list_events(
+    job_id: str,
+    fields: str | None = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """A job's timeline, oldest first; ``fields`` or ``view=summary`` select only some columns."""
+    try:
+        names = requested_fields(fields, view, EventResponse.model_fields, _EVENT_SUMMARY)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    events = db.query(Event).filter(Event.job_id == job_id).order_by(Event.occurred_at.asc()).all()
+    if names is not None:
+        rows = await db.execute(
+            select(*(getattr(Event, name) for name in names))
+            .where(Event.job_id == job_id)
+            .order_by(Event.occurred_at.asc())
+        )
+        return FastJSONResponse([row._asdict() for row in rows])
+    events = (await db.scalars(
+        select(Event).where(Event.job_id == job_id).order_by(Event.occurred_at.asc())
+    )).all()
     return [_event_to_response(e) for e in events]
 
 
 @router.get("/events/upcoming", response_model=list[EventResponse])
-async def upcoming_events(db: Session = Depends(get_db)):
+async def upcoming_events(db: AsyncSession = Depends(get_async_db)):
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    events = (
-        db.query(Event)
-        .filter(Event.next_action_date.isnot(None))
-        .filter(Event.next_action_date >= now[:10])  # Compare date portion
+    events = (await db.scalars(
+        select(Event)
+        .where(Event.next_action_date.isnot(None))
+        .where(Event.next_action_date >= now[:10])  # Compare date portion
         .order_by(Event.next_action_date.asc())
-        .all()
-    )
+    )).all()
     return [_event_to_response(e) for e in events]
@@ -0,0 +1,76 @@
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.dependencies import require_unlocked_vault
+from app.schemas.imports import ImportResult
+from app.services.import_service import BulkImporter, parse_import_record
+from app.services.task_service import task_queue
+
+router = APIRouter(tags=["import"], dependencies=[Depends(require_unlocked_vault)])
+
+
+# Room on a line for the job's own fields and JSON syntax around a snapshot.
+_LINE_OVERHEAD_BYTES = 64 * 1024
+
+
+def _max_line_bytes() -> int:
+    # A snapshot at the character cap, every character escaped as \uXXXX
+    return 6 * settings.max_text_snapshot_chars + _LINE_OVERHEAD_BYTES
+
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[tuple[int, bytes | None]]:
+    """(line number, line) for each non-blank line of a streamed body.
+
+    A line longer than ``max_bytes`` is yielded once as None and the rest of
+    it is skipped as it arrives, so at most one line is ever buffered.
+    """
+    pending = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if skipping:
+                skipping = False  # the end of a line already reported
+            elif len(line) > max_bytes:
+                yield line_no, None
+            elif line.strip():
+                yield line_no, line
+        if len(pending) > max_bytes:
+            if not skipping:
+                skipping = True
+                yield line_no + 1, None
+            pending = b""
+    if pending.strip() and not skipping:
+        yield line_no + 1, pending
+
+
+@router.post("/import/ndjson", response_model=ImportResult)
+async def import_ndjson(request: Request):
+    """Import jobs (each with optional captures) from an NDJSON body, one job per line.
+
+    Lines are validated as the body arrives and written once it is complete;
+    records that fail validation, duplicate a URL or run past the line length
+    limit are reported by line and skipped.
+    """
+    importer = BulkImporter()
+    try:
+        async for line_no, line in _ndjson_lines(request.stream(), _max_line_bytes()):
+            if line is None:
+                importer.reject(line_no, "Line too long")
+                continue
+            try:
+                importer.add(line_no, parse_import_record(line))
+            except ValueError as exc:
+                importer.reject(line_no, str(exc))
+        result = await run_in_threadpool(importer.run)
+    finally:
+        importer.close()
+    if result.captures:
+        task_queue.notify()
+    return result
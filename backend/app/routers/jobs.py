@@ -2,18 +2,28 @@ import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
 from app.models.capture import Capture
 from app.models.event import Event
 from app.models.document import Document
-from app.models.tag import Tag
-from app.schemas.job import JobCreate, JobUpdate, JobResponse, JobListResponse
+from app.models.tag import Tag, job_tags
+from app.schemas.job import JobCreate, JobUpdate, JobResponse, JobListResponse, SimilarJobsResponse
+from app.services import blob_service  # noqa: F401  (registers the collect_blobs task)
+from app.services.match_service import similar_jobs
+from app.services.search_service import jobs_fts_filter
+from app.services.task_service import new_task, task_queue
 from app.utils.filesystem import ensure_job_dirs
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.projection import FastJSONResponse, requested_fields
+from app.utils.urls import canonical_url
 
 router = APIRouter(
     prefix="/jobs",
@@ -22,42 +32,138 @@ router = APIRouter(
 )
 
 
-def _job_to_response(job: Job, db: Session) -> JobResponse:
-    capture_count = db.query(func.count(Capture.id)).filter(Capture.job_id == job.id).scalar()
-    event_count = db.query(func.count(Event.id)).filter(Event.job_id == job.id).scalar()
-    document_count = db.query(func.count(Document.id)).filter(Document.job_id == job.id).scalar()
-    tag_names = [t.name for t in job.tags]
-
-    return JobResponse(
-        id=job.id,
-        title=job.title,
-        organisation=job.organisation,
-        url=job.url,
-        location=job.location,
-        salary_range=job.salary_range,
-        deadline_type=job.deadline_type,
-        deadline_date=job.deadline_date,
-        status=job.status,
-        notes=job.notes,
-        created_at=job.created_at,
-        updated_at=job.updated_at,
-        capture_count=capture_count,
-        event_count=event_count,
-        document_count=document_count,
-        tags=tag_names,
+def _job_stats_statements(job_ids: list[str]) -> list:
+    """Grouped per-job capture/event/document counts and tag names for a page of jobs."""
+    counts = [
+        select(column, func.count()).where(column.in_(job_ids)).group_by(column)
+        for column in (Capture.job_id, Event.job_id, Document.job_id)
+    ]
+    tags = (
+        select(job_tags.c.job_id, Tag.name)
+        .join(Tag, Tag.id == job_tags.c.tag_id)
+        .where(job_tags.c.job_id.in_(job_ids))
+        .order_by(Tag.name)
     )
+    return [*counts, tags]
+
+
+# JobResponse fields computed by _job_stats_statements, in statement order.
+_JOB_STAT_FIELDS = ("capture_count", "event_count", "document_count", "tags")
+_JOB_SUMMARY = ("id", "title", "organisation", "status", "deadline_date", "updated_at")
+
+
+async def _project_jobs(rows: list, names: list[str], db: AsyncSession) -> list[dict]:
+    """Plain dicts of the requested fields; only the requested stats are queried."""
+    if not rows:
+        return []
+    items = [{name: getattr(row, name) for name in names if name not in _JOB_STAT_FIELDS} for row in rows]
+    statements = dict(zip(_JOB_STAT_FIELDS, _job_stats_statements([row.id for row in rows])))
+    for field in _JOB_STAT_FIELDS:
+        if field not in names:
+            continue
+        grouped: dict = {}
+        for job_id, value in (await db.execute(statements[field])).all():
+            if field == "tags":
+                grouped.setdefault(job_id, []).append(value)
+            else:
+                grouped[job_id] = value
+        for item, row in zip(items, rows):
+            item[field] = grouped.get(row.id, [] if field == "tags" else 0)
+    return [{name: item[name] for name in names} for item in items]
+
+
+def _build_job_responses(jobs: list[Job], stats: list[list]) -> list[JobResponse]:
+    capture_rows, event_rows, document_rows, tag_rows = stats
+    capture_counts = dict(capture_rows)
+    event_counts = dict(event_rows)
+    document_counts = dict(document_rows)
+    tag_names: dict[str, list[str]] = {}
+    for job_id, name in tag_rows:
+        tag_names.setdefault(job_id, []).append(name)
+
+    return [
+        JobResponse(
+            id=job.id,
+            title=job.title,
+            organisation=job.organisation,
+            url=job.url,
+            location=job.location,
+            salary_range=job.salary_range,
+            deadline_type=job.deadline_type,
+            deadline_date=job.deadline_date,
+            status=job.status,
+            notes=job.notes,
+            created_at=job.created_at,
+            updated_at=job.updated_at,
+            capture_count=capture_counts.get(job.id, 0),
+            event_count=event_counts.get(job.id, 0),
+            document_count=document_counts.get(job.id, 0),
+            tags=tag_names.get(job.id, []),
+        )
+        for job in jobs
+    ]
+
+
+async def _jobs_to_responses(jobs: list[Job], db: AsyncSession) -> list[JobResponse]:
+    """Build responses for a page of jobs with a fixed number of grouped queries."""
+    if not jobs:
+        return []
+    statements = _job_stats_statements([j.id for j in jobs])
+    stats = [(await db.execute(stmt)).all() for stmt in statements]
+    return _build_job_responses(jobs, stats)
+
+
+async def _job_to_response(job: Job, db: AsyncSession) -> JobResponse:
+    return (await _jobs_to_responses([job], db))[0]
+
+
+def job_to_response_sync(job: Job, db: Session) -> JobResponse:
+    """Same as ``_job_to_response`` for handlers running on a sync Session."""
+    stats = [db.execute(stmt).all() for stmt in _job_stats_statements([job.id])]
+    return _build_job_responses([job], stats)[0]
+
+
+async def _get_job_or_404(job_id: str, db: AsyncSession) -> Job:
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def _check_url_free(canonical: str | None, db: AsyncSession, job_id: str | None = None):
+    """409 if another job already has this canonical URL (the column is unique)."""
+    if canonical is None:
+        return
+    existing = await db.scalar(select(Job).where(Job.canonical_url == canonical, Job.id != job_id))
+    if existing:
+        raise HTTPException(
+            status_code=409, detail=f'A job with this URL already exists: "{existing.title}" (id={existing.id})',
+        )
+
+
+async def _commit_url_claim(canonical: str | None, db: AsyncSession, job_id: str | None = None):
+    """Commit, turning a URL claimed concurrently since ``_check_url_free`` into the same 409."""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        await _check_url_free(canonical, db, job_id)
+        raise
 
 
 @router.post("", response_model=JobResponse, status_code=201)
-async def create_job(req: JobCreate, db: Session = Depends(get_db)):
+async def create_job(req: JobCreate, db: AsyncSession = Depends(get_async_db)):
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     job_id = str(uuid.uuid4())
+    canonical = canonical_url(req.url)
+    await _check_url_free(canonical, db)
 
     job = Job(
         id=job_id,
         title=req.title,
         organisation=req.organisation,
         url=req.url,
+        canonical_url=canonical,
         location=req.location,
         salary_range=req.salary_range,
         deadline_type=req.deadline_type,
@@ -78,11 +184,23 @@ async def create_job(req: JobCreate, db: Session = Depends(get_db)):
         occurred_at=now,
     )
     db.add(event)
-    db.commit()
-    db.refresh(job)
+    await _commit_url_claim(canonical, db)
+    await db.refresh(job)
 
     ensure_job_dirs(job_id)
-    return _job_to_response(job, db)
+    return await _job_to_response(job, db)
+
+
+# Filtered listings stop counting here when an estimated total is requested.
+_ESTIMATE_COUNT_CAP = 10_000
+
+
+async def _estimate_total(query, filtered: bool, db: AsyncSession) -> int:
+    if not filtered:
+        # rowid only grows, so MAX(rowid) is an O(log n) upper bound on the row count.
+        return (await db.execute(text("SELECT MAX(rowid) FROM jobs"))).scalar() or 0
+    capped = query.with_only_columns(Job.id).order_by(None).limit(_ESTIMATE_COUNT_CAP).subquery()
+    return (await db.execute(select(func.count()).select_from(capped))).scalar()
 
 
 @router.get("", response_model=JobListResponse)
@@ -90,64 +208,131 @@ async def list_jobs(
     status: str | None = None,
     tag: str | None = None,
     q: str | None = None,
+    prefix: bool = True,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: str | None = None,
+    total: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    fields: str | None = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    query = db.query(Job)
+    """List jobs newest-updated first.
+
+    Pass ``cursor`` (the previous response's ``next_cursor``) for keyset
+    pagination; ``page`` is ignored in that mode. ``total`` selects an exact
+    count, a cheap estimate, or no count at all. ``q`` is matched through the
+    jobs_fts index; ``prefix`` (default on) lets partial words match for type-ahead.
+    ``fields`` (comma-separated) or ``view=summary`` return jobs with only
+    those keys, selecting just those columns and skipping unrequested counts.
+    """
+    try:
+        names = requested_fields(fields, view, JobResponse.model_fields, _JOB_SUMMARY)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    query = select(Job)
 
     if status:
-        query = query.filter(Job.status == status)
+        query = query.where(Job.status == status)
     if tag:
-        query = query.join(Job.tags).filter(Tag.name == tag)
+        query = query.join(Job.tags).where(Tag.name == tag)
     if q:
-        query = query.filter(
-            Job.title.ilike(f"%{q}%")
-            | Job.organisation.ilike(f"%{q}%")
-            | Job.notes.ilike(f"%{q}%")
-        )
+        query = query.where(jobs_fts_filter(q, prefix=prefix))
+
+    if total == "exact":
+        count_query = select(func.count()).select_from(query.with_only_columns(Job.id).subquery())
+        total_count = (await db.execute(count_query)).scalar()
+    elif total == "estimate":
+        total_count = await _estimate_total(query, bool(status or tag or q), db)
+    else:
+        total_count = None
 
-    total = query.count()
-    jobs = query.order_by(Job.updated_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+    query = query.order_by(Job.updated_at.desc(), Job.id.desc())
+    if cursor:
+        try:
+            after_updated_at, after_id = decode_cursor(cursor, 2)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        query = query.where(tuple_(Job.updated_at, Job.id) < tuple_(after_updated_at, after_id))
+    else:
+        query = query.offset((page - 1) * per_page)
 
+    if names is not None:
+        columns = {name for name in names if name not in _JOB_STAT_FIELDS} | {"id", "updated_at"}
+        query = query.with_only_columns(*(getattr(Job, name) for name in columns))
+    # Fetch one extra row to know whether another page exists.
+    result = await db.execute(query.limit(per_page + 1))
+    jobs = list(result.scalars() if names is None else result)
+    next_cursor = None
+    if len(jobs) > per_page:
+        jobs = jobs[:per_page]
+        next_cursor = encode_cursor(jobs[-1].updated_at, jobs[-1].id)
+
+    if names is not None:
+        return FastJSONResponse({
+            "jobs": await _project_jobs(jobs, names, db),
+            "total": total_count,
+            "page": page,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "total_is_estimate": total == "estimate",
+        })
     return JobListResponse(
-        jobs=[_job_to_response(j, db) for j in jobs],
-        total=total,
+        jobs=await _jobs_to_responses(jobs, db),
+        total=total_count,
         page=page,
         per_page=per_page,
+        next_cursor=next_cursor,
+        total_is_estimate=total == "estimate",
     )
 
 
 @router.get("/{job_id}", response_model=JobResponse)
-async def get_job(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    return _job_to_response(job, db)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await _get_job_or_404(job_id, db)
+    return await _job_to_response(job, db)
+
+
+@router.get("/{job_id}/similar", response_model=SimilarJobsResponse)
+async def get_similar_jobs(
+    job_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    status: list[str] | None = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Other jobs whose captured postings read most like this one (TF-IDF cosine over keywords)."""
+    await _get_job_or_404(job_id, db)
+    results = await run_in_threadpool(similar_jobs, job_id, limit, status)
+    return SimilarJobsResponse(job_id=job_id, results=results)
 
 
 @router.put("/{job_id}", response_model=JobResponse)
-async def update_job(job_id: str, req: JobUpdate, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+async def update_job(job_id: str, req: JobUpdate, db: AsyncSession = Depends(get_async_db)):
+    job = await _get_job_or_404(job_id, db)
 
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     update_data = req.model_dump(exclude_unset=True)
+    canonical = job.canonical_url
+    if "url" in update_data:
+        canonical = canonical_url(update_data["url"])
+        await _check_url_free(canonical, db, job_id)
+        job.canonical_url = canonical
     for key, value in update_data.items():
         setattr(job, key, value)
     job.updated_at = now
 
-    db.commit()
-    db.refresh(job)
-    return _job_to_response(job, db)
+    await _commit_url_claim(canonical, db, job_id)
+    await db.refresh(job)
+    return await _job_to_response(job, db)
 
 
 @router.delete("/{job_id}")
-async def delete_job(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    db.delete(job)
-    db.commit()
+async def delete_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await _get_job_or_404(job_id, db)
+    await db.delete(job)
+    # Deleting the documents releases their blob references (triggers);
+    # files nobody references any more are removed in the background.
+    db.add(new_task("collect_blobs", {}))
+    await db.commit()
+    task_queue.notify()
     return {"message": "Job deleted"}
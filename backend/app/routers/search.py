@@ -12,7 +12,7 @@ router = APIRouter(
 
 
 @router.get("", response_model=SearchResponse)
-async def search(
+def search(
     q: str = Query(..., min_length=1),
     scope: str = Query("all", pattern="^(all|jobs|captures)$"),
     page: int = Query(1, ge=1),
@@ -20,7 +20,7 @@ async def search(
 ):
     offset = (page - 1) * per_page
     try:
-        results = search_fts(q, scope=scope, limit=per_page, offset=offset)
+        results, total = search_fts(q, scope=scope, limit=per_page, offset=offset)
     except ValueError as exc:
         # Security: return 400 for malformed FTS queries.
         # Improvement: avoids 500s from invalid user input.
@@ -38,6 +38,6 @@ async def search(
             )
             for r in results
         ],
-        total=len(results),
+        total=total,
         query=q,
     )
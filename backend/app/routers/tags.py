@@ -1,9 +1,9 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.dependencies import require_unlocked_vault
 from app.models.job import Job
 from app.models.tag import Tag, job_tags
@@ -16,51 +16,51 @@ router = APIRouter(
 )
 
 
-def _tag_to_response(tag: Tag, db: Session) -> TagResponse:
-    count = db.query(func.count(job_tags.c.job_id)).filter(job_tags.c.tag_id == tag.id).scalar()
+async def _tag_to_response(tag: Tag, db: AsyncSession) -> TagResponse:
+    count = await db.scalar(select(func.count(job_tags.c.job_id)).where(job_tags.c.tag_id == tag.id))
     return TagResponse(id=tag.id, name=tag.name, color=tag.color, job_count=count)
 
 
 @router.post("", response_model=TagResponse, status_code=201)
-async def create_tag(req: TagCreate, db: Session = Depends(get_db)):
-    existing = db.query(Tag).filter(Tag.name == req.name).first()
+async def create_tag(req: TagCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(Tag).where(Tag.name == req.name))
     if existing:
         raise HTTPException(status_code=409, detail="Tag already exists")
 
     tag = Tag(id=str(uuid.uuid4()), name=req.name, color=req.color)
     db.add(tag)
-    db.commit()
-    db.refresh(tag)
-    return _tag_to_response(tag, db)
+    await db.commit()
+    await db.refresh(tag)
+    return await _tag_to_response(tag, db)
 
 
 @router.get("", response_model=list[TagResponse])
-async def list_tags(db: Session = Depends(get_db)):
-    tags = db.query(Tag).order_by(Tag.name).all()
-    return [_tag_to_response(t, db) for t in tags]
+async def list_tags(db: AsyncSession = Depends(get_async_db)):
+    tags = (await db.scalars(select(Tag).order_by(Tag.name))).all()
+    return [await _tag_to_response(t, db) for t in tags]
 
 
 @router.put("/{tag_id}", response_model=TagResponse)
-async def update_tag(tag_id: str, req: TagUpdate, db: Session = Depends(get_db)):
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+async def update_tag(tag_id: str, req: TagUpdate, db: AsyncSession = Depends(get_async_db)):
+    tag = await db.get(Tag, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     if req.name is not None:
         tag.name = req.name
     if req.color is not None:
         tag.color = req.color
-    db.commit()
-    db.refresh(tag)
-    return _tag_to_response(tag, db)
+    await db.commit()
+    await db.refresh(tag)
+    return await _tag_to_response(tag, db)
 
 
 @router.delete("/{tag_id}")
-async def delete_tag(tag_id: str, db: Session = Depends(get_db)):
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+async def delete_tag(tag_id: str, db: AsyncSession = Depends(get_async_db)):
+    tag = await db.get(Tag, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    db.delete(tag)
-    db.commit()
+    await db.delete(tag)
+    await db.commit()
     return {"message": "Tag deleted"}
 
 
@@ -73,35 +73,40 @@ tag_jobs_router = APIRouter(
 
 
 @tag_jobs_router.post("", status_code=201)
-async def add_tag_to_job(job_id: str, req: TagCreate, db: Session = Depends(get_db)):
+async def add_tag_to_job(job_id: str, req: TagCreate, db: AsyncSession = Depends(get_async_db)):
     """Associate an existing tag with a job. req.name is used to find the tag."""
-    job = db.query(Job).filter(Job.id == job_id).first()
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    tag = db.query(Tag).filter(Tag.name == req.name).first()
+    tag = await db.scalar(select(Tag).where(Tag.name == req.name))
     if not tag:
         # Create tag if it doesn't exist
         tag = Tag(id=str(uuid.uuid4()), name=req.name, color=req.color)
         db.add(tag)
-
-    if tag not in job.tags:
-        job.tags.append(tag)
-    db.commit()
+        await db.flush()
+
+    linked = await db.scalar(
+        select(job_tags.c.tag_id).where(job_tags.c.job_id == job_id, job_tags.c.tag_id == tag.id)
+    )
+    if not linked:
+        await db.execute(insert(job_tags).values(job_id=job_id, tag_id=tag.id))
+    await db.commit()
     return {"message": f"Tag '{req.name}' added to job"}
 
 
 @tag_jobs_router.delete("/{tag_id}")
-async def remove_tag_from_job(job_id: str, tag_id: str, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def remove_tag_from_job(job_id: str, tag_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    tag = await db.get(Tag, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
 
-    if tag in job.tags:
-        job.tags.remove(tag)
-    db.commit()
+    await db.execute(
+        delete(job_tags).where(job_tags.c.job_id == job_id, job_tags.c.tag_id == tag_id)
+    )
+    await db.commit()
     return {"message": "Tag removed from job"}
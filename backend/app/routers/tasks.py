@@ -0,0 +1,31 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.dependencies import require_unlocked_vault
+from app.models.task import Task
+from app.schemas.task import TaskResponse
+
+router = APIRouter(prefix="/tasks", tags=["tasks"], dependencies=[Depends(require_unlocked_vault)])
+
+
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return TaskResponse(
+        id=task.id,
+        kind=task.kind,
+        status=task.status,
+        priority=task.priority,
+        attempts=task.attempts,
+        max_attempts=task.max_attempts,
+        result=json.loads(task.result) if task.result else None,
+        error=task.error,
+        created_at=task.created_at,
+        updated_at=task.updated_at,
+        finished_at=task.finished_at,
+    )
@@ -19,9 +19,12 @@ from app.services.vault_service import vault_service
 
 router = APIRouter(prefix="/vault", tags=["vault"])
 
+# Handlers that hash passphrases (Argon2) or use the sync session are plain
+# ``def`` so FastAPI runs them in its threadpool, off the event loop.
+
 
 @router.get("/status", response_model=VaultStatusResponse)
-async def vault_status(db: Session = Depends(get_db)):
+def vault_status(db: Session = Depends(get_db)):
     return VaultStatusResponse(
         initialized=vault_service.is_initialized(db),
         locked=vault_service.is_locked,
@@ -29,7 +32,7 @@ async def vault_status(db: Session = Depends(get_db)):
 
 
 @router.post("/setup", response_model=VaultSetupResponse)
-async def vault_setup(req: VaultSetupRequest, db: Session = Depends(get_db)):
+def vault_setup(req: VaultSetupRequest, db: Session = Depends(get_db)):
     if vault_service.is_initialized(db):
         raise HTTPException(status_code=409, detail="Vault already initialized")
     if len(req.passphrase) < 8:
@@ -44,7 +47,7 @@ async def vault_setup(req: VaultSetupRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/unlock", response_model=VaultUnlockResponse | VaultThrottleResponse)
-async def vault_unlock(req: VaultUnlockRequest, request: Request, db: Session = Depends(get_db)):
+def vault_unlock(req: VaultUnlockRequest, request: Request, db: Session = Depends(get_db)):
     if not vault_service.is_initialized(db):
         raise HTTPException(status_code=404, detail="Vault not initialized")
     if not req.passphrase and not req.recovery_key:
@@ -62,7 +65,7 @@ async def vault_unlock(req: VaultUnlockRequest, request: Request, db: Session =
 
 
 @router.post("/export-token", response_model=VaultExportTokenResponse | VaultThrottleResponse)
-async def vault_export_token(req: VaultExportTokenRequest, request: Request, db: Session = Depends(get_db)):
+def vault_export_token(req: VaultExportTokenRequest, request: Request, db: Session = Depends(get_db)):
     # Security: require passphrase or recovery key to obtain short-lived export token.
     # Improvement: backup/export endpoints are gated behind explicit re-auth.
     if not vault_service.is_initialized(db):
@@ -88,7 +91,7 @@ async def vault_lock(_token: str = Depends(require_unlocked_vault)):
 
 
 @router.put("/settings")
-async def vault_settings(
+def vault_settings(
     req: VaultSettingsUpdate,
     _token: str = Depends(require_unlocked_vault),
     db: Session = Depends(get_db),
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class BackupManifestEntry(BaseModel):
+    size: int
+    mtime_ns: int
+    sha256: str | None = None
+
+
+class BackupManifest(BaseModel):
+    version: str = "1"
+    kind: str = "full"
+    created_at: str | None = None
+    base_created_at: str | None = None
+    files: dict[str, BackupManifestEntry]
+    deleted: list[str] = []
@@ -17,6 +17,7 @@ class CaptureResponse(BaseModel):
     text_snapshot: str | None
     html_path: str | None
     pdf_path: str | None
+    pdf_status: str | None = None
     capture_method: str
     captured_at: str
 
@@ -31,6 +32,7 @@ class QuickCaptureRequest(BaseModel):
     organisation: str | None = None
     location: str | None = None
     deadline: str | None = None  # e.g. "March 15, 2026" or "2026-03-15"
+    allow_duplicate: bool = False  # skip the near-duplicate text check (not the URL check)
 
 
 class QuickCaptureResponse(BaseModel):
@@ -38,5 +40,12 @@ class QuickCaptureResponse(BaseModel):
     capture: CaptureResponse
 
 
+class CaptureLookupResponse(BaseModel):
+    url: str
+    canonical_url: str | None  # None if the URL is not a web page
+    job: "JobResponse | None"  # the job already holding this page, if any
+
+
 from app.schemas.job import JobResponse
 QuickCaptureResponse.model_rebuild()
+CaptureLookupResponse.model_rebuild()
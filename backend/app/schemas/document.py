@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class DocumentResponse(BaseModel):
@@ -13,3 +13,25 @@ class DocumentResponse(BaseModel):
     mime_type: str | None
     created_at: str
     submitted_at: str | None
+
+
+class MatchAllRequest(BaseModel):
+    limit: int = Field(10, ge=1, le=100)
+    statuses: list[str] | None = None
+
+
+class JobMatch(BaseModel):
+    job_id: str
+    title: str
+    organisation: str | None
+    status: str
+    score: float
+    matched: list[str]
+    missing: list[str]
+    job_keyword_count: int
+
+
+class MatchAllResponse(BaseModel):
+    document_id: str
+    doc_keyword_count: int
+    results: list[JobMatch]
@@ -0,0 +1,39 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class ImportCapture(BaseModel):
+    url: str | None = None
+    page_title: str | None = None
+    text_snapshot: str | None = None
+    capture_method: Literal[
+        "structured", "generic_html", "dom_render", "text_selection", "pdf_snapshot", "manual_paste",
+    ] = "manual_paste"
+
+
+class ImportJobRecord(BaseModel):
+    """One line of an NDJSON import: a job with any captures of its posting."""
+    title: str
+    organisation: str | None = None
+    url: str | None = None
+    location: str | None = None
+    salary_range: str | None = None
+    deadline_type: Literal["fixed", "rolling", "unknown"] = "unknown"
+    deadline_date: str | None = None
+    status: Literal[
+        "SAVED", "SHORTLISTED", "DRAFTING", "SUBMITTED", "INTERVIEW", "OFFER", "REJECTED", "WITHDRAWN", "EXPIRED",
+    ] = "SAVED"
+    notes: str | None = None
+    captures: list[ImportCapture] = []
+
+
+class ImportRecordError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    jobs: int
+    captures: int
+    errors: list[ImportRecordError]
@@ -45,6 +45,22 @@ class JobResponse(BaseModel):
 
 class JobListResponse(BaseModel):
     jobs: list[JobResponse]
-    total: int
+    total: int | None
     page: int
     per_page: int
+    next_cursor: str | None = None
+    total_is_estimate: bool = False
+
+
+class SimilarJob(BaseModel):
+    job_id: str
+    title: str
+    organisation: str | None
+    status: str
+    similarity: float
+    shared_keywords: list[str]
+
+
+class SimilarJobsResponse(BaseModel):
+    job_id: str
+    results: list[SimilarJob]
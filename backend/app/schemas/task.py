@@ -0,0 +1,22 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class TaskResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    result: Any | None
+    error: str | None
+    created_at: str
+    updated_at: str
+    finished_at: str | None
+
+
+class TaskQueuedResponse(BaseModel):
+    task_id: str
+    status: str
@@ -2,28 +2,171 @@ import csv
 import io
 import json
 import sqlite3
+import tempfile
 import zipfile
+from collections.abc import Iterator
+from datetime import datetime, timezone
 from pathlib import Path
+from urllib.parse import quote
 
 from app.config import settings
+from app.database import read_connection
 
 
-def export_vault_zip() -> io.BytesIO:
-    buf = io.BytesIO()
+# Formats that are already compressed gain nothing from deflate; store them as-is.
+_PRECOMPRESSED_SUFFIXES = {
+    ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".zip", ".gz", ".zst",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".epub",
+}
+_ZIP_CHUNK_BYTES = 1024 * 1024
+# Pages copied per online-backup step; the source lock is released between steps.
+_SNAPSHOT_PAGES_PER_STEP = 1024
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that zipfile streams into.
+
+    Being non-seekable makes zipfile emit data descriptors instead of
+    seeking back to patch headers, so output can be drained as it is written.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def snapshot_database(dest: Path, db_path: Path | None = None) -> Path:
+    """Copy the live database to ``dest`` as a consistent point-in-time snapshot.
+
+    Uses the SQLite online backup API in small steps, so WAL writers are
+    never blocked for the whole copy and committed WAL frames are included.
+    """
+    src_path = db_path or settings.db_path
+    src = sqlite3.connect(f"file:{quote(str(src_path))}?mode=ro", uri=True)
+    dst = sqlite3.connect(str(dest))
+    try:
+        src.backup(dst, pages=_SNAPSHOT_PAGES_PER_STEP)
+        # A standalone rollback-journal file is easier to restore than WAL.
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+        src.close()
+    return dest
+
+
+def _zip_file(zf: zipfile.ZipFile, sink: _ZipSink, file_path: Path, arcname: str,
+              suffix: str | None = None) -> Iterator[bytes]:
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    if (suffix or file_path.suffix).lower() in _PRECOMPRESSED_SUFFIXES:
+        zinfo.compress_type = zipfile.ZIP_STORED
+    else:
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+    # Always write ZIP64 local headers so a >4 GiB entry never fails mid-stream.
+    with open(file_path, "rb") as src, zf.open(zinfo, "w", force_zip64=True) as dst:
+        while chunk := src.read(_ZIP_CHUNK_BYTES):
+            dst.write(chunk)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+MANIFEST_NAME = "backup_manifest.json"
+
+
+def _document_index(snapshot: Path) -> dict[str, tuple[str, str]]:
+    """Map stored_path to (file_hash, original suffix); blobs carry no extension of their own."""
+    conn = sqlite3.connect(str(snapshot))
+    try:
+        return {
+            stored_path: (file_hash, Path(filename).suffix)
+            for stored_path, file_hash, filename in conn.execute(
+                "SELECT stored_path, file_hash, original_filename FROM documents"
+            )
+        }
+    finally:
+        conn.close()
+
+
+def _unchanged(entry: dict, previous: dict | None) -> bool:
+    if previous is None or previous.get("size") != entry["size"]:
+        return False
+    if entry.get("sha256"):
+        # Stored documents are immutable; the recorded hash is authoritative.
+        return previous.get("sha256") == entry["sha256"]
+    return previous.get("mtime_ns") == entry["mtime_ns"]
+
+
+def export_vault_zip(previous_manifest: dict | None = None) -> Iterator[bytes]:
+    """Yield a ZIP64 archive of the vault chunk by chunk, one source chunk at a time.
+
+    The database is archived from an online snapshot taken when the export
+    starts, never from the live ``db.sqlite`` and its WAL/SHM files. Every
+    archive carries a manifest of the vault's files. Given the manifest of
+    an earlier backup, only new or changed files are included (plus the
+    database snapshot and a fresh manifest); documents are compared by
+    their recorded ``file_hash`` and other files by size and mtime.
+    """
     vault_path = settings.vault_path
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for file_path in vault_path.rglob("*"):
-            if file_path.is_file():
-                arcname = file_path.relative_to(vault_path)
-                zf.write(file_path, arcname)
-    buf.seek(0)
-    return buf
+    db_path = settings.db_path
+    live_db_files = {db_path.name + suffix for suffix in ("", "-wal", "-shm", "-journal")}
+    previous_files = (previous_manifest or {}).get("files", {})
+    files: dict[str, dict] = {}
+    sink = _ZipSink()
+    with tempfile.TemporaryDirectory(prefix="vault_backup_") as tmp:
+        snapshot = snapshot_database(Path(tmp) / db_path.name, db_path)
+        documents = _document_index(snapshot)
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            yield from _zip_file(zf, sink, snapshot, db_path.relative_to(vault_path).as_posix())
+            for file_path in sorted(vault_path.rglob("*")):
+                if not file_path.is_file():
+                    continue
+                if file_path.parent == db_path.parent and file_path.name in live_db_files:
+                    continue
+                if file_path.name.startswith(".upload-"):
+                    continue  # upload still streaming into the blob store
+                arcname = file_path.relative_to(vault_path).as_posix()
+                stat = file_path.stat()
+                file_hash, suffix = documents.get(arcname, (None, None))
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_hash}
+                files[arcname] = entry
+                if previous_manifest is not None and _unchanged(entry, previous_files.get(arcname)):
+                    continue
+                yield from _zip_file(zf, sink, file_path, arcname, suffix)
 
+            manifest = {
+                "version": "1",
+                "kind": "incremental" if previous_manifest is not None else "full",
+                "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "base_created_at": (previous_manifest or {}).get("created_at"),
+                "files": files,
+                "deleted": sorted(set(previous_files) - set(files)),
+            }
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1))
+        # Central directory is written when the archive closes.
+        yield sink.drain()
 
-def export_csv() -> str:
-    conn = sqlite3.connect(str(settings.db_path))
-    conn.row_factory = sqlite3.Row
 
+def export_csv() -> str:
     output = io.StringIO()
     writer = csv.writer(output)
 
@@ -32,40 +175,76 @@ def export_csv() -> str:
         "job_id", "title", "organisation", "url", "location", "salary_range",
         "deadline_type", "deadline_date", "status", "notes", "created_at", "updated_at",
     ])
-    for row in conn.execute("SELECT * FROM jobs ORDER BY created_at DESC"):
-        writer.writerow([
-            row["id"], row["title"], row["organisation"], row["url"],
-            row["location"], row["salary_range"], row["deadline_type"],
-            row["deadline_date"], row["status"], row["notes"],
-            row["created_at"], row["updated_at"],
-        ])
-
-    conn.close()
+    with read_connection() as conn:
+        for row in conn.execute("SELECT * FROM jobs ORDER BY created_at DESC"):
+            writer.writerow([
+                row["id"], row["title"], row["organisation"], row["url"],
+                row["location"], row["salary_range"], row["deadline_type"],
+                row["deadline_date"], row["status"], row["notes"],
+                row["created_at"], row["updated_at"],
+            ])
+
     return output.getvalue()
 
 
-def export_json() -> dict:
-    conn = sqlite3.connect(str(settings.db_path))
-    conn.row_factory = sqlite3.Row
-
-    data = {"version": "1", "jobs": [], "tags": []}
-
-    for job_row in conn.execute("SELECT * FROM jobs ORDER BY created_at DESC"):
-        job = dict(job_row)
-        job["captures"] = [dict(r) for r in conn.execute(
-            "SELECT * FROM captures WHERE job_id = ? ORDER BY captured_at", (job["id"],)
-        )]
-        job["events"] = [dict(r) for r in conn.execute(
-            "SELECT * FROM events WHERE job_id = ? ORDER BY occurred_at", (job["id"],)
-        )]
-        job["documents"] = [dict(r) for r in conn.execute(
-            "SELECT * FROM documents WHERE job_id = ? ORDER BY created_at", (job["id"],)
-        )]
-        job["tags"] = [dict(r) for r in conn.execute(
-            "SELECT t.* FROM tags t JOIN job_tags jt ON t.id = jt.tag_id WHERE jt.job_id = ?", (job["id"],)
-        )]
-        data["jobs"].append(job)
-
-    data["tags"] = [dict(r) for r in conn.execute("SELECT * FROM tags ORDER BY name")]
-    conn.close()
-    return data
+# Child rows are read in the same job order as the jobs query, so each
+# table is a single ordered pass that can be merge-joined on job_id.
+_JOB_ORDER = "j.created_at DESC, j.id"
+_EXPORT_CHILD_QUERIES = {
+    "captures": f"SELECT c.job_id AS _job_id, c.*, snapshot_text(t.codec, t.body) AS text_snapshot "
+                f"FROM captures c JOIN jobs j ON j.id = c.job_id LEFT JOIN capture_texts t ON t.capture_id = c.id "
+                f"ORDER BY {_JOB_ORDER}, c.captured_at",
+    "events": f"SELECT e.job_id AS _job_id, e.* FROM events e JOIN jobs j ON j.id = e.job_id "
+              f"ORDER BY {_JOB_ORDER}, e.occurred_at",
+    "documents": f"SELECT d.job_id AS _job_id, d.* FROM documents d JOIN jobs j ON j.id = d.job_id "
+                 f"ORDER BY {_JOB_ORDER}, d.created_at",
+    "tags": f"SELECT jt.job_id AS _job_id, t.* FROM job_tags jt JOIN tags t ON t.id = jt.tag_id "
+            f"JOIN jobs j ON j.id = jt.job_id ORDER BY {_JOB_ORDER}, t.name",
+}
+
+
+# Derived from other columns (and binary), so rebuilt on import rather than exported.
+_DERIVED_COLUMNS = ("_job_id", "fingerprint", "canonical_url")
+
+
+class _ChildRows:
+    """Peekable cursor over child rows ordered like the jobs query."""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        self._next = cursor.fetchone()
+
+    def take(self, job_id: str) -> list[dict]:
+        rows = []
+        while self._next is not None and self._next["_job_id"] == job_id:
+            row = dict(self._next)
+            for column in _DERIVED_COLUMNS:
+                row.pop(column, None)
+            rows.append(row)
+            self._next = self._cursor.fetchone()
+        return rows
+
+
+def export_json() -> Iterator[str]:
+    """Stream the vault as a JSON document, one job at a time.
+
+    Runs one query per table for the whole vault and merge-joins child rows
+    onto their job, so memory stays flat regardless of vault size.
+    """
+    with read_connection() as conn:
+        # One read transaction so the export is a consistent snapshot.
+        conn.execute("BEGIN")
+        children = {
+            name: _ChildRows(conn.execute(sql)) for name, sql in _EXPORT_CHILD_QUERIES.items()
+        }
+        yield '{"version": "1", "jobs": ['
+        first = True
+        for job_row in conn.execute(f"SELECT j.* FROM jobs j ORDER BY {_JOB_ORDER}"):
+            job = dict(job_row)
+            job.pop("canonical_url", None)
+            for name, rows in children.items():
+                job[name] = rows.take(job["id"])
+            yield ("" if first else ", ") + json.dumps(job)
+            first = False
+        tags = [dict(r) for r in conn.execute("SELECT * FROM tags ORDER BY name")]
+        yield '], "tags": ' + json.dumps(tags) + "}"
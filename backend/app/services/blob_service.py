@@ -0,0 +1,161 @@
+"""
+Content-addressed blob store for document files.
+
+Every stored document lives once under ``blobs/<hash[:2]>/<hash>`` no matter
+how many jobs it is attached to; ``documents.stored_path`` points there. The
+``blobs`` table keeps a reference count per hash, maintained by triggers on
+``documents`` (including cascaded deletes from ``jobs``). Files whose count
+drops to zero are removed by ``collect_blobs``, which runs on the task queue.
+
+Writers must insert the document row *before* placing the file and commit
+afterwards: ``collect_blobs`` holds the write lock while it unlinks, so it
+can never see a placed file whose reference is not yet committed.
+
+Existing vaults (one copy per job under ``jobs/<id>/documents/``) are
+converted with::
+
+    python -m app.services.blob_service [--vault-path PATH]
+
+Stop the backend first; the migration assumes it is the only writer.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+from app.config import settings
+from app.services.task_service import TaskContext, task_handler
+from app.utils.filesystem import ensure_blobs_dir
+from app.utils.hashing import sha256_file
+
+
+def blob_path(file_hash: str) -> str:
+    """Vault-relative path of the blob for ``file_hash``."""
+    return f"blobs/{file_hash[:2]}/{file_hash}"
+
+
+def place_blob(src: Path, file_hash: str, vault_path: Path) -> bool:
+    """Move ``src`` into the store. Returns False (and drops ``src``) if the blob already exists."""
+    dest = vault_path / blob_path(file_hash)
+    if dest.exists():
+        src.unlink()
+        return False
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.chmod(src, 0o444)
+    os.replace(src, dest)
+    return True
+
+
+def collect_blobs(db_path: Path, vault_path: Path, candidates: list[str] | tuple[str, ...] = ()) -> int:
+    """Delete unreferenced blobs. Returns how many files were removed.
+
+    Blobs whose refcount reached zero are always collected; ``candidates``
+    are hashes a failed write may have placed without a committed reference.
+    """
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            dead = [h for (h,) in conn.execute("SELECT hash FROM blobs WHERE refcount <= 0")]
+            if candidates:
+                placeholders = ", ".join("?" * len(candidates))
+                known = {h for (h,) in conn.execute(
+                    f"SELECT hash FROM blobs WHERE hash IN ({placeholders})", list(candidates),
+                )}
+                dead.extend(h for h in candidates if h not in known)
+            removed = 0
+            for file_hash in dead:
+                conn.execute("DELETE FROM blobs WHERE hash = ?", (file_hash,))
+                conn.execute("DELETE FROM document_texts WHERE file_hash = ?", (file_hash,))
+                path = vault_path / blob_path(file_hash)
+                if path.exists():
+                    path.unlink()
+                    removed += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return removed
+
+
+@task_handler("collect_blobs", pool="io")
+def collect_blobs_task(ctx: TaskContext) -> dict:
+    return {"removed": collect_blobs(ctx.db_path, ctx.vault_path)}
+
+
+def migrate_vault(vault_path: Path) -> dict[str, int]:
+    """Move per-job document copies into the blob store, deduplicating by hash.
+
+    Idempotent: rows already pointing into ``blobs/`` are skipped. Files whose
+    content no longer matches the recorded hash are left where they are (the
+    verify endpoint will report them). Reference counts are rebuilt at the end.
+    """
+    from app.database import run_migrations
+
+    db_path = vault_path / settings.db_path.name
+    ensure_blobs_dir(vault_path)
+    stats = {"migrated": 0, "deduplicated": 0, "bytes_reclaimed": 0, "missing": 0, "mismatched": 0}
+
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        run_migrations(conn)  # an old vault may predate the blobs table
+        rows = conn.execute(
+            "SELECT id, stored_path, file_hash, file_size_bytes FROM documents "
+            "WHERE stored_path NOT LIKE 'blobs/%' ORDER BY created_at"
+        ).fetchall()
+        for doc_id, stored_path, file_hash, size in rows:
+            src = vault_path / stored_path
+            if not src.exists():
+                stats["missing"] += 1
+                continue
+            if sha256_file(src) != file_hash:
+                stats["mismatched"] += 1
+                continue
+            dest = vault_path / blob_path(file_hash)
+            if dest.exists():
+                stats["deduplicated"] += 1
+                stats["bytes_reclaimed"] += size
+            else:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(src, dest)
+                except OSError:
+                    shutil.copy2(src, dest)
+                os.chmod(dest, 0o444)
+            # Repoint the row before dropping the old copy so a crash never loses data
+            with conn:
+                conn.execute("UPDATE documents SET stored_path = ? WHERE id = ?", (blob_path(file_hash), doc_id))
+            src.unlink()
+            stats["migrated"] += 1
+
+        with conn:
+            conn.execute("DELETE FROM blobs")
+            conn.execute(
+                "INSERT INTO blobs (hash, size_bytes, refcount) "
+                "SELECT file_hash, MAX(file_size_bytes), COUNT(*) FROM documents "
+                "WHERE stored_path LIKE 'blobs/%' GROUP BY file_hash"
+            )
+        referenced = {h for (h,) in conn.execute("SELECT hash FROM blobs")}
+    finally:
+        conn.close()
+
+    # Offline, so any file without a reference (or a stale upload temp) is garbage.
+    for path in (vault_path / "blobs").rglob("*"):
+        if path.is_file() and path.name not in referenced:
+            path.unlink()
+    return stats
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Deduplicate stored documents into the vault's blob store.")
+    parser.add_argument("--vault-path", type=Path, default=settings.vault_path)
+    args = parser.parse_args(argv)
+    print(json.dumps(migrate_vault(args.vault_path), indent=1))
+
+
+if __name__ == "__main__":
+    main()
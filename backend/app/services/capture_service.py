@@ -1,11 +1,110 @@
-from pathlib import Path
-from app.config import settings
+import uuid
+
+from app.models.capture_text import capture_texts
+from app.services.blob_service import collect_blobs
+from app.services.document_service import PendingDocument
+from app.services.pdf_service import generate_capture_pdf
+from app.services.task_service import TaskContext, task_handler
+from app.utils.compression import compress_text, decompress_text, write_gzip
 from app.utils.filesystem import ensure_job_dirs
 
 
 def store_html_snapshot(job_id: str, capture_id: str, html_content: str) -> str:
     job_dir = ensure_job_dirs(job_id)
-    filename = f"{capture_id}.html"
-    filepath = job_dir / "captures" / filename
-    filepath.write_text(html_content, encoding="utf-8")
+    filename = f"{capture_id}.html.gz"
+    write_gzip(job_dir / "captures" / filename, html_content.encode("utf-8"))
     return f"jobs/{job_id}/captures/{filename}"
+
+
+def capture_text_insert(capture_id: str, text: str):
+    """Statement storing a capture's text snapshot, compressed (run after the capture insert)."""
+    codec, body = compress_text(text)
+    return capture_texts.insert().values(capture_id=capture_id, codec=codec, body=body)
+
+
+@task_handler("compress_html_snapshots", pool="io")
+def compress_html_snapshots_task(ctx: TaskContext) -> dict:
+    """Gzip HTML snapshots stored uncompressed before v0.15."""
+    conn = ctx.connect()
+    try:
+        rows = conn.execute("SELECT id, html_path FROM captures WHERE html_path LIKE '%.html'").fetchall()
+        for capture_id, html_path in rows:
+            src = ctx.vault_path / html_path
+            if src.exists():
+                write_gzip(src.with_name(src.name + ".gz"), src.read_bytes())
+            with conn:
+                conn.execute("UPDATE captures SET html_path = ? WHERE id = ?", (html_path + ".gz", capture_id))
+            src.unlink(missing_ok=True)
+        return {"compressed": len(rows)}
+    finally:
+        conn.close()
+
+
+def capture_pdf_filename(title: str) -> str:
+    safe_title = "".join(c for c in title[:40] if c.isalnum() or c in " -_").strip().replace(" ", "_")
+    return f"capture_{safe_title}.pdf"
+
+
+@task_handler("render_capture_pdf", pool="cpu")
+def render_capture_pdf(ctx: TaskContext) -> dict | None:
+    """Render and store a capture's PDF archive.
+
+    The capture row is committed with ``pdf_status='pending'``; it is flipped
+    to ``ready`` (with ``pdf_path`` set), or to ``failed`` once the task has
+    used its last attempt. The payload only names the capture; its text is
+    read back from ``capture_texts``. Runs in a worker process, so it talks
+    to SQLite directly instead of through the app's engine.
+    """
+    capture_id = ctx.payload["capture_id"]
+    conn = ctx.connect()
+    try:
+        row = conn.execute(
+            "SELECT c.job_id, c.url, c.captured_at, j.title, j.organisation, j.deadline_date, t.codec, t.body"
+            " FROM captures c JOIN jobs j ON j.id = c.job_id"
+            " LEFT JOIN capture_texts t ON t.capture_id = c.id WHERE c.id = ?",
+            (capture_id,),
+        ).fetchone()
+        if row is None:
+            return None  # job deleted before the render started
+        try:
+            pdf_bytes = generate_capture_pdf(
+                title=row["title"],
+                organisation=row["organisation"],
+                url=row["url"],
+                text_snapshot=decompress_text(row["codec"], row["body"]),
+                captured_at=row["captured_at"],
+                deadline=row["deadline_date"],
+            )
+            pdf_filename = capture_pdf_filename(row["title"])
+            pending = PendingDocument(ctx.vault_path)
+            try:
+                pending.write(pdf_bytes)
+                doc_id = str(uuid.uuid4())
+                with conn:
+                    updated = conn.execute(
+                        "UPDATE captures SET pdf_path = ?, pdf_status = 'ready' WHERE id = ?",
+                        (pending.stored_path, capture_id),
+                    ).rowcount
+                    if not updated:
+                        pending.discard()
+                        return None  # job deleted while rendering
+                    conn.execute(
+                        "INSERT INTO documents (id, job_id, original_filename, doc_type, stored_path,"
+                        " file_hash, file_size_bytes, mime_type, created_at)"
+                        " VALUES (?, ?, ?, 'job_posting', ?, ?, ?, 'application/pdf', ?)",
+                        (doc_id, row["job_id"], pdf_filename, pending.stored_path, pending.file_hash,
+                         pending.size, row["captured_at"]),
+                    )
+                    pending.commit()
+            except BaseException:
+                pending.discard()
+                collect_blobs(ctx.db_path, ctx.vault_path, [pending.file_hash])
+                raise
+            return {"document_id": doc_id, "pdf_path": pending.stored_path}
+        except Exception:
+            if ctx.is_last_attempt:
+                with conn:
+                    conn.execute("UPDATE captures SET pdf_status = 'failed' WHERE id = ?", (capture_id,))
+            raise
+    finally:
+        conn.close()
@@ -1,24 +1,80 @@
+import hashlib
 import os
+import tempfile
 from pathlib import Path
 
-from app.utils.filesystem import ensure_job_dirs, sanitize_filename
-from app.utils.hashing import sha256_bytes
+from app.config import settings
+from app.services.blob_service import blob_path, place_blob
+from app.services.task_service import TaskContext, task_handler
+from app.utils.filesystem import ensure_blobs_dir
+from app.utils.hashing import sha256_file
 
 
-def store_document(job_id: str, filename: str, content: bytes) -> tuple[str, str, int]:
-    """Store a document immutably. Returns (relative_path, file_hash, file_size)."""
-    file_hash = sha256_bytes(content)
-    safe_name = sanitize_filename(filename)
-    stored_name = f"{file_hash[:8]}_{safe_name}"
+class PendingDocument:
+    """An upload being streamed into the vault's blob store.
 
-    job_dir = ensure_job_dirs(job_id)
-    doc_path = job_dir / "documents" / stored_name
-    doc_path.write_bytes(content)
-    os.chmod(doc_path, 0o444)
+    Chunks go to a hidden temp file under ``blobs/`` and are hashed as they
+    arrive, so only one chunk is ever held in memory. Nothing is visible
+    under its stored path until ``commit`` moves it into place; ``discard``
+    removes the temp file (e.g. for a rejected duplicate). Insert the
+    document row before committing the file -- see ``blob_service``.
+    """
 
-    relative_path = f"jobs/{job_id}/documents/{stored_name}"
-    return relative_path, file_hash, len(content)
+    def __init__(self, vault_path: Path | None = None):
+        self.vault_path = vault_path or settings.vault_path
+        fd, tmp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=ensure_blobs_dir(self.vault_path))
+        self._file = os.fdopen(fd, "wb")
+        self._tmp_path = Path(tmp_name)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def file_hash(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def stored_path(self) -> str:
+        return blob_path(self.file_hash)
+
+    def commit(self) -> str:
+        """Store immutably (or reuse an identical blob). Returns the relative stored path."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        place_blob(self._tmp_path, self.file_hash, self.vault_path)
+        return self.stored_path
+
+    def discard(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
 
 
 def get_document_full_path(stored_path: str, vault_path: Path) -> Path:
     return vault_path / stored_path
+
+
+@task_handler("verify_document", pool="io")
+def verify_document_task(ctx: TaskContext) -> dict:
+    """Background variant of GET .../verify for large files."""
+    conn = ctx.connect()
+    try:
+        doc = conn.execute(
+            "SELECT original_filename, stored_path, file_hash FROM documents WHERE id = ?",
+            (ctx.payload["document_id"],),
+        ).fetchone()
+    finally:
+        conn.close()
+    if doc is None:
+        raise LookupError("Document not found")
+    actual_hash = sha256_file(get_document_full_path(doc["stored_path"], ctx.vault_path))
+    return {
+        "verified": actual_hash == doc["file_hash"],
+        "filename": doc["original_filename"],
+        "stored_hash": doc["file_hash"],
+        "actual_hash": actual_hash,
+    }
@@ -0,0 +1,245 @@
+"""
+Sandboxed text extraction for stored documents.
+
+The format is chosen by sniffing the file's first bytes against a registry
+of extractors, never by trusting the declared MIME type. Parsers for
+untrusted binary formats run in spawn-context worker processes with a
+capped address space, at most ``extract_workers`` of them across all
+extractions. Each file gets its own pool and a wall-clock deadline, so on
+timeout only that file's workers are killed; the price is a process spawn
+per file, paid once since extracted text is cached. Paged formats read the first
+``extract_pages_per_task`` pages to learn the page count, then split the
+rest into one range per free worker: each call re-parses the whole file,
+so fewer, larger ranges keep that overhead to one parse per worker.
+"""
+import logging
+import multiprocessing
+import re
+import threading
+import time
+import zipfile
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger("app")
+
+SNIFF_BYTES = 8192
+
+
+class ExtractionError(Exception):
+    """Extraction crashed, ran out of memory, or missed its deadline; nothing should be cached."""
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+@dataclass(frozen=True)
+class Extractor:
+    name: str
+    sniff: Callable[[bytes], bool]
+    # (path, first unit, end unit or None) -> (text of those units, total units in the file)
+    extract: Callable[[str, int, int | None], tuple[str, int]]
+    isolated: bool = True
+
+
+_extractors: list[Extractor] = []
+
+
+def register_extractor(name: str, sniff: Callable[[bytes], bool], *, isolated: bool = True):
+    """Register a module-level extractor; earlier registrations win when several sniff true.
+
+    Isolated extractors are pickled by reference into worker processes, so
+    they must be importable top-level functions.
+    """
+    def decorator(fn):
+        _extractors.append(Extractor(name, sniff, fn, isolated))
+        return fn
+    return decorator
+
+
+def choose_extractor(head: bytes) -> Extractor | None:
+    for extractor in _extractors:
+        if extractor.sniff(head):
+            return extractor
+    return None
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if not head or b"\x00" in head:
+        return False
+    text = head.decode("utf-8", errors="ignore")
+    printable = sum(1 for c in text if c.isprintable() or c.isspace())
+    return len(text) > 0 and printable / len(text) > 0.85
+
+
+@register_extractor("pdf", lambda head: b"%PDF-" in head[:1024])
+def extract_pdf(path: str, start: int = 0, stop: int | None = None) -> tuple[str, int]:
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    total = len(reader.pages)
+    pages = [reader.pages[i].extract_text() or "" for i in range(start, min(stop or total, total))]
+    return "\n".join(pages), total
+
+
+_DOCX_PARAGRAPH = re.compile(r"</w:p>")
+_XML_TAG = re.compile(r"<[^>]+>")
+
+
+@register_extractor("docx", lambda head: head.startswith(b"PK\x03\x04"))
+def extract_docx(path: str, start: int = 0, stop: int | None = None) -> tuple[str, int]:
+    import html
+
+    with zipfile.ZipFile(path) as zf:
+        if "word/document.xml" not in zf.namelist():
+            return "", 1  # some other zip container
+        xml = zf.read("word/document.xml").decode("utf-8", errors="ignore")
+    text = _XML_TAG.sub("", _DOCX_PARAGRAPH.sub("\n", xml))
+    return html.unescape(text), 1
+
+
+@register_extractor("text", _looks_like_text, isolated=False)
+def extract_plain_text(path: str, start: int = 0, stop: int | None = None) -> tuple[str, int]:
+    return Path(path).read_text(encoding="utf-8", errors="ignore"), 1
+
+
+def _limit_memory(limit_bytes: int):
+    """Worker initializer: cap the address space so a decompression bomb hits MemoryError."""
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return
+    if limit_bytes > 0:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+        except (ValueError, OSError):
+            logger.warning("Could not cap extraction worker memory at %d bytes", limit_bytes)
+
+
+# Worker processes in use across all extractions, capped at ``extract_workers``.
+_slots = threading.Condition()
+_slots_used = 0
+_pools: set[ProcessPoolExecutor] = set()
+
+
+def _acquire_workers(wanted: int, block: bool) -> int:
+    """Reserve up to ``wanted`` worker slots; with ``block``, wait until at least one is free."""
+    global _slots_used
+    limit = max(settings.extract_workers, 1)
+    with _slots:
+        if block:
+            _slots.wait_for(lambda: _slots_used < limit)
+        granted = max(min(wanted, limit - _slots_used), 0)
+        _slots_used += granted
+        return granted
+
+
+def _release_workers(count: int):
+    global _slots_used
+    with _slots:
+        _slots_used -= count
+        _slots.notify_all()
+
+
+def _new_pool() -> ProcessPoolExecutor:
+    # spawn: forking a process that runs threads can deadlock the child. Spawned
+    # workers start on demand, so a pool never runs more than its reserved slots.
+    pool = ProcessPoolExecutor(
+        max_workers=max(settings.extract_workers, 1),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_limit_memory,
+        initargs=(settings.extract_memory_limit_mb * 1024 * 1024,),
+    )
+    with _slots:
+        _pools.add(pool)
+    return pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor, kill: bool):
+    """Shut ``pool`` down; with ``kill``, terminate its workers (a stuck parser never returns)."""
+    with _slots:
+        _pools.discard(pool)
+    if kill:
+        # ProcessPoolExecutor cannot cancel a running call; killing the worker is the only way.
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extraction_pools():
+    with _slots:
+        pools = list(_pools)
+    for pool in pools:
+        _discard_pool(pool, kill=True)
+
+
+def _submit(pool: ProcessPoolExecutor, extractor: Extractor, path: Path, start: int, stop: int) -> Future:
+    try:
+        return pool.submit(extractor.extract, str(path), start, stop)
+    except (BrokenProcessPool, RuntimeError) as exc:  # shut down with the app
+        raise ExtractionError(f"Extraction pool unavailable for {path.name}") from exc
+
+
+def _await(future: Future, deadline: float, pool: ProcessPoolExecutor, path: Path):
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+    except FutureTimeoutError:
+        # The pool belongs to this file alone, so only its own workers die.
+        _discard_pool(pool, kill=True)
+        raise ExtractionTimeout(
+            f"Extraction of {path.name} exceeded {settings.extract_timeout_seconds}s"
+        ) from None
+    except MemoryError:
+        raise ExtractionError(f"Extraction of {path.name} exceeded the memory limit") from None
+    except BrokenProcessPool as exc:
+        # The worker was OOM-killed, or the app is shutting down.
+        raise ExtractionError(f"Extraction worker died on {path.name}") from exc
+    except Exception as exc:
+        # The parser rejected the file: treat it as having no text, like a blank page.
+        logger.info("Could not parse %s: %s", path.name, exc)
+        return "", 0
+
+
+def extract_text(file_path: Path) -> str:
+    """Extract readable text from ``file_path``; empty if the format is unknown or unparseable.
+
+    Raises ``ExtractionError`` if a worker times out, runs out of memory or
+    dies, so callers can retry instead of caching an empty result.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    extractor = choose_extractor(head)
+    if extractor is None:
+        return ""
+    if not extractor.isolated:
+        return extractor.extract(str(file_path), 0, None)[0]
+
+    per_task = max(settings.extract_pages_per_task, 1)
+    workers = _acquire_workers(1, block=True)
+    deadline = time.monotonic() + settings.extract_timeout_seconds
+    pool = _new_pool()
+    try:
+        # The first chunk also reports the page count, so short files take one round trip.
+        text, total = _await(_submit(pool, extractor, file_path, 0, per_task), deadline, pool, file_path)
+        if total <= per_task:
+            return text
+        # Every call parses the whole file again, so the remaining pages go out
+        # as one contiguous range per worker rather than per_task at a time.
+        workers += _acquire_workers(settings.extract_workers - 1, block=False)
+        size = max(per_task, -(-(total - per_task) // workers))
+        futures = [
+            _submit(pool, extractor, file_path, start, start + size)
+            for start in range(per_task, total, size)
+        ]
+        parts = [text] + [_await(future, deadline, pool, file_path)[0] for future in futures]
+        return "\n".join(parts)
+    finally:
+        _discard_pool(pool, kill=False)
+        _release_workers(workers)
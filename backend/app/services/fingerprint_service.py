@@ -0,0 +1,143 @@
+"""
+Near-duplicate detection for captured postings.
+
+Each capture's text gets a MinHash signature over word shingles, stored in
+``captures.fingerprint``, and its signature is split into LSH bands whose
+hashes go in ``capture_bands``. Two captures land in the same bucket for at
+least one band with high probability once their shingle sets overlap by
+more than about 70%; candidates are then confirmed by comparing signatures.
+
+Signatures use one-permutation hashing: every shingle is hashed once and
+binned by its low bits, and empty bins borrow from the next filled one
+(rotation densification), so cost is linear in the text, not in the
+number of hash functions.
+"""
+import hashlib
+import re
+import sqlite3
+import struct
+
+from sqlalchemy import select, tuple_
+
+from app.config import settings
+from app.models.capture import Capture
+from app.models.capture_band import capture_bands
+from app.services.task_service import TaskContext, task_handler
+from app.utils.compression import decompress_text
+
+NUM_HASHES = 128
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_WORDS = 3
+# Shorter texts ("Python developer") collide by accident; they get no fingerprint.
+MIN_SHINGLES = 16
+
+_BIN_BITS = 7  # log2(NUM_HASHES)
+_VALUE_MASK = 0xFFFFFFFF
+_EMPTY = -1
+_GOLDEN = 0x9E3779B1
+_WORD = re.compile(r"\w+")
+_PACK = struct.Struct(f"<{NUM_HASHES}I")
+
+
+def _shingle_hashes(text: str) -> set[int]:
+    words = _WORD.findall(text.lower())
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode(), digest_size=8).digest(), "little")
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def fingerprint(text: str | None) -> bytes:
+    """MinHash signature of ``text`` (``NUM_HASHES`` little-endian uint32), or b"" if too short."""
+    hashes = _shingle_hashes(text or "")
+    if len(hashes) < MIN_SHINGLES:
+        return b""
+    bins = [_EMPTY] * NUM_HASHES
+    for h in hashes:
+        b, value = h & (NUM_HASHES - 1), (h >> _BIN_BITS) & _VALUE_MASK
+        if bins[b] == _EMPTY or value < bins[b]:
+            bins[b] = value
+    signature = list(bins)
+    for b in range(NUM_HASHES):
+        if bins[b] == _EMPTY:
+            # Borrow from the next filled bin, offset by distance so borrowed values stay distinct
+            step = next(step for step in range(1, NUM_HASHES) if bins[(b + step) % NUM_HASHES] != _EMPTY)
+            signature[b] = (bins[(b + step) % NUM_HASHES] + step * _GOLDEN) & _VALUE_MASK
+    return _PACK.pack(*signature)
+
+
+def band_keys(signature: bytes) -> list[tuple[int, int]]:
+    """(band, bucket) pairs for a signature; buckets are signed 64-bit for SQLite."""
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(signature[band * width:(band + 1) * width], digest_size=8).digest(),
+            "little", signed=True,
+        ))
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    if not a or not b:
+        return 0.0
+    return sum(x == y for x, y in zip(_PACK.unpack(a), _PACK.unpack(b))) / NUM_HASHES
+
+
+def capture_bands_insert(capture_id: str, signature: bytes):
+    """Statement indexing a capture's signature (run with the capture insert)."""
+    return capture_bands.insert().values([
+        {"band": band, "bucket": bucket, "capture_id": capture_id} for band, bucket in band_keys(signature)
+    ])
+
+
+def near_duplicate_query(signature: bytes):
+    """Captures sharing at least one LSH bucket with ``signature``: (capture_id, job_id, fingerprint)."""
+    return (
+        select(Capture.id, Capture.job_id, Capture.fingerprint)
+        .join(capture_bands, capture_bands.c.capture_id == Capture.id)
+        .where(tuple_(capture_bands.c.band, capture_bands.c.bucket).in_(band_keys(signature)))
+        .distinct()
+    )
+
+
+def best_match(signature: bytes, candidates) -> tuple[str, float] | None:
+    """The job of the most similar candidate at or above the duplicate threshold."""
+    best = None
+    for _, job_id, other in candidates:
+        score = similarity(signature, other)
+        if score >= settings.capture_duplicate_threshold and (best is None or score > best[1]):
+            best = (job_id, score)
+    return best
+
+
+def _fingerprint_batch(conn: sqlite3.Connection, limit: int) -> int:
+    rows = conn.execute(
+        "SELECT c.id, t.codec, t.body FROM captures c LEFT JOIN capture_texts t ON t.capture_id = c.id"
+        " WHERE c.fingerprint IS NULL LIMIT ?", (limit,),
+    ).fetchall()
+    with conn:
+        for capture_id, codec, body in rows:
+            signature = fingerprint(decompress_text(codec, body))
+            conn.execute("UPDATE captures SET fingerprint = ? WHERE id = ?", (signature, capture_id))
+            if signature:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO capture_bands (band, bucket, capture_id) VALUES (?, ?, ?)",
+                    [(band, bucket, capture_id) for band, bucket in band_keys(signature)],
+                )
+    return len(rows)
+
+
+@task_handler("fingerprint_captures", pool="io")
+def fingerprint_captures_task(ctx: TaskContext) -> dict:
+    """Fingerprint captures stored before near-duplicate detection existed."""
+    conn = ctx.connect()
+    try:
+        done = 0
+        while count := _fingerprint_batch(conn, 500):
+            done += count
+        return {"fingerprinted": done}
+    finally:
+        conn.close()
@@ -0,0 +1,265 @@
+"""
+Bulk import of jobs and captures from NDJSON, one job record per line.
+
+Records are validated as the body arrives and spooled to a temporary file
+next to the vault; the write transaction only opens once the whole body
+has been read, so a slow upload never holds the vault's write lock. The
+spooled records are then written in batches with ``executemany`` inside
+that one transaction, so an import lands completely or not at all.
+Invalid or duplicate records are reported by line number and skipped;
+they never abort the import.
+
+Per-row trigger work is deferred: the FTS insert triggers are dropped for
+the transaction and the new rows are indexed in one statement per index at
+the end (or the index is rebuilt outright when the import outgrows what
+was already there), and the match-term statistics are updated from totals
+instead of per term. Each
+job's match terms are stored with it, so matching needs no backfill.
+Fingerprints are left to the queued ``fingerprint_captures`` task, and no
+job directories are created until a job gets a file of its own.
+"""
+import sqlite3
+import tempfile
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+from pydantic import ValidationError
+
+from app.config import settings
+from app.database import register_sql_functions
+from app.schemas.imports import ImportJobRecord, ImportRecordError, ImportResult
+from app.services.match_service import TEXT_CACHE_VERSION, tokenize
+from app.utils.compression import compress_text
+from app.utils.urls import canonical_url
+
+# Records per executemany round.
+IMPORT_BATCH_SIZE = 500
+# Spooled records stay in memory up to this size, then move to a file.
+_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# An FTS index is rebuilt rather than extended once the import adds at least
+# this many rows per row already indexed.
+_FTS_REBUILD_RATIO = 1.0
+
+# Triggers doing per-row work for inserts; recreated before the import commits.
+_DEFERRED_TRIGGERS = ("jobs_ai", "captures_ai", "capture_texts_ai", "term_stats_ai", "job_term_changes_ai")
+
+
+def parse_import_record(line: bytes) -> ImportJobRecord:
+    """Decode and validate one NDJSON line. Raises ValueError with a readable message."""
+    try:
+        record = ImportJobRecord.model_validate(orjson.loads(line))
+    except orjson.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON: {exc}") from None
+    except ValidationError as exc:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'record'}: {err['msg']}" for err in exc.errors()
+        )) from None
+    for capture in record.captures:
+        if capture.text_snapshot and len(capture.text_snapshot) > settings.max_text_snapshot_chars:
+            raise ValueError("text_snapshot too large")
+    return record
+
+
+class BulkImporter:
+    """Collects validated records, then writes them into the vault in one transaction.
+
+    ``add`` and ``reject`` are cheap and run while the body streams in;
+    ``run`` does all the database work and belongs on a worker thread.
+    """
+
+    def __init__(self, db_path: Path | None = None):
+        self.db_path = db_path or settings.db_path
+        self.errors: list[ImportRecordError] = []
+        self.jobs = 0
+        self.captures = 0
+        self._spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES, dir=self.db_path.parent)
+        self._spooled = 0
+        self._seen: dict[str, int] = {}  # canonical URL -> line that claimed it
+        self._term_df: Counter[str] = Counter()
+        self._term_jobs: list[str] = []
+
+    def add(self, line: int, record: ImportJobRecord):
+        self._spool.write(orjson.dumps([line, record.model_dump()]) + b"\n")
+        self._spooled += 1
+
+    def reject(self, line: int, error: str):
+        self.errors.append(ImportRecordError(line=line, error=error))
+
+    def close(self):
+        self._spool.close()
+
+    def run(self) -> ImportResult:
+        """Write every spooled record, bring the deferred indexes up to date and commit."""
+        try:
+            if self._spooled:
+                self._write_all()
+        finally:
+            self.close()
+        return ImportResult(
+            jobs=self.jobs, captures=self.captures, errors=sorted(self.errors, key=lambda e: e.line),
+        )
+
+    def _write_all(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA foreign_keys=ON")
+            register_sql_functions(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # DDL is transactional in SQLite: other connections keep seeing
+                # the triggers, and a rollback restores them.
+                triggers = [sql for (sql,) in conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name IN (SELECT value FROM json_each(?))",
+                    (orjson.dumps(_DEFERRED_TRIGGERS).decode(),),
+                )]
+                for name in _DEFERRED_TRIGGERS:
+                    conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                before = {
+                    table: conn.execute(f"SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM {table}").fetchone()
+                    for table in ("jobs", "captures")
+                }
+
+                self._spool.seek(0)
+                batch = []
+                for raw in self._spool:
+                    line, data = orjson.loads(raw)
+                    batch.append((line, ImportJobRecord.model_validate(data)))
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        self._write_batch(conn, batch)
+                        batch = []
+                self._write_batch(conn, batch)
+
+                self._update_term_stats(conn)
+                self._index_new_rows(conn, before)
+                for sql in triggers:
+                    conn.execute(sql)
+                if self.captures:
+                    # Imported captures have no fingerprint yet.
+                    conn.execute(
+                        "INSERT INTO tasks (id, kind) SELECT ?, 'fingerprint_captures' WHERE NOT EXISTS "
+                        "(SELECT 1 FROM tasks WHERE kind = 'fingerprint_captures' AND status IN ('queued', 'running'))",
+                        (str(uuid.uuid4()),),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _index_new_rows(self, conn: sqlite3.Connection, before: dict[str, tuple[int, int]]):
+        """Add the imported rows (rowids past the pre-import maximum) to the FTS indexes."""
+        jobs_existing, jobs_max = before["jobs"]
+        if self.jobs < jobs_existing * _FTS_REBUILD_RATIO:
+            conn.execute(
+                "INSERT INTO jobs_fts(rowid, title, organisation, location, notes)"
+                " SELECT rowid, title, organisation, location, notes FROM jobs WHERE rowid > ?",
+                (jobs_max,),
+            )
+        elif self.jobs:
+            conn.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+        captures_existing, captures_max = before["captures"]
+        if self.captures < captures_existing * _FTS_REBUILD_RATIO:
+            conn.execute(
+                "INSERT INTO captures_fts(rowid, page_title, text_snapshot)"
+                " SELECT capture_rowid, page_title, text_snapshot FROM captures_fts_content WHERE capture_rowid > ?",
+                (captures_max,),
+            )
+        elif self.captures:
+            conn.execute("INSERT INTO captures_fts(captures_fts) VALUES ('rebuild')")
+
+    def _claimed_urls(self, conn: sqlite3.Connection, urls: set[str]) -> set[str]:
+        param = orjson.dumps(sorted(urls)).decode()
+        return {url for (url,) in conn.execute(
+            "SELECT canonical_url FROM jobs WHERE canonical_url IN (SELECT value FROM json_each(?1))"
+            " UNION SELECT canonical_url FROM captures WHERE canonical_url IN (SELECT value FROM json_each(?1))",
+            (param,),
+        )}
+
+    def _write_batch(self, conn: sqlite3.Connection, records: list[tuple[int, ImportJobRecord]]):
+        """Insert ``records`` (line number, record), skipping URLs already in the vault or this import."""
+        if not records:
+            return
+        record_urls = [
+            {url for url in [canonical_url(r.url), *(canonical_url(c.url) for c in r.captures)] if url}
+            for _, r in records
+        ]
+        in_vault = self._claimed_urls(conn, set().union(*record_urls))
+
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        jobs, events, captures, texts, terms = [], [], [], [], []
+        for (line, record), urls in zip(records, record_urls):
+            duplicate = next((url for url in sorted(urls) if url in in_vault or url in self._seen), None)
+            if duplicate is not None:
+                if duplicate in self._seen:
+                    self.reject(line, f"Duplicate of line {self._seen[duplicate]}: {duplicate}")
+                else:
+                    self.reject(line, f"Already in vault: {duplicate}")
+                continue
+            self._seen.update(dict.fromkeys(urls, line))
+
+            job_id = str(uuid.uuid4())
+            jobs.append((
+                job_id, record.title, record.organisation, record.url, canonical_url(record.url),
+                record.location, record.salary_range, record.deadline_type, record.deadline_date,
+                record.status, record.notes, now, now,
+            ))
+            events.append((str(uuid.uuid4()), job_id, "SAVED", "Imported", record.deadline_date, now))
+            job_terms: set[str] = set()
+            for capture in record.captures:
+                capture_id = str(uuid.uuid4())
+                captures.append((
+                    capture_id, job_id, capture.url, canonical_url(capture.url), capture.page_title,
+                    capture.capture_method, TEXT_CACHE_VERSION, now,
+                ))
+                if capture.text_snapshot is not None:
+                    texts.append((capture_id, *compress_text(capture.text_snapshot)))
+                    job_terms |= tokenize(capture.text_snapshot)
+            if job_terms:
+                terms.extend((job_id, term) for term in job_terms)
+                self._term_df.update(job_terms)
+                self._term_jobs.append(job_id)
+
+        conn.executemany(
+            "INSERT INTO jobs (id, title, organisation, url, canonical_url, location, salary_range,"
+            " deadline_type, deadline_date, status, notes, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            jobs,
+        )
+        conn.executemany(
+            "INSERT INTO events (id, job_id, event_type, notes, next_action_date, occurred_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            events,
+        )
+        conn.executemany(
+            "INSERT INTO captures (id, job_id, url, canonical_url, page_title, capture_method,"
+            " terms_version, captured_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            captures,
+        )
+        conn.executemany("INSERT INTO capture_texts (capture_id, codec, body) VALUES (?, ?, ?)", texts)
+        conn.executemany("INSERT INTO job_terms (job_id, term) VALUES (?, ?)", terms)
+        self.jobs += len(jobs)
+        self.captures += len(captures)
+
+    def _update_term_stats(self, conn: sqlite3.Connection):
+        """What the job_terms triggers would have done, applied as totals for the new jobs."""
+        if not self._term_jobs:
+            return
+        conn.executemany(
+            "INSERT INTO term_stats (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+            self._term_df.items(),
+        )
+        # One change-log step covers the whole import; the match index patches
+        # (or rebuilds) from it like any other change.
+        conn.execute(
+            "UPDATE term_corpus SET jobs = jobs + ?, changes = changes + 1 WHERE id = 1", (len(self._term_jobs),),
+        )
+        conn.executemany(
+            "INSERT INTO job_term_changes (job_id, seq) VALUES (?, (SELECT changes FROM term_corpus WHERE id = 1))"
+            " ON CONFLICT(job_id) DO UPDATE SET seq = excluded.seq",
+            [(job_id,) for job_id in self._term_jobs],
+        )
@@ -1,10 +1,33 @@
 """
-Keyword-overlap CV-to-job match scoring.
+Keyword-overlap CV-to-job match scoring, weighted by how rare each keyword
+is across all saved jobs (BM25 IDF), so "kubernetes" outweighs "experience".
 Fully offline — no external API required.
 """
+import heapq
+import logging
+import math
 import re
+import sqlite3
+import threading
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
+from app.config import settings
+from app.database import read_connection
+from app.models.job_term import job_terms
+from app.services.extraction_service import extract_text
+from app.services.task_service import TaskContext, task_handler
+from app.utils.compression import decompress_text
+
+logger = logging.getLogger("app")
+
+# Bump when extraction or tokenisation changes so cached document_texts rows
+# are recomputed instead of served stale.
+TEXT_CACHE_VERSION = 2
+
 STOPWORDS = {
     "a", "an", "the", "and", "or", "but", "in", "on", "at", "to", "for",
     "of", "with", "by", "from", "up", "about", "into", "through", "is",
@@ -29,32 +52,60 @@ def tokenize(text: str) -> set[str]:
 
 
 def extract_text_from_file(file_path: Path, mime_type: str | None) -> str:
-    """Extract readable text from a stored document file."""
-    # Try plain UTF-8 first (works for .txt, plain CV exports, some .rtf)
-    try:
-        text = file_path.read_text(encoding="utf-8", errors="ignore")
-        # Reject if it looks like binary garbage (low printable ratio)
-        printable = sum(1 for c in text if c.isprintable() or c.isspace())
-        if len(text) > 0 and printable / len(text) > 0.85:
-            return text
-    except Exception:
-        pass
+    """Extract readable text from a stored document file.
 
-    # Try PDF extraction
-    is_pdf = (
-        mime_type in ("application/pdf", "application/x-pdf")
-        or file_path.suffix.lower() == ".pdf"
-    )
-    if is_pdf:
-        try:
-            import pypdf
-            reader = pypdf.PdfReader(str(file_path))
-            pages = [page.extract_text() or "" for page in reader.pages]
-            return "\n".join(pages)
-        except Exception:
-            pass
+    The format is sniffed from the content; ``mime_type`` is client-supplied
+    and only kept for callers. May raise ``ExtractionError``.
+    """
+    return extract_text(file_path)
+
+
+def serialize_tokens(tokens: set[str]) -> str:
+    return " ".join(sorted(tokens))
+
+
+def deserialize_tokens(tokens: str) -> set[str]:
+    return set(tokens.split())
 
-    return ""
+
+def extract_document_text(file_path: Path, mime_type: str | None) -> tuple[str, set[str]]:
+    text = extract_text_from_file(file_path, mime_type)
+    return text, tokenize(text)
+
+
+def cache_document_text(conn: sqlite3.Connection, file_hash: str, file_path: Path,
+                        mime_type: str | None) -> set[str]:
+    """Extract and tokenize a document, storing both under its hash. Returns the tokens."""
+    text, tokens = extract_document_text(file_path, mime_type)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO document_texts (file_hash, version, text, tokens, extracted_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (file_hash, TEXT_CACHE_VERSION, text, serialize_tokens(tokens),
+             datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")),
+        )
+    return tokens
+
+
+@task_handler("extract_document_text", pool="io")
+def extract_document_text_task(ctx: TaskContext) -> dict:
+    """Warm the text cache for a freshly uploaded document."""
+    p = ctx.payload
+    conn = ctx.connect()
+    try:
+        cached = conn.execute(
+            "SELECT 1 FROM document_texts WHERE file_hash = ? AND version = ?",
+            (p["file_hash"], TEXT_CACHE_VERSION),
+        ).fetchone()
+        if cached:
+            return {"cached": True}
+        file_path = ctx.vault_path / p["stored_path"]
+        if not file_path.exists():
+            return {"cached": False, "token_count": None}  # released before we got to it
+        tokens = cache_document_text(conn, p["file_hash"], file_path, p.get("mime_type"))
+        return {"cached": False, "token_count": len(tokens)}
+    finally:
+        conn.close()
 
 
 def compute_match(job_text: str, doc_text: str) -> dict:
@@ -62,9 +113,22 @@ def compute_match(job_text: str, doc_text: str) -> dict:
     Compare document text against job description text.
     Returns score (0-100), matched keywords, and missing keywords.
     """
-    job_keywords = tokenize(job_text)
-    doc_keywords = tokenize(doc_text)
+    return match_keywords(tokenize(job_text), tokenize(doc_text))
 
+
+def bm25_idf(df: int, n_jobs: int) -> float:
+    """BM25 inverse document frequency. Always positive, so even common terms count a little."""
+    return math.log(1 + (n_jobs - df + 0.5) / (df + 0.5))
+
+
+def match_keywords(job_keywords: set[str], doc_keywords: set[str],
+                   weights: Mapping[str, float] | None = None) -> dict:
+    """``compute_match`` on already-tokenized text.
+
+    With ``weights`` (term -> IDF) the score is the weighted share of the
+    job's keywords the document covers, and keywords are listed most
+    informative first; without, every keyword counts the same.
+    """
     if not job_keywords:
         return {
             "score": 0.0,
@@ -74,9 +138,13 @@ def compute_match(job_text: str, doc_text: str) -> dict:
             "doc_keyword_count": len(doc_keywords),
         }
 
-    matched = sorted(job_keywords & doc_keywords)
-    missing = sorted(job_keywords - doc_keywords)
-    score = round(len(matched) / len(job_keywords) * 100, 1)
+    def weight(term: str) -> float:
+        return weights.get(term, 1.0) if weights else 1.0
+
+    matched = sorted(job_keywords & doc_keywords, key=lambda t: (-weight(t), t))
+    missing = sorted(job_keywords - doc_keywords, key=lambda t: (-weight(t), t))
+    total = sum(weight(t) for t in job_keywords)
+    score = round(sum(weight(t) for t in matched) / total * 100, 1)
 
     return {
         "score": score,
@@ -85,3 +153,451 @@ def compute_match(job_text: str, doc_text: str) -> dict:
         "job_keyword_count": len(job_keywords),
         "doc_keyword_count": len(doc_keywords),
     }
+
+
+# --- Batched matching: one CV against every job ---------------------------
+
+def job_terms_insert(job_id: str, tokens: set[str]):
+    """Statement adding a capture's tokens to its job's term set (run with the capture insert)."""
+    return (
+        job_terms.insert()
+        .prefix_with("OR IGNORE")
+        .values([{"job_id": job_id, "term": t} for t in sorted(tokens)])
+    )
+
+
+def _stale_job_ids(conn: sqlite3.Connection, job_id: str | None = None) -> list[str]:
+    """Jobs with captures indexed by an older (or no) tokenizer.
+
+    New captures are indexed as they are inserted, so these only exist in
+    vaults created before job_terms existed or after a tokenizer bump.
+    """
+    if job_id is None:
+        return [row[0] for row in conn.execute(
+            "SELECT job_id FROM captures WHERE terms_version IS NULL"
+            " UNION SELECT job_id FROM captures WHERE terms_version < ?",
+            (TEXT_CACHE_VERSION,),
+        )]
+    return [row[0] for row in conn.execute(
+        "SELECT job_id FROM captures WHERE job_id = ? AND (terms_version IS NULL OR terms_version < ?) LIMIT 1",
+        (job_id, TEXT_CACHE_VERSION),
+    )]
+
+
+def _rebuild_job_terms(job_ids: list[str]):
+    conn = sqlite3.connect(str(settings.db_path), timeout=30)
+    try:
+        for job_id in job_ids:
+            terms: set[str] = set()
+            for codec, body in conn.execute(
+                "SELECT t.codec, t.body FROM captures c JOIN capture_texts t ON t.capture_id = c.id WHERE c.job_id = ?",
+                (job_id,),
+            ):
+                terms |= tokenize(decompress_text(codec, body))
+            with conn:
+                conn.execute("DELETE FROM job_terms WHERE job_id = ?", (job_id,))
+                conn.executemany(
+                    "INSERT INTO job_terms (job_id, term) VALUES (?, ?)", [(job_id, t) for t in terms],
+                )
+                conn.execute(
+                    "UPDATE captures SET terms_version = ? WHERE job_id = ?", (TEXT_CACHE_VERSION, job_id),
+                )
+    finally:
+        conn.close()
+
+
+def job_term_weights(job_id: str) -> dict[str, float]:
+    """A job's keywords mapped to their BM25 IDF over all jobs: one indexed query."""
+    with read_connection() as conn:
+        stale = _stale_job_ids(conn, job_id)
+    if stale:
+        _rebuild_job_terms(stale)
+    with read_connection() as conn:
+        n_jobs = conn.execute("SELECT jobs FROM term_corpus WHERE id = 1").fetchone()[0]
+        rows = conn.execute(
+            "SELECT t.term, s.df FROM job_terms t JOIN term_stats s ON s.term = t.term WHERE t.job_id = ?",
+            (job_id,),
+        ).fetchall()
+    return {term: bm25_idf(df, n_jobs) for term, df in rows}
+
+
+class _JobTermIndex:
+    """Inverted index over every job's terms, weighted by BM25 IDF.
+
+    Ranking a document walks only the postings of the document's own terms,
+    accumulating IDF per job, then divides by each job's total weight.
+    Job-to-job similarity is the cosine between binary TF-IDF vectors,
+    accumulated the same way over the query job's postings.
+
+    After the first build the index is patched from ``job_term_changes``:
+    a changed job gets fresh postings and weights, a removed one is
+    tombstoned (infinite weights, so it scores zero). IDF keeps the corpus
+    size of the last full build and unchanged jobs keep their weights, so
+    scores drift slightly until ``needs_rebuild`` asks for a full build.
+    Patches are made to a copy (``patched``), so a published index is never
+    modified and queries can read it without holding a lock.
+    """
+
+    def __init__(self, rows: Iterable[tuple[str, str]], df: Iterable[tuple[str, int]], n_jobs: int, seq: int):
+        self.n_jobs = n_jobs
+        self.seq = seq
+        self.changed = 0
+        self.idf = {term: bm25_idf(count, n_jobs) for term, count in df}
+        self.job_ids: list[str] = []
+        self.terms: list[frozenset[str]] = []
+        self.totals: list[float] = []
+        self.norms: list[float] = []
+        self.positions: dict[str, int] = {}
+        self.postings: dict[str, list[int]] = {}
+        self._shared: set[str] = set()  # terms whose postings list another index also holds
+        current, bag = None, []
+        for job_id, term in rows:  # ordered by job_id
+            if job_id != current and current is not None:
+                self._add(current, frozenset(bag))
+                bag = []
+            current = job_id
+            bag.append(term)
+        if current is not None:
+            self._add(current, frozenset(bag))
+
+    def _post(self, term: str, index: int):
+        posting = self.postings.get(term)
+        if posting is None or term in self._shared:
+            posting = self.postings[term] = list(posting or ())
+            self._shared.discard(term)
+        posting.append(index)
+
+    def _add(self, job_id: str, terms: frozenset[str]) -> int:
+        index = len(self.job_ids)
+        for term in terms:
+            self._post(term, index)
+        self.positions[job_id] = index
+        self.job_ids.append(job_id)
+        self.terms.append(terms)
+        self.totals.append(0.0)
+        self.norms.append(0.0)
+        self._weigh(index)
+        return index
+
+    def _weigh(self, index: int):
+        weights = [self.idf.get(t, 1.0) for t in self.terms[index]]
+        self.totals[index] = sum(weights)
+        self.norms[index] = math.sqrt(sum(w * w for w in weights))
+
+    def _tombstone(self, index: int):
+        # Postings still point here; infinite weights make every score zero.
+        del self.positions[self.job_ids[index]]
+        self.terms[index] = frozenset()
+        self.totals[index] = self.norms[index] = math.inf
+
+    def needs_rebuild(self, pending: int) -> bool:
+        return self.changed + pending > len(self.positions) / 20
+
+    def patched(self, conn: sqlite3.Connection, job_ids: list[str], seq: int) -> "_JobTermIndex":
+        """A copy of this index with ``apply`` run on it; postings lists are copied only when extended."""
+        clone = object.__new__(_JobTermIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.idf = dict(self.idf)
+        clone.job_ids = list(self.job_ids)
+        clone.terms = list(self.terms)
+        clone.totals = list(self.totals)
+        clone.norms = list(self.norms)
+        clone.positions = dict(self.positions)
+        clone.postings = dict(self.postings)
+        clone._shared = set(self.postings)
+        clone.apply(conn, job_ids, seq)
+        return clone
+
+    def apply(self, conn: sqlite3.Connection, job_ids: list[str], seq: int):
+        """Bring the given jobs up to date with job_terms (as read through ``conn``)."""
+        touched: set[str] = set()
+        updated: list[int] = []
+        for job_id in job_ids:
+            terms = frozenset(t for (t,) in conn.execute("SELECT term FROM job_terms WHERE job_id = ?", (job_id,)))
+            index = self.positions.get(job_id)
+            old = self.terms[index] if index is not None else frozenset()
+            touched |= old ^ terms
+            if index is not None and terms >= old:
+                # New captures only add terms: extend the job in place
+                for term in terms - old:
+                    self._post(term, index)
+                self.terms[index] = terms
+                updated.append(index)
+                continue
+            if index is not None:
+                self._tombstone(index)
+            if terms:
+                updated.append(self._add(job_id, terms))
+
+        touched_list = sorted(touched)
+        for start in range(0, len(touched_list), 500):
+            chunk = touched_list[start:start + 500]
+            df = dict(conn.execute(
+                f"SELECT term, df FROM term_stats WHERE term IN ({', '.join('?' * len(chunk))})", chunk,
+            ).fetchall())
+            for term in chunk:
+                if term in df:
+                    self.idf[term] = bm25_idf(df[term], self.n_jobs)
+                else:
+                    self.idf.pop(term, None)
+        for index in updated:
+            self._weigh(index)
+        self.changed += len(job_ids)
+        self.seq = seq
+
+    def scores(self, tokens: set[str]) -> dict[int, float]:
+        acc: dict[int, float] = defaultdict(float)
+        for token in tokens:
+            weight = self.idf.get(token, 1.0)
+            for index in self.postings.get(token, ()):
+                acc[index] += weight
+        scores = {i: covered / self.totals[i] for i, covered in acc.items()}
+        return {i: score for i, score in scores.items() if score > 0}
+
+    def similar(self, index: int, limit: int, allowed: set[int] | None = None) -> list[tuple[float, int]]:
+        """The ``limit`` jobs most similar to job ``index`` as (cosine, index), best first.
+
+        Terms are walked rarest first. By Cauchy-Schwarz a job sharing only
+        ``terms[k:]`` scores at most ``||q[k:]|| / ||q||``; once that is below
+        the current ``limit``-th best partial score, the common terms' long
+        postings are skipped and only checked against jobs already found
+        that could still make the cut, so the result is exact. Walking also
+        stops after ``_SIMILAR_POSTINGS_BUDGET`` postings; then only the
+        best ``_SIMILAR_RERANK`` * ``limit`` jobs so far are completed, so a
+        job sharing only common words with this one can be missed. Scores of
+        the jobs returned are always exact.
+        """
+        norms = self.norms
+        norm = norms[index]
+        terms = sorted(self.terms[index], key=lambda t: (-self.idf.get(t, 1.0), t))
+        weights = [self.idf.get(t, 1.0) for t in terms]
+        # rest[k]: norm of the query vector restricted to terms[k:]
+        rest = [0.0] * (len(terms) + 1)
+        for k in range(len(terms) - 1, -1, -1):
+            rest[k] = math.sqrt(rest[k + 1] ** 2 + weights[k] ** 2)
+
+        def eligible(i: int) -> bool:
+            return i != index and (allowed is None or i in allowed)
+
+        acc: dict[int, float] = defaultdict(float)
+        threshold = 0.0
+        walked = 0
+        k = 0
+        while k < len(terms):
+            posting = self.postings[terms[k]]
+            over_budget = walked + len(posting) > _SIMILAR_POSTINGS_BUDGET
+            if over_budget and len(acc) > limit:
+                break
+            # Only look for a cut-off when it could save more than it costs
+            if len(posting) > len(acc) >= limit:
+                best = heapq.nlargest(limit, (dot / norms[i] for i, dot in acc.items() if eligible(i)))
+                if len(best) == limit:
+                    threshold = best[-1] / norm
+                    if threshold >= rest[k] / norm:
+                        break
+            weight = weights[k] * weights[k]
+            for other in posting:
+                acc[other] += weight
+            walked += len(posting)
+            k += 1
+
+        acc.pop(index, None)
+        candidates = acc if allowed is None else {i: dot for i, dot in acc.items() if i in allowed}
+        if k < len(terms):
+            if over_budget:
+                shortlist = heapq.nlargest(limit * _SIMILAR_RERANK, candidates,
+                                           key=lambda i: candidates[i] / norms[i])
+            else:
+                bound = rest[k] / norm
+                shortlist = [i for i, dot in candidates.items() if dot / (norm * norms[i]) + bound >= threshold]
+            remaining = {t: w * w for t, w in zip(terms[k:], weights[k:])}
+            keys = remaining.keys()
+            candidates = {
+                i: candidates[i] + sum(remaining[t] for t in keys & self.terms[i]) for i in shortlist
+            }
+        scored = ((dot / (norm * norms[i]), i) for i, dot in candidates.items())
+        return heapq.nlargest(limit, (pair for pair in scored if pair[0] > 0))
+
+
+# Postings a similarity query walks before common terms are only checked
+# against the best candidates found so far (keeps /similar in milliseconds).
+_SIMILAR_POSTINGS_BUDGET = 10_000
+_SIMILAR_RERANK = 20
+
+
+_index_lock = threading.Lock()  # guards _index; held while a query swaps in a patched copy
+_index: tuple[str, _JobTermIndex] | None = None
+_build_lock = threading.Lock()  # one full build at a time
+_builder_lock = threading.Lock()
+_builder: threading.Thread | None = None
+
+
+def _build_job_term_index(db_path: str, replace: bool):
+    """Backfill stale job terms, then build a full index from one snapshot and swap it in.
+
+    Runs without ``_index_lock``, so queries keep being served (and patched)
+    from the previous index until the new one is ready. With ``replace``
+    false this only waits for a build already under way.
+    """
+    global _index
+    with _build_lock:
+        if not replace:
+            with _index_lock:
+                if _index is not None and _index[0] == db_path:
+                    return
+        with read_connection() as conn:
+            stale = _stale_job_ids(conn)
+        if stale:
+            _rebuild_job_terms(stale)
+        with read_connection() as conn:
+            conn.execute("BEGIN")  # one snapshot for the change log and the terms
+            seq = conn.execute("SELECT changes FROM term_corpus WHERE id = 1").fetchone()[0]
+            n_jobs = conn.execute("SELECT jobs FROM term_corpus WHERE id = 1").fetchone()[0]
+            index = _JobTermIndex(
+                conn.execute("SELECT job_id, term FROM job_terms ORDER BY job_id"),
+                conn.execute("SELECT term, df FROM term_stats").fetchall(),
+                n_jobs,
+                seq,
+            )
+        with _index_lock:
+            if str(settings.db_path) == db_path:
+                _index = (db_path, index)
+
+
+def _build_in_background(db_path: str):
+    try:
+        _build_job_term_index(db_path, replace=True)
+    except Exception:
+        logger.exception("Could not rebuild the job term index")
+
+
+def refresh_job_term_index():
+    """Start a full index build in the background, unless one is already running."""
+    global _builder
+    with _builder_lock:
+        if _builder is not None and _builder.is_alive():
+            return
+        _builder = threading.Thread(
+            target=_build_in_background, args=(str(settings.db_path),), name="job-term-index", daemon=True,
+        )
+        _builder.start()
+
+
+@contextmanager
+def _job_term_index() -> Iterator[_JobTermIndex]:
+    """The current vault's term index, for the caller to read without any lock held.
+
+    Only the first query after a start waits for a full build. Later ones
+    swap in a copy patched from the change log; once it has drifted too far,
+    or stale job terms turn up, a fresh build starts in the background.
+    """
+    global _index
+    while True:
+        db_path = str(settings.db_path)
+        with _index_lock:
+            ready = _index is not None and _index[0] == db_path
+        if not ready:
+            _build_job_term_index(db_path, replace=False)
+        with read_connection() as conn:
+            stale = bool(_stale_job_ids(conn))
+        with _index_lock:
+            if _index is None or _index[0] != db_path:
+                continue  # the vault changed during the build; build for the new one
+            index = _index[1]
+            with read_connection() as conn:
+                conn.execute("BEGIN")  # one snapshot for the change log and the terms
+                seq = conn.execute("SELECT changes FROM term_corpus WHERE id = 1").fetchone()[0]
+                if index.seq != seq:
+                    changed = [r[0] for r in conn.execute(
+                        "SELECT job_id FROM job_term_changes WHERE seq > ?", (index.seq,),
+                    )]
+                    stale = stale or index.needs_rebuild(len(changed))
+                    index = index.patched(conn, changed, seq)
+                    _index = (db_path, index)
+        break
+    if stale:
+        refresh_job_term_index()
+    yield index
+
+
+def _jobs_with_status(conn: sqlite3.Connection, statuses: list[str] | None) -> set[str] | None:
+    if not statuses:
+        return None
+    placeholders = ", ".join("?" * len(statuses))
+    return {r[0] for r in conn.execute(f"SELECT id FROM jobs WHERE status IN ({placeholders})", statuses)}
+
+
+def _job_meta(conn: sqlite3.Connection, job_ids: list[str]) -> dict[str, tuple]:
+    if not job_ids:
+        return {}
+    placeholders = ", ".join("?" * len(job_ids))
+    return {r[0]: tuple(r[1:]) for r in conn.execute(
+        f"SELECT id, title, organisation, status FROM jobs WHERE id IN ({placeholders})", job_ids,
+    )}
+
+
+def rank_jobs(doc_tokens: set[str], limit: int = 10, statuses: list[str] | None = None) -> list[dict]:
+    """Score a document's tokens against every job's captured keywords; return the top ``limit``.
+
+    Scores match the per-job /match endpoint (IDF-weighted share of the
+    job's keywords found in the document). Jobs with no overlap are skipped.
+    """
+    with _job_term_index() as index, read_connection() as conn:
+        allowed = _jobs_with_status(conn, statuses)
+        scored = [
+            (score, index.job_ids[i], i) for i, score in index.scores(doc_tokens).items()
+            if allowed is None or index.job_ids[i] in allowed
+        ]
+        top = heapq.nlargest(limit, scored)
+        meta = _job_meta(conn, [job_id for _, job_id, _ in top])
+
+        results = []
+        for _, job_id, i in top:
+            if job_id not in meta:
+                continue  # deleted since the index was built
+            title, organisation, status = meta[job_id]
+            match = match_keywords(set(index.terms[i]), doc_tokens, index.idf)
+            results.append({
+                "job_id": job_id,
+                "title": title,
+                "organisation": organisation,
+                "status": status,
+                "score": match["score"],
+                "matched": match["matched"],
+                "missing": match["missing"],
+                "job_keyword_count": match["job_keyword_count"],
+            })
+    return results
+
+
+def similar_jobs(job_id: str, limit: int = 10, statuses: list[str] | None = None) -> list[dict]:
+    """Jobs whose captured text is closest to ``job_id``'s, by TF-IDF cosine; the top ``limit``.
+
+    Jobs with no captured keywords have no vector and no neighbours.
+    """
+    with _job_term_index() as index, read_connection() as conn:
+        position = index.positions.get(job_id)
+        if position is None:
+            return []
+        allowed = _jobs_with_status(conn, statuses)
+        if allowed is not None:
+            allowed = {index.positions[j] for j in allowed if j in index.positions}
+        top = index.similar(position, limit, allowed)
+        meta = _job_meta(conn, [index.job_ids[i] for _, i in top])
+
+        results = []
+        for similarity, i in top:
+            other = index.job_ids[i]
+            if other not in meta:
+                continue
+            title, organisation, status = meta[other]
+            shared = sorted(index.terms[position] & index.terms[i], key=lambda t: (-index.idf.get(t, 1.0), t))
+            results.append({
+                "job_id": other,
+                "title": title,
+                "organisation": organisation,
+                "status": status,
+                "similarity": round(similarity, 4),
+                "shared_keywords": shared[:20],
+            })
+    return results
@@ -1,59 +1,149 @@
+import re
 import sqlite3
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+
 from app.config import settings
+from app.database import read_connection
+
+_FTS_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_fts_query(raw: str, prefix: bool = False) -> str | None:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Each word becomes a quoted term so user input cannot inject FTS syntax;
+    terms are ANDed. With ``prefix`` every term also matches as a prefix,
+    which suits type-ahead. Returns None when the text has no searchable words.
+    """
+    terms = _FTS_TERM_RE.findall(raw)
+    if not terms:
+        return None
+    suffix = "*" if prefix else ""
+    return " ".join(f'"{t}"{suffix}' for t in terms)
+
+
+def jobs_fts_filter(raw: str, prefix: bool = False):
+    """SQLAlchemy clause restricting ``jobs`` rows to jobs_fts hits for ``raw``."""
+    match = build_fts_query(raw, prefix=prefix)
+    if match is None:
+        return text("0")
+    return text(
+        "jobs.rowid IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH :jobs_fts_q)"
+    ).bindparams(jobs_fts_q=match)
 
 
-def search_fts(query: str, scope: str = "all", limit: int = 20, offset: int = 0) -> list[dict]:
-    conn = sqlite3.connect(str(settings.db_path))
-    conn.row_factory = sqlite3.Row
-    results = []
+_JOBS_HITS_SQL = """
+    SELECT j.id as job_id, j.title as job_title, j.organisation,
+           'job' as source,
+           snippet(jobs_fts, 0, '<mark>', '</mark>', '...', 32) as snippet,
+           bm25(jobs_fts, {weights}) as rank
+    FROM jobs_fts
+    JOIN jobs j ON j.rowid = jobs_fts.rowid
+    WHERE jobs_fts MATCH :q
+"""
 
+_CAPTURES_HITS_SQL = """
+    SELECT j.id as job_id, j.title as job_title, j.organisation,
+           'capture' as source,
+           snippet(captures_fts, 1, '<mark>', '</mark>', '...', 64) as snippet,
+           bm25(captures_fts, {weights}) as rank
+    FROM captures_fts
+    JOIN captures c ON c.rowid = captures_fts.rowid
+    JOIN jobs j ON j.id = c.job_id
+    WHERE captures_fts MATCH :q
+"""
+
+_JOBS_COUNT_SQL = "SELECT count(*) FROM jobs_fts WHERE jobs_fts MATCH :q"
+_CAPTURES_COUNT_SQL = "SELECT count(*) FROM captures_fts WHERE captures_fts MATCH :q"
+
+
+def _weights(values: list[float]) -> str:
+    return ", ".join(repr(float(v)) for v in values)
+
+
+def _page_sql(scope: str) -> str:
+    hits = []
     if scope in ("all", "jobs"):
-        try:
-            cursor = conn.execute(
-                """
-                SELECT j.id as job_id, j.title as job_title, j.organisation,
-                       'job' as source,
-                       snippet(jobs_fts, 0, '<mark>', '</mark>', '...', 32) as snippet,
-                       rank
-                FROM jobs_fts
-                JOIN jobs j ON j.rowid = jobs_fts.rowid
-                WHERE jobs_fts MATCH ?
-                ORDER BY rank
-                LIMIT ? OFFSET ?
-                """,
-                (query, limit, offset),
-            )
-        except sqlite3.OperationalError as exc:
-            # Security: surface invalid FTS queries as 400 instead of 500.
-            # Improvement: prevents malformed search input from crashing the API.
-            conn.close()
-            raise ValueError("Invalid search query") from exc
-        results.extend([dict(r) for r in cursor.fetchall()])
+        hits.append(_JOBS_HITS_SQL.format(weights=_weights(settings.jobs_fts_weights)))
+    if scope in ("all", "captures"):
+        hits.append(_CAPTURES_HITS_SQL.format(weights=_weights(settings.captures_fts_weights)))
+    # A single compound query so hits from both tables are ranked together
+    # and LIMIT/OFFSET apply to the merged list.
+    return " UNION ALL ".join(hits) + " ORDER BY rank LIMIT :limit OFFSET :offset"
+
 
+def _count_sql(scope: str) -> str:
+    counts = []
+    if scope in ("all", "jobs"):
+        counts.append(_JOBS_COUNT_SQL)
     if scope in ("all", "captures"):
+        counts.append(_CAPTURES_COUNT_SQL)
+    return "SELECT " + " + ".join(f"({sql})" for sql in counts)
+
+
+class _SearchCache:
+    """LRU of recent search pages, dropped whenever the FTS generation moves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Rows are kept as immutable sqlite3.Row objects; callers get fresh dicts.
+        self._entries: OrderedDict[tuple, tuple[tuple[sqlite3.Row, ...], int]] = OrderedDict()
+        self._owner: tuple | None = None
+
+    def get(self, owner: tuple, key: tuple) -> tuple[list[dict], int] | None:
+        with self._lock:
+            if owner != self._owner:
+                self._entries.clear()
+                self._owner = owner
+                return None
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+        rows, total = hit
+        return [dict(r) for r in rows], total
+
+    def put(self, owner: tuple, key: tuple, value: tuple[tuple[sqlite3.Row, ...], int]):
+        with self._lock:
+            if owner != self._owner:
+                self._entries.clear()
+                self._owner = owner
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.search_cache_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owner = None
+
+
+_cache = _SearchCache()
+
+
+def search_fts(query: str, scope: str = "all", limit: int = 20, offset: int = 0) -> tuple[list[dict], int]:
+    """Return one page of hits ranked across the scoped FTS tables, plus the total hit count."""
+    key = (
+        query, scope, limit, offset,
+        tuple(settings.jobs_fts_weights), tuple(settings.captures_fts_weights),
+    )
+    params = {"q": query, "limit": limit, "offset": offset}
+    with read_connection() as conn:
+        generation = conn.execute("SELECT value FROM search_generation WHERE id = 1").fetchone()[0]
+        owner = (str(settings.db_path), generation)
+        cached = _cache.get(owner, key)
+        if cached is not None:
+            return cached
         try:
-            cursor = conn.execute(
-                """
-                SELECT j.id as job_id, j.title as job_title, j.organisation,
-                       'capture' as source,
-                       snippet(captures_fts, 1, '<mark>', '</mark>', '...', 64) as snippet,
-                       rank
-                FROM captures_fts
-                JOIN captures c ON c.rowid = captures_fts.rowid
-                JOIN jobs j ON j.id = c.job_id
-                WHERE captures_fts MATCH ?
-                ORDER BY rank
-                LIMIT ? OFFSET ?
-                """,
-                (query, limit, offset),
-            )
+            rows = conn.execute(_page_sql(scope), params).fetchall()
+            total = conn.execute(_count_sql(scope), params).fetchone()[0]
         except sqlite3.OperationalError as exc:
             # Security: surface invalid FTS queries as 400 instead of 500.
             # Improvement: prevents malformed search input from crashing the API.
-            conn.close()
             raise ValueError("Invalid search query") from exc
-        results.extend([dict(r) for r in cursor.fetchall()])
-
-    conn.close()
-    results.sort(key=lambda r: r["rank"])
-    return results
+    _cache.put(owner, key, (tuple(rows), total))
+    return [dict(r) for r in rows], total
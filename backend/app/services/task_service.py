@@ -0,0 +1,336 @@
+"""
+Durable background task queue backed by the vault database.
+
+Handlers add a row to ``tasks`` (via ``new_task``), commit, and call
+``task_queue.notify()``. A dispatcher thread claims queued rows by priority
+and runs them on a thread pool (I/O-bound kinds) or a process pool
+(CPU-bound kinds). Failed attempts are retried with exponential backoff,
+and tasks left ``running`` by a crash are re-queued when the queue starts.
+Succeeded tasks are pruned once they are older than
+``settings.task_retention_days``; failed ones are kept for inspection.
+"""
+import json
+import logging
+import multiprocessing
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.config import settings
+from app.database import register_sql_functions
+from app.models.task import Task
+
+logger = logging.getLogger("app")
+
+# How often the dispatcher deletes old succeeded tasks.
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+@dataclass(frozen=True)
+class TaskContext:
+    """Everything a handler gets; picklable so CPU tasks can run in a child process."""
+
+    task_id: str
+    payload: dict
+    attempt: int
+    max_attempts: int
+    db_path: Path
+    vault_path: Path
+
+    @property
+    def is_last_attempt(self) -> bool:
+        return self.attempt >= self.max_attempts
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        register_sql_functions(conn)
+        return conn
+
+
+@dataclass(frozen=True)
+class _TaskSpec:
+    fn: Callable[[TaskContext], dict | None]
+    pool: str
+
+
+_handlers: dict[str, _TaskSpec] = {}
+
+
+def task_handler(kind: str, pool: str = "io"):
+    """Register ``fn(ctx) -> dict | None`` for ``kind``. CPU handlers must be module-level."""
+    if pool not in ("io", "cpu"):
+        raise ValueError(f"Unknown task pool: {pool}")
+
+    def register(fn):
+        _handlers[kind] = _TaskSpec(fn=fn, pool=pool)
+        return fn
+
+    return register
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def new_task(kind: str, payload: dict, priority: int = 0, max_attempts: int | None = None) -> Task:
+    """Build a queued Task row; the caller adds it to its session and commits."""
+    now = _now()
+    return Task(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        payload=json.dumps(payload),
+        status="queued",
+        priority=priority,
+        attempts=0,
+        max_attempts=max_attempts or settings.task_max_attempts,
+        run_after=0,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def _run_handler(fn: Callable[[TaskContext], dict | None], ctx: TaskContext):
+    return fn(ctx)
+
+
+class TaskQueue:
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._start_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._db_path: Path | None = None
+        self._vault_path: Path | None = None
+        self._pools: dict[str, Executor] = {}
+        self._running = {"io": 0, "cpu": 0}
+
+    def _limits(self) -> dict[str, int]:
+        return {"io": settings.task_io_workers, "cpu": settings.task_cpu_workers}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self._db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def start(self):
+        """Start dispatching for the current vault, re-queueing tasks a crash left running.
+
+        Serialised by ``_start_lock`` so concurrent ``notify()`` calls spawn one
+        dispatcher; running rows are only re-queued when switching to a vault
+        this process has not been dispatching for.
+        """
+        with self._start_lock:
+            with self._lock:
+                if self._thread is not None and self._db_path == settings.db_path:
+                    return
+                recover = self._db_path != settings.db_path
+            self.stop()
+            with self._lock:
+                self._db_path = settings.db_path
+                self._vault_path = settings.vault_path
+                if recover:
+                    conn = self._connect()
+                    try:
+                        conn.execute(
+                            "UPDATE tasks SET status = 'queued', updated_at = ? WHERE status = 'running'",
+                            (_now(),),
+                        )
+                    finally:
+                        conn.close()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._dispatch, name="task-dispatcher", daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Wake the dispatcher after committing new tasks (starting it if needed)."""
+        self.start()
+        self._wake.set()
+
+    def stop(self):
+        with self._start_lock:
+            with self._lock:
+                thread = self._thread
+                self._thread = None
+            if thread is None:
+                return
+            self._stop.set()
+            self._wake.set()
+            thread.join()
+            for pool in self._pools.values():
+                pool.shutdown(wait=True)
+            self._pools = {}
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until nothing is running and no due task is queued."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                busy = any(self._running.values())
+                db_path = self._db_path
+            if not busy:
+                if db_path is None or self._thread is None:
+                    return True
+                conn = self._connect()
+                try:
+                    due = conn.execute(
+                        "SELECT COUNT(*) FROM tasks WHERE status IN ('queued', 'running') AND run_after <= ?",
+                        (time.time(),),
+                    ).fetchone()[0]
+                finally:
+                    conn.close()
+                if not due:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+
+    def _pool(self, name: str) -> Executor:
+        if name not in self._pools:
+            if name == "cpu":
+                # spawn: forking a process that runs threads can deadlock the child.
+                self._pools[name] = ProcessPoolExecutor(
+                    max_workers=settings.task_cpu_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._pools[name] = ThreadPoolExecutor(
+                    max_workers=settings.task_io_workers, thread_name_prefix="task-io",
+                )
+        return self._pools[name]
+
+    def _claim(self, conn: sqlite3.Connection, pools: list[str]) -> sqlite3.Row | None:
+        """Atomically mark the highest-priority due task runnable on ``pools`` as running."""
+        kinds = [k for k, spec in _handlers.items() if spec.pool in pools]
+        conditions = []
+        if kinds:
+            conditions.append(f"kind IN ({', '.join('?' * len(kinds))})")
+        params: list = list(kinds)
+        if "io" in pools:
+            # Unknown kinds are claimed on the io pool so they can be failed.
+            known = list(_handlers)
+            conditions.append(f"kind NOT IN ({', '.join('?' * len(known))})" if known else "1")
+            params.extend(known)
+        if not conditions:
+            return None
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"""
+                SELECT * FROM tasks
+                WHERE status = 'queued' AND run_after <= ? AND ({' OR '.join(conditions)})
+                ORDER BY priority DESC, created_at
+                LIMIT 1
+                """,
+                (time.time(), *params),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE tasks SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (_now(), row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        """Delete succeeded tasks that finished more than the retention period ago."""
+        cutoff = datetime.fromtimestamp(
+            time.time() - settings.task_retention_days * 86400, timezone.utc,
+        ).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return conn.execute(
+            "DELETE FROM tasks WHERE status = 'succeeded' AND finished_at < ?", (cutoff,),
+        ).rowcount
+
+    def _dispatch(self):
+        conn = self._connect()
+        next_prune = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_prune:
+                    self._prune(conn)
+                    next_prune = time.monotonic() + _PRUNE_INTERVAL_SECONDS
+                with self._lock:
+                    limits = self._limits()
+                    free = [p for p in ("io", "cpu") if self._running[p] < limits[p]]
+                row = self._claim(conn, free) if free else None
+                if row is None:
+                    self._wake.wait(timeout=0.5)
+                    self._wake.clear()
+                    continue
+                self._submit(row)
+        except Exception:
+            logger.exception("Task dispatcher stopped unexpectedly")
+        finally:
+            conn.close()
+
+    def _submit(self, row: sqlite3.Row):
+        spec = _handlers.get(row["kind"])
+        pool = spec.pool if spec else "io"
+        ctx = TaskContext(
+            task_id=row["id"],
+            payload=json.loads(row["payload"] or "{}"),
+            attempt=row["attempts"] + 1,
+            max_attempts=row["max_attempts"],
+            db_path=self._db_path,
+            vault_path=self._vault_path,
+        )
+        with self._lock:
+            self._running[pool] += 1
+        if spec is None:
+            future: Future = Future()
+            future.set_exception(LookupError(f"No handler registered for task kind {row['kind']!r}"))
+        else:
+            future = self._pool(pool).submit(_run_handler, spec.fn, ctx)
+        future.add_done_callback(lambda f: self._finish(ctx, pool, f, retryable=spec is not None))
+
+    def _finish(self, ctx: TaskContext, pool: str, future: Future, retryable: bool):
+        now = _now()
+        conn = sqlite3.connect(str(ctx.db_path), timeout=30)
+        try:
+            exc = future.exception()
+            if exc is None:
+                conn.execute(
+                    "UPDATE tasks SET status = 'succeeded', result = ?, error = NULL, "
+                    "updated_at = ?, finished_at = ? WHERE id = ?",
+                    (json.dumps(future.result()), now, now, ctx.task_id),
+                )
+            elif retryable and not ctx.is_last_attempt:
+                delay = settings.task_retry_backoff_seconds * 2 ** (ctx.attempt - 1)
+                conn.execute(
+                    "UPDATE tasks SET status = 'queued', error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                    (repr(exc), time.time() + delay, now, ctx.task_id),
+                )
+            else:
+                logger.error(
+                    "Task %s failed: %s",
+                    ctx.task_id,
+                    "".join(traceback.format_exception(exc)).strip(),
+                )
+                conn.execute(
+                    "UPDATE tasks SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                    (repr(exc), now, now, ctx.task_id),
+                )
+            conn.commit()
+        except Exception:
+            logger.exception("Could not record result of task %s", ctx.task_id)
+        finally:
+            conn.close()
+            with self._lock:
+                self._running[pool] -= 1
+            self._wake.set()
+
+
+task_queue = TaskQueue()
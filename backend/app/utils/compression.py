@@ -0,0 +1,38 @@
+import gzip
+import os
+import zlib
+from pathlib import Path
+
+# capture_texts.codec values
+CODEC_PLAIN = 0
+CODEC_ZLIB = 1
+
+# Shorter texts barely shrink once zlib's header and checksum are paid for.
+COMPRESS_MIN_BYTES = 512
+
+
+def compress_text(text: str) -> tuple[int, bytes]:
+    """(codec, body) for storing ``text``; zlib-compressed unless it is short or incompressible."""
+    data = text.encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data)
+        if len(packed) < len(data):
+            return CODEC_ZLIB, packed
+    return CODEC_PLAIN, data
+
+
+def decompress_text(codec: int | None, body: bytes | None) -> str | None:
+    """Inverse of ``compress_text``; also registered as the ``snapshot_text`` SQL function."""
+    if body is None:
+        return None
+    if codec == CODEC_ZLIB:
+        body = zlib.decompress(body)
+    return bytes(body).decode("utf-8")
+
+
+def write_gzip(path: Path, data: bytes):
+    """Atomically write ``data`` gzip-compressed to ``path``."""
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wb", compresslevel=6) as f:
+        f.write(data)
+    os.replace(tmp, path)
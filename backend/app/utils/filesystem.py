@@ -6,6 +6,7 @@ def ensure_vault_dirs(vault_path: Path | None = None) -> Path:
     path = vault_path or settings.vault_path
     path.mkdir(parents=True, exist_ok=True)
     (path / "jobs").mkdir(exist_ok=True)
+    (path / "blobs").mkdir(exist_ok=True)
     return path
 
 
@@ -18,6 +19,13 @@ def ensure_job_dirs(job_id: str, vault_path: Path | None = None) -> Path:
     return job_dir
 
 
+def ensure_blobs_dir(vault_path: Path | None = None) -> Path:
+    path = vault_path or settings.vault_path
+    blobs_dir = path / "blobs"
+    blobs_dir.mkdir(parents=True, exist_ok=True)
+    return blobs_dir
+
+
 def sanitize_filename(name: str) -> str:
     keep = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-")
     return "".join(c if c in keep else "_" for c in name)
@@ -0,0 +1,31 @@
+from collections.abc import Iterable
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def requested_fields(
+    fields: str | None, view: str, available: Iterable[str], summary: Iterable[str],
+) -> list[str] | None:
+    """Field names a list request asked for, in ``available`` order; None means full objects.
+
+    ``fields`` is a comma-separated list and wins over ``view``. Raises
+    ValueError for names that are not in ``available``.
+    """
+    available = list(available)
+    if fields:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = names.difference(available)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return [name for name in available if name in names]
+    if view == "summary":
+        return list(summary)
+    return None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, for plain rows that skip Pydantic models."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
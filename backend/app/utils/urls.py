@@ -0,0 +1,44 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query parameters that identify the click, not the page.
+_TRACKING_PARAMS = {
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok",
+    "ref", "ref_src", "refid", "trk", "trackingid", "gh_src", "lever-source", "lever-origin",
+}
+_DEFAULT_PORTS = {80, 443}
+
+
+def _is_tracking(key: str) -> bool:
+    key = key.lower()
+    return key.startswith("utm_") or key in _TRACKING_PARAMS
+
+
+def canonical_url(url: str | None) -> str | None:
+    """Normalise a web URL so trivially different links to one page compare equal.
+
+    http and https, a leading ``www.``, default ports, the fragment, a
+    trailing slash, tracking parameters and query order are all ignored.
+    Returns None for empty or non-web URLs.
+    """
+    url = (url or "").strip()
+    if not url:
+        return None
+    if "://" not in url:
+        url = "https://" + url  # "example.com/jobs/1" typed by hand
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return None
+
+    host = parts.hostname.removeprefix("www.")
+    if port is not None and port not in _DEFAULT_PORTS:
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(key)
+    ))
+    return f"https://{host}{path}" + (f"?{query}" if query else "")
@@ -0,0 +1,139 @@
+"""
+Measure /health and /jobs latency while exports and analytics run concurrently.
+
+Starts a uvicorn server on a throwaway vault, fills it with jobs, then samples
+request latency first on an idle server and again while a background client
+keeps /export/json and /analytics busy.
+
+Usage (from backend/):
+    python -m benchmarks.bench_concurrency [--jobs 20000] [--seconds 5]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+from app.database import register_sql_functions
+from app.utils.compression import compress_text
+
+PASSPHRASE = "benchmark-passphrase"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _populate(db_path: Path, n_jobs: int):
+    conn = sqlite3.connect(str(db_path))
+    register_sql_functions(conn)
+    now = "2026-01-01T00:00:00Z"
+    jobs, captures, texts = [], [], []
+    for i in range(n_jobs):
+        job_id, capture_id = str(uuid.uuid4()), str(uuid.uuid4())
+        jobs.append((job_id, f"Job {i}", f"Org {i % 300}", now, now))
+        captures.append((capture_id, job_id, "manual_paste", now))
+        texts.append((capture_id, *compress_text("posting text " * 150)))
+    conn.executemany(
+        "INSERT INTO jobs (id, title, organisation, created_at, updated_at) VALUES (?, ?, ?, ?, ?)", jobs
+    )
+    conn.executemany(
+        "INSERT INTO captures (id, job_id, capture_method, captured_at) VALUES (?, ?, ?, ?)", captures,
+    )
+    conn.executemany("INSERT INTO capture_texts (capture_id, codec, body) VALUES (?, ?, ?)", texts)
+    conn.commit()
+    conn.close()
+
+
+async def _sample(client: httpx.AsyncClient, path: str, headers: dict, seconds: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await client.get(path, headers=headers)
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def _load(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        r = await client.post("/api/v1/vault/export-token", json={"passphrase": PASSPHRASE})
+        export_headers = {**headers, "X-Vault-Export-Token": r.json()["token"]}
+        async with client.stream("GET", "/api/v1/export/json", headers=export_headers) as resp:
+            async for _ in resp.aiter_bytes():
+                pass
+        await client.get("/api/v1/analytics", headers=headers)
+
+
+def _report(label: str, results: dict[str, list[float]]):
+    for path, lat in results.items():
+        lat.sort()
+        p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+        print(f"{label:<10}{path:<16}{len(lat):>8}{statistics.median(lat):>10.2f}{p99:>10.2f}")
+
+
+async def _run(base_url: str, seconds: float):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        r = await client.post("/api/v1/vault/unlock", json={"passphrase": PASSPHRASE})
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        paths = {"/health": {}, "/api/v1/jobs": headers}
+
+        print(f"{'phase':<10}{'endpoint':<16}{'requests':>8}{'p50 ms':>10}{'p99 ms':>10}")
+        idle = await asyncio.gather(*(_sample(client, p, h, seconds) for p, h in paths.items()))
+        _report("idle", dict(zip(paths, idle)))
+
+        stop = asyncio.Event()
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as load_client:
+            load = asyncio.create_task(_load(load_client, headers, stop))
+            await asyncio.sleep(0.5)
+            busy = await asyncio.gather(*(_sample(client, p, h, seconds) for p, h in paths.items()))
+            stop.set()
+            await load
+        _report("loaded", dict(zip(paths, busy)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20_000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vault = Path(tmp) / "vault"
+        port = _free_port()
+        env = {**os.environ, "VAULT_VAULT_PATH": str(vault)}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            httpx.post(f"{base_url}/api/v1/vault/setup", json={"passphrase": PASSPHRASE}).raise_for_status()
+            _populate(vault / "db.sqlite", args.jobs)
+            print(f"{args.jobs} jobs, {args.seconds:.0f}s per phase")
+            asyncio.run(_run(base_url, args.seconds))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the old ILIKE '%q%' job filter with the jobs_fts path used by GET /jobs.
+
+Usage (from backend/):
+    python -m benchmarks.bench_job_filter [--jobs 50000] [--repeat 20]
+"""
+import argparse
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import init_db
+from app.models.job import Job
+from app.services.search_service import jobs_fts_filter
+
+WORDS = [
+    "python", "engineer", "research", "kubernetes", "analyst", "lecturer",
+    "platform", "backend", "frontend", "data", "senior", "junior", "remote",
+    "london", "dublin", "berlin", "cloud", "security", "product", "manager",
+]
+ORGS = [f"Org{i}" for i in range(500)]
+
+
+def _populate(db_path: Path, n_jobs: int):
+    import sqlite3
+    rng = random.Random(42)
+    conn = sqlite3.connect(str(db_path))
+    now = "2026-01-01T00:00:00Z"
+    rows = [
+        (
+            str(uuid.uuid4()),
+            " ".join(rng.sample(WORDS, 3)).title(),
+            rng.choice(ORGS),
+            rng.choice(["London", "Dublin", "Berlin"]),
+            " ".join(rng.choices(WORDS, k=20)),
+            now,
+            now,
+        )
+        for _ in range(n_jobs)
+    ]
+    conn.executemany(
+        "INSERT INTO jobs (id, title, organisation, location, notes, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def _old_filter(q: str):
+    return (
+        Job.title.ilike(f"%{q}%")
+        | Job.organisation.ilike(f"%{q}%")
+        | Job.notes.ilike(f"%{q}%")
+    )
+
+
+def _time(session, clause, repeat: int) -> tuple[float, int]:
+    total = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        query = session.query(Job).filter(clause)
+        total = query.count()
+        query.order_by(Job.updated_at.desc(), Job.id.desc()).limit(20).all()
+    return (time.perf_counter() - start) / repeat * 1000, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "db.sqlite"
+        init_db(db_path)
+        _populate(db_path, args.jobs)
+        session = sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))()
+
+        print(f"{args.jobs} jobs, {args.repeat} runs per query (count + first page)")
+        print(f"{'query':<14}{'ILIKE ms':>12}{'FTS ms':>12}{'hits':>10}")
+        for q in ["kubernetes", "org42", "senior python", "lectur"]:
+            # ILIKE can only do a single substring; compare on the first word.
+            old_ms, _ = _time(session, _old_filter(q.split()[0]), args.repeat)
+            new_ms, hits = _time(session, jobs_fts_filter(q, prefix=True), args.repeat)
+            print(f"{q:<14}{old_ms:>12.2f}{new_ms:>12.2f}{hits:>10}")
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
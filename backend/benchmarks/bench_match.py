@@ -0,0 +1,97 @@
+"""
+Time weighted CV matching: one job (GET .../match) and every job (POST .../match-all),
+plus similar-job lookups (GET /jobs/{id}/similar) and incremental index updates.
+
+Usage (from backend/):
+    python -m benchmarks.bench_match [--jobs 5000] [--terms 150] [--repeat 200]
+"""
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from app.config import settings
+from app.database import init_db
+from app.services.match_service import job_term_weights, match_keywords, rank_jobs, similar_jobs
+
+
+def _populate(db_path: Path, n_jobs: int, n_terms: int, vocab: list[str]) -> list[str]:
+    rng = random.Random(42)
+    # Zipf-ish: a few terms are everywhere, most are rare
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    conn = sqlite3.connect(str(db_path))
+    now = "2026-01-01T00:00:00Z"
+    job_ids = [str(uuid.uuid4()) for _ in range(n_jobs)]
+    with conn:
+        conn.executemany(
+            "INSERT INTO jobs (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            [(job_id, f"Job {i}", now, now) for i, job_id in enumerate(job_ids)],
+        )
+        for job_id in job_ids:
+            terms = set(rng.choices(vocab, weights=weights, k=n_terms))
+            conn.executemany("INSERT INTO job_terms (job_id, term) VALUES (?, ?)", [(job_id, t) for t in terms])
+    conn.close()
+    return job_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=5_000)
+    parser.add_argument("--terms", type=int, default=150, help="keyword draws per job")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    vocab = [f"term{i}" for i in range(20_000)]
+    rng = random.Random(7)
+    doc_tokens = set(rng.sample(vocab[:2_000], 300))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.vault_path = Path(tmp)
+        init_db(settings.db_path)
+        job_ids = _populate(settings.db_path, args.jobs, args.terms, vocab)
+
+        start = time.perf_counter()
+        for job_id in rng.sample(job_ids, min(args.repeat, len(job_ids))):
+            weights = job_term_weights(job_id)
+            match_keywords(set(weights), doc_tokens, weights)
+        one_ms = (time.perf_counter() - start) / min(args.repeat, len(job_ids)) * 1000
+
+        start = time.perf_counter()
+        rank_jobs(doc_tokens, limit=10)
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for _ in range(20):
+            rank_jobs(doc_tokens, limit=10)
+        all_ms = (time.perf_counter() - start) / 20 * 1000
+
+        sample = rng.sample(job_ids, min(args.repeat, len(job_ids)))
+        start = time.perf_counter()
+        for job_id in sample:
+            similar_jobs(job_id, limit=10)
+        similar_ms = (time.perf_counter() - start) / len(sample) * 1000
+
+        # One new capture's worth of terms, then the next query patches the index
+        conn = sqlite3.connect(str(settings.db_path))
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_terms (job_id, term) VALUES (?, ?)",
+                [(job_ids[0], t) for t in rng.sample(vocab, 150)],
+            )
+        conn.close()
+        start = time.perf_counter()
+        similar_jobs(job_ids[1], limit=10)
+        patch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{args.jobs} jobs, ~{args.terms} keyword draws each, CV with {len(doc_tokens)} keywords")
+    print(f"{'one job (lookup + score)':<34}{one_ms:>10.3f} ms")
+    print(f"{'all jobs, first call (index build)':<34}{build_ms:>10.3f} ms")
+    print(f"{'all jobs, warm index':<34}{all_ms:>10.3f} ms")
+    print(f"{'similar jobs, top 10':<34}{similar_ms:>10.3f} ms")
+    print(f"{'similar after a capture (patch)':<34}{patch_ms:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_db, register_sql_functions
 from app.main import app
 from app.config import settings
+from app.services.task_service import task_queue
 from app.services.vault_service import vault_service, VaultService
 
 
@@ -17,6 +20,7 @@ def _set_sqlite_pragmas(dbapi_conn, connection_record):
     cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
+    register_sql_functions(dbapi_conn)
 
 
 @pytest.fixture
@@ -27,7 +31,18 @@ def tmp_vault(tmp_path):
 
 
 @pytest.fixture
-def test_db(tmp_vault):
+def test_async_engine(tmp_vault):
+    # NullPool: TestClient may drive each request from a fresh event loop.
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_vault / 'db.sqlite'}",
+        poolclass=NullPool,
+    )
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+@pytest.fixture
+def test_db(tmp_vault, test_async_engine):
     db_path = tmp_vault / "db.sqlite"
     engine = create_engine(
         f"sqlite:///{db_path}",
@@ -46,7 +61,16 @@ def test_db(tmp_vault):
         finally:
             db.close()
 
+    TestAsyncSession = async_sessionmaker(
+        bind=test_async_engine, autoflush=False, expire_on_commit=False,
+    )
+
+    async def override_get_async_db():
+        async with TestAsyncSession() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestSession
     app.dependency_overrides.clear()
 
@@ -68,4 +92,6 @@ def client(tmp_vault, test_db, fresh_vault_service):
     settings.vault_path = tmp_vault
     c = TestClient(app)
     yield c
+    task_queue.wait_idle(timeout=30)
+    task_queue.stop()
     settings.vault_path = original_vault_path
@@ -48,6 +48,106 @@ class TestBackup:
         # The vault db.sqlite must be present
         assert any("db.sqlite" in name for name in names)
 
+    def test_backup_database_is_consistent_snapshot(self, client, tmp_vault, tmp_path):
+        import sqlite3
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        export_h = self._export_auth(self._export_token(client))
+        client.post("/api/v1/jobs", json={"title": "Snapshot Job"}, headers=h)
+
+        r = client.post("/api/v1/backup/export", headers={**h, **export_h})
+        with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+            names = zf.namelist()
+            restored = tmp_path / "restored.sqlite"
+            restored.write_bytes(zf.read("db.sqlite"))
+        assert names.count("db.sqlite") == 1
+        assert not any(n.endswith(("-wal", "-shm")) for n in names)
+
+        conn = sqlite3.connect(str(restored))
+        try:
+            assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+            titles = [row[0] for row in conn.execute("SELECT title FROM jobs")]
+        finally:
+            conn.close()
+        assert titles == ["Snapshot Job"]
+
+    def test_backup_streams_in_bounded_chunks(self, client, tmp_vault):
+        import os
+        from app.services.backup_service import export_vault_zip
+        self._setup_and_unlock(client, tmp_vault)
+        payload = os.urandom(3 * 1024 * 1024)
+        (tmp_vault / "jobs" / "big.bin").write_bytes(payload)
+
+        chunks = list(export_vault_zip())
+        assert len(chunks) > 3
+        assert max(len(c) for c in chunks) < 2 * 1024 * 1024
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+            assert zf.read("jobs/big.bin") == payload
+
+    def test_backup_stores_precompressed_files(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        export_h = self._export_auth(self._export_token(client))
+        job_id = client.post("/api/v1/jobs", json={"title": "Job"}, headers=h).json()["id"]
+        doc = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.pdf", b"%PDF-1.4 fake", "application/pdf")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "html_content": "<html>posting</html>", "capture_method": "generic_html",
+        }, headers=h)
+
+        r = client.post("/api/v1/backup/export", headers={**h, **export_h})
+        with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+            assert zf.testzip() is None
+            infos = {i.filename: i for i in zf.infolist()}
+        pdf = infos[doc["stored_path"]]
+        html = next(i for n, i in infos.items() if n.endswith(".html.gz"))  # snapshots are stored gzipped
+        assert pdf.compress_type == zipfile.ZIP_STORED
+        assert html.compress_type == zipfile.ZIP_STORED
+        assert infos["db.sqlite"].compress_type == zipfile.ZIP_DEFLATED
+
+    def test_incremental_backup_only_includes_new_files(self, client, tmp_vault):
+        import json
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = client.post("/api/v1/jobs", json={"title": "Job"}, headers=h).json()["id"]
+        first_doc = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.pdf", b"first cv", "application/pdf")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()["stored_path"]
+
+        export_h = self._export_auth(self._export_token(client))
+        r = client.post("/api/v1/backup/export", headers={**h, **export_h})
+        with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+            manifest = json.loads(zf.read("backup_manifest.json"))
+        assert manifest["kind"] == "full"
+        assert len(manifest["files"][first_doc]["sha256"]) == 64
+
+        letter = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("letter.pdf", b"cover letter", "application/pdf")},
+            data={"doc_type": "cover_letter"},
+            headers=h,
+        ).json()["stored_path"]
+        export_h = self._export_auth(self._export_token(client))
+        r = client.post("/api/v1/backup/export/incremental", json=manifest, headers={**h, **export_h})
+        assert r.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+            names = set(zf.namelist())
+            new_manifest = json.loads(zf.read("backup_manifest.json"))
+
+        assert "db.sqlite" in names
+        assert first_doc not in names
+        assert letter in names
+        assert new_manifest["kind"] == "incremental"
+        assert first_doc in new_manifest["files"]
+        assert len(new_manifest["files"]) == len(manifest["files"]) + 1
+
     def test_csv_export_returns_correct_headers(self, client, tmp_vault):
         token = self._setup_and_unlock(client, tmp_vault)
         h = self._auth(token)
@@ -142,6 +242,7 @@ class TestBackup:
         assert job["organisation"] == "JSONCorp"
         assert len(job["captures"]) == 1
         assert job["captures"][0]["text_snapshot"] == "Sample capture text for export"
+        assert "fingerprint" not in job["captures"][0]
         # Events include the auto-SAVED event plus our SHORTLISTED event
         assert len(job["events"]) >= 2
 
@@ -160,6 +261,37 @@ class TestBackup:
         assert job["tags"][0]["name"] == "priority"
         assert len(data["tags"]) == 1
 
+    def test_json_export_query_count_is_constant(self, client, tmp_vault):
+        import json
+        from app.database import read_connection
+        from app.services.backup_service import export_json
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        for i in range(5):
+            job_id = client.post("/api/v1/jobs", json={"title": f"Job {i}"}, headers=h).json()["id"]
+            client.post(f"/api/v1/jobs/{job_id}/captures", json={
+                "text_snapshot": f"capture {i}", "capture_method": "manual_paste",
+            }, headers=h)
+            client.post(f"/api/v1/jobs/{job_id}/tags", json={"name": f"tag{i % 2}"}, headers=h)
+
+        selects: list[str] = []
+        with read_connection() as conn:
+            conn.set_trace_callback(lambda sql: selects.append(sql) if sql.lstrip().startswith("SELECT") else None)
+        try:
+            data = json.loads("".join(export_json()))
+        finally:
+            with read_connection() as conn:
+                conn.set_trace_callback(None)
+
+        assert len(data["jobs"]) == 5
+        assert len(selects) == 6  # jobs, four child tables, tag list
+        for job in data["jobs"]:
+            assert len(job["captures"]) == 1
+            assert job["captures"][0]["job_id"] == job["id"]
+            assert len(job["events"]) == 1
+            assert len(job["tags"]) == 1
+            assert "_job_id" not in job["tags"][0]
+
     def test_backup_requires_auth(self, client, tmp_vault):
         self._setup_and_unlock(client, tmp_vault)
         r = client.post("/api/v1/backup/export", headers={"Authorization": "Bearer invalid_token"})
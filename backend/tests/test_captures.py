@@ -54,6 +54,25 @@ class TestCaptures:
         assert r.status_code == 200
         assert len(r.json()) == 1
 
+    def test_list_captures_projection(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_id = self._create_job(client, token)
+        h = self._auth(token)
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "url": "https://example.com/job/1", "page_title": "Posting", "text_snapshot": "Full text",
+        }, headers=h)
+
+        r = client.get(f"/api/v1/jobs/{job_id}/captures?view=summary", headers=h)
+        assert r.status_code == 200
+        assert "text_snapshot" not in r.json()[0] and r.json()[0]["page_title"] == "Posting"
+        r = client.get(f"/api/v1/jobs/{job_id}/captures?fields=text_snapshot,id", headers=h)
+        assert list(r.json()[0]) == ["id", "text_snapshot"]
+        assert r.json()[0]["text_snapshot"] == "Full text"
+        r = client.get(f"/api/v1/jobs/{job_id}/captures?fields=text_snapshot", headers=h)
+        assert r.json() == [{"text_snapshot": "Full text"}]
+        r = client.get(f"/api/v1/jobs/{job_id}/captures?fields=body", headers=h)
+        assert r.status_code == 400
+
     def test_quick_capture(self, client, tmp_vault):
         token = self._setup_and_unlock(client, tmp_vault)
 
@@ -69,3 +88,291 @@ class TestCaptures:
         data = r.json()
         assert data["job"]["title"] == "Data Scientist"
         assert data["capture"]["text_snapshot"] == "Seeking a data scientist..."
+
+    def test_quick_capture_renders_pdf_in_background(self, client, tmp_vault):
+        import json
+        import sqlite3
+        from app.services.task_service import task_queue
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+
+        r = client.post("/api/v1/captures/quick", json={
+            "url": "https://example.com/job/789",
+            "text_snapshot": "Seeking a geophysicist...",
+            "title": "Geophysicist",
+        }, headers=h)
+        assert r.status_code == 201
+        data = r.json()
+        assert data["capture"]["pdf_status"] == "pending"
+        job_id = data["job"]["id"]
+
+        assert task_queue.wait_idle(timeout=30)
+
+        captures = client.get(f"/api/v1/jobs/{job_id}/captures", headers=h).json()
+        assert captures[0]["pdf_status"] == "ready"
+        assert captures[0]["pdf_path"].startswith("blobs/")
+        docs = client.get(f"/api/v1/jobs/{job_id}/documents", headers=h).json()
+        assert [d["doc_type"] for d in docs] == ["job_posting"]
+        assert docs[0]["stored_path"] == captures[0]["pdf_path"]
+        assert (tmp_vault / docs[0]["stored_path"]).read_bytes().startswith(b"%PDF")
+
+        # The snapshot text is read back from capture_texts, not copied into the task
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        payloads = [row[0] for row in conn.execute("SELECT payload FROM tasks WHERE kind = 'render_capture_pdf'")]
+        conn.close()
+        assert payloads == [json.dumps({"capture_id": data["capture"]["id"]})]
+
+    POSTING = (
+        "Acme Robotics is hiring a senior backend engineer to build the fleet telemetry platform. "
+        "You will design Python services on PostgreSQL and Kafka, own on-call for the ingestion "
+        "pipeline, mentor two junior engineers and work closely with the firmware team in Dublin. "
+        "We offer a hybrid schedule, a learning budget and twenty-eight days of annual leave. "
+        "Applications close at the end of the month; interviews are two rounds including a "
+        "take-home exercise reviewed together with the hiring manager."
+    )
+
+    def test_quick_capture_detects_near_duplicate(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        first = client.post("/api/v1/captures/quick", json={
+            "url": "https://jobs.example.com/acme/123",
+            "title": "Senior Backend Engineer",
+            "text_snapshot": self.POSTING,
+        }, headers=h).json()
+
+        # Same posting on a mirror, with tracking parameters and extra page chrome
+        r = client.post("/api/v1/captures/quick", json={
+            "url": "https://mirror.example.org/view?id=123&utm_source=feed",
+            "text_snapshot": "Sign in  Jobs  " + self.POSTING + " Share this job",
+        }, headers=h)
+        assert r.status_code == 409
+        body = r.json()
+        assert body["job"]["id"] == first["job"]["id"]
+        assert body["similarity"] >= 0.8
+        assert "near-duplicate" in body["detail"]
+        assert client.get("/api/v1/jobs", headers=h).json()["total"] == 1
+
+        r = client.post("/api/v1/captures/quick", json={
+            "text_snapshot": self.POSTING, "allow_duplicate": True,
+        }, headers=h)
+        assert r.status_code == 201
+
+        r = client.post("/api/v1/captures/quick", json={
+            "text_snapshot": "Bakery in Galway seeks an early-shift pastry chef with laminated dough "
+                             "experience, food safety certification and a love of sourdough baking.",
+        }, headers=h)
+        assert r.status_code == 201
+
+    def test_exact_url_duplicate_returns_existing_job(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        first = client.post("/api/v1/captures/quick", json={
+            "url": "https://jobs.example.com/1", "text_snapshot": "Short posting",
+        }, headers=h).json()
+        r = client.post("/api/v1/captures/quick", json={
+            "url": "https://jobs.example.com/1", "text_snapshot": "Short posting",
+        }, headers=h)
+        assert r.status_code == 409
+        assert r.json()["job"]["id"] == first["job"]["id"]
+        assert r.json()["similarity"] is None
+
+    def test_old_captures_are_fingerprinted_in_background(self, client, tmp_vault):
+        import sqlite3
+
+        from app.services.task_service import task_queue
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = self._create_job(client, token)
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={"text_snapshot": self.POSTING}, headers=h)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        with conn:  # as if stored before fingerprints existed
+            conn.execute("UPDATE captures SET fingerprint = NULL")
+            conn.execute("DELETE FROM capture_bands")
+
+        client.post("/api/v1/captures/quick", json={"text_snapshot": "Unrelated short note"}, headers=h)
+        assert task_queue.wait_idle(timeout=30)
+        assert conn.execute("SELECT COUNT(*) FROM captures WHERE fingerprint IS NULL").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM capture_bands").fetchone()[0] == 16
+        conn.close()
+
+        r = client.post("/api/v1/captures/quick", json={"text_snapshot": self.POSTING}, headers=h)
+        assert r.status_code == 409
+        assert r.json()["job"]["id"] == job_id
+
+    def test_canonical_url(self):
+        from app.utils.urls import canonical_url
+
+        assert canonical_url("http://WWW.Example.com:443/jobs/1/?utm_source=li&b=2&a=1#apply") == \
+            "https://example.com/jobs/1?a=1&b=2"
+        assert canonical_url("example.com/jobs/1") == "https://example.com/jobs/1"
+        assert canonical_url("https://example.com:8443/jobs/1") == "https://example.com:8443/jobs/1"
+        assert canonical_url("https://example.com/jobs/1?id=7") != canonical_url("https://example.com/jobs/1?id=8")
+        assert canonical_url("chrome://extensions") is None
+        assert canonical_url("  ") is None
+
+    def test_lookup_matches_url_variants(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        first = client.post("/api/v1/captures/quick", json={
+            "url": "https://www.jobs.example.com/1/?utm_source=feed#apply", "text_snapshot": "Short posting",
+        }, headers=h).json()
+
+        r = client.get("/api/v1/captures/lookup", params={"url": "http://jobs.example.com/1"}, headers=h)
+        assert r.status_code == 200
+        assert r.json()["canonical_url"] == "https://jobs.example.com/1"
+        assert r.json()["job"]["id"] == first["job"]["id"]
+        r = client.get("/api/v1/captures/lookup", params={"url": "https://jobs.example.com/2"}, headers=h)
+        assert r.json()["job"] is None
+
+        r = client.post("/api/v1/captures/quick", json={
+            "url": "http://jobs.example.com/1?gclid=abc", "text_snapshot": "Short posting",
+        }, headers=h)
+        assert r.status_code == 409
+        assert r.json()["job"]["id"] == first["job"]["id"]
+
+        # Pages attached to a job as extra captures are found too
+        job_id = self._create_job(client, token)
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={"url": "https://other.example.com/x"}, headers=h)
+        r = client.get("/api/v1/captures/lookup", params={"url": "https://other.example.com/x/"}, headers=h)
+        assert r.json()["job"]["id"] == job_id
+
+        r = client.post("/api/v1/jobs", json={"title": "Again", "url": "jobs.example.com/1"}, headers=h)
+        assert r.status_code == 409
+
+    def test_url_claimed_concurrently_is_a_conflict(self, client, tmp_vault, monkeypatch):
+        from app.routers import jobs
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        first = client.post("/api/v1/jobs", json={"title": "First", "url": "https://jobs.example.com/1"}, headers=h)
+        other = client.post("/api/v1/jobs", json={"title": "Other"}, headers=h).json()
+
+        # The up-front check runs before the other request has committed
+        check = jobs._check_url_free
+        calls = []
+
+        async def late_check(*args):
+            calls.append(args)
+            if len(calls) > 1:
+                await check(*args)
+
+        monkeypatch.setattr(jobs, "_check_url_free", late_check)
+        r = client.post("/api/v1/jobs", json={"title": "Again", "url": "http://jobs.example.com/1/"}, headers=h)
+        assert r.status_code == 409
+        assert first.json()["id"] in r.json()["detail"]
+
+        calls.clear()
+        r = client.put(f"/api/v1/jobs/{other['id']}", json={"url": "jobs.example.com/1"}, headers=h)
+        assert r.status_code == 409
+        assert client.get(f"/api/v1/jobs/{other['id']}", headers=h).json()["url"] is None
+
+    def test_canonical_urls_are_backfilled(self, client, tmp_vault):
+        import sqlite3
+
+        from app.database import run_migrations
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/captures/quick", json={"url": "https://jobs.example.com/1"}, headers=h)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        with conn:  # as if stored before canonical URLs existed, with a duplicate
+            conn.execute("DELETE FROM vault_config WHERE key = 'canonical_urls_backfilled'")
+            conn.execute("UPDATE jobs SET canonical_url = NULL")
+            conn.execute("UPDATE captures SET canonical_url = NULL")
+            conn.execute(
+                "INSERT INTO jobs (id, title, url, created_at, updated_at) "
+                "VALUES ('dup', 'Later', 'http://jobs.example.com/1/', '2999-01-01', '2999-01-01')"
+            )
+        run_migrations(conn)
+        rows = dict(conn.execute("SELECT id, canonical_url FROM jobs").fetchall())
+        assert rows.pop("dup") is None
+        assert list(rows.values()) == ["https://jobs.example.com/1"]
+        assert conn.execute("SELECT canonical_url FROM captures").fetchone()[0] == "https://jobs.example.com/1"
+
+        # Recorded as done: later starts do not rescan rows left without a URL
+        with conn:
+            conn.execute("UPDATE captures SET canonical_url = NULL")
+        run_migrations(conn)
+        assert conn.execute("SELECT canonical_url FROM captures").fetchone()[0] is None
+        conn.close()
+
+        r = client.get("/api/v1/captures/lookup", params={"url": "jobs.example.com/1"}, headers=h)
+        assert r.json()["job"]["title"] != "Later"
+
+    def test_text_snapshots_are_stored_compressed_and_searchable(self, client, tmp_vault):
+        import sqlite3
+
+        from app.database import register_sql_functions
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = self._create_job(client, token)
+        text = "We need a glaciologist. " + self.POSTING * 5
+        r = client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "text_snapshot": text, "html_content": "<html>" + text + "</html>",
+        }, headers=h)
+        html_path = r.json()["html_path"]
+        assert html_path.endswith(".html.gz")
+
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        register_sql_functions(conn)
+        codec, size = conn.execute("SELECT codec, length(body) FROM capture_texts").fetchone()
+        assert codec == 1 and size < len(text) / 2
+        assert client.get(f"/api/v1/jobs/{job_id}/captures", headers=h).json()[0]["text_snapshot"] == text
+        r = client.get("/api/v1/search?q=glaciologist&scope=captures", headers=h)
+        assert r.json()["results"][0]["snippet"].startswith("We need a <mark>glaciologist</mark>")
+
+        client.delete(f"/api/v1/jobs/{job_id}", headers=h)
+        assert client.get("/api/v1/search?q=glaciologist&scope=captures", headers=h).json()["total"] == 0
+        conn.execute("INSERT INTO captures_fts(captures_fts, rank) VALUES ('integrity-check', 1)")
+        conn.close()
+
+    def test_migration_compresses_old_snapshots(self, client, tmp_vault):
+        import gzip
+        import sqlite3
+
+        from app.database import run_migrations
+        from app.services.task_service import task_queue
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = self._create_job(client, token)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        conn.executescript("""
+            DROP TRIGGER captures_ai; DROP TRIGGER captures_bd; DROP TRIGGER captures_au;
+            DROP TRIGGER capture_texts_ai; DROP TRIGGER capture_texts_ad;
+            DROP TABLE captures_fts; DROP VIEW captures_fts_content;
+            ALTER TABLE captures ADD COLUMN text_snapshot TEXT;
+            CREATE VIRTUAL TABLE captures_fts USING fts5(
+                page_title, text_snapshot, content='captures', content_rowid='rowid');
+            CREATE TRIGGER captures_ai AFTER INSERT ON captures BEGIN
+                INSERT INTO captures_fts(rowid, page_title, text_snapshot)
+                VALUES (new.rowid, new.page_title, new.text_snapshot);
+            END;
+        """)  # the layout before v0.15
+        html = tmp_vault / "jobs" / job_id / "captures" / "old.html"
+        html.write_text("<html>old posting</html>")
+        with conn:
+            conn.execute(
+                "INSERT INTO captures (id, job_id, text_snapshot, html_path, capture_method) "
+                "VALUES ('old', ?, ?, ?, 'manual_paste')",
+                (job_id, "Volcanologist wanted. " * 50, f"jobs/{job_id}/captures/old.html"),
+            )
+
+        run_migrations(conn)
+        run_migrations(conn)  # a no-op once applied
+        assert "text_snapshot" not in {row[1] for row in conn.execute("PRAGMA table_info(captures)")}
+        assert conn.execute("SELECT codec FROM capture_texts WHERE capture_id = 'old'").fetchone()[0] == 1
+        conn.close()
+        r = client.get("/api/v1/search?q=volcanologist&scope=captures", headers=h)
+        assert r.json()["total"] == 1
+        captures = client.get(f"/api/v1/jobs/{job_id}/captures", headers=h).json()
+        assert captures[0]["text_snapshot"] == "Volcanologist wanted. " * 50
+
+        task_queue.notify()
+        assert task_queue.wait_idle(timeout=30)
+        captures = client.get(f"/api/v1/jobs/{job_id}/captures", headers=h).json()
+        assert captures[0]["html_path"].endswith("old.html.gz")
+        assert not html.exists()
+        assert gzip.decompress((tmp_vault / captures[0]["html_path"]).read_bytes()) == b"<html>old posting</html>"
@@ -1,4 +1,10 @@
+import hashlib
 import io
+import sqlite3
+
+from app.config import settings
+from app.database import register_sql_functions
+from app.services.task_service import task_queue
 
 
 class TestDocuments:
@@ -52,6 +58,41 @@ class TestDocuments:
             headers=h,
         )
         assert r.status_code == 409
+        # The rejected upload leaves nothing behind
+        stored = [p for p in (tmp_vault / "blobs").rglob("*") if p.is_file()]
+        assert [p.name for p in stored] == [hashlib.sha256(content).hexdigest()]
+
+    def test_large_upload_streams_to_disk(self, client, tmp_vault, monkeypatch):
+        monkeypatch.setattr(settings, "max_upload_bytes", 4 * 1024 * 1024)
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_id = self._create_job(client, token)
+        content = bytes(range(256)) * (10 * 1024)  # 2.5 MiB, several chunks
+
+        r = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("big.pdf", content, "application/pdf")},
+            data={"doc_type": "portfolio"},
+            headers=self._auth(token),
+        )
+        assert r.status_code == 201
+        data = r.json()
+        assert data["file_hash"] == hashlib.sha256(content).hexdigest()
+        assert data["file_size_bytes"] == len(content)
+        assert (tmp_vault / data["stored_path"]).read_bytes() == content
+
+    def test_oversized_upload_leaves_no_temp_file(self, client, tmp_vault, monkeypatch):
+        monkeypatch.setattr(settings, "max_upload_bytes", 1024 * 1024)
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_id = self._create_job(client, token)
+
+        r = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("big.pdf", b"x" * (2 * 1024 * 1024), "application/pdf")},
+            data={"doc_type": "portfolio"},
+            headers=self._auth(token),
+        )
+        assert r.status_code == 413
+        assert [p for p in (tmp_vault / "blobs").rglob("*") if p.is_file()] == []
 
     def test_list_documents(self, client, tmp_vault):
         token = self._setup_and_unlock(client, tmp_vault)
@@ -75,6 +116,14 @@ class TestDocuments:
         assert r.status_code == 200
         assert len(r.json()) == 2
 
+        r = client.get(f"/api/v1/jobs/{job_id}/documents?fields=original_filename,doc_type", headers=h)
+        assert sorted(r.json(), key=lambda d: d["doc_type"]) == [
+            {"doc_type": "cover_letter", "original_filename": "cover.pdf"},
+            {"doc_type": "cv", "original_filename": "resume.pdf"},
+        ]
+        r = client.get(f"/api/v1/jobs/{job_id}/documents?view=summary", headers=h)
+        assert "stored_path" not in r.json()[0] and "submitted_at" in r.json()[0]
+
     def test_download_document(self, client, tmp_vault):
         token = self._setup_and_unlock(client, tmp_vault)
         job_id = self._create_job(client, token)
@@ -160,6 +209,80 @@ class TestDocuments:
         assert r.status_code == 200
         assert r.json()["verified"] is True
 
+    def _blob_refcount(self, tmp_vault, file_hash):
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        try:
+            row = conn.execute("SELECT refcount FROM blobs WHERE hash = ?", (file_hash,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def test_identical_uploads_share_one_blob(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_ids = [self._create_job(client, token) for _ in range(2)]
+        docs = [
+            client.post(
+                f"/api/v1/jobs/{job_id}/documents",
+                files={"file": ("cv.pdf", b"the same cv", "application/pdf")},
+                data={"doc_type": "cv"},
+                headers=h,
+            ).json()
+            for job_id in job_ids
+        ]
+        assert docs[0]["stored_path"] == docs[1]["stored_path"]
+        blob = tmp_vault / docs[0]["stored_path"]
+        assert [p for p in (tmp_vault / "blobs").rglob("*") if p.is_file()] == [blob]
+        assert self._blob_refcount(tmp_vault, docs[0]["file_hash"]) == 2
+
+        # Deleting a job releases its reference; the last one removes the file
+        client.delete(f"/api/v1/jobs/{job_ids[0]}", headers=h)
+        assert task_queue.wait_idle(timeout=30)
+        assert blob.exists()
+        assert self._blob_refcount(tmp_vault, docs[0]["file_hash"]) == 1
+
+        client.delete(f"/api/v1/jobs/{job_ids[1]}", headers=h)
+        assert task_queue.wait_idle(timeout=30)
+        assert not blob.exists()
+        assert self._blob_refcount(tmp_vault, docs[0]["file_hash"]) is None
+
+    def test_migrate_vault_dedupes_per_job_copies(self, client, tmp_vault):
+        from app.services.blob_service import blob_path, migrate_vault
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_ids = [self._create_job(client, token) for _ in range(3)]
+        content = b"legacy cv"
+        file_hash = hashlib.sha256(content).hexdigest()
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        with conn:
+            for i, job_id in enumerate(job_ids):
+                rel = f"jobs/{job_id}/documents/{file_hash[:8]}_cv.pdf"
+                (tmp_vault / rel).parent.mkdir(parents=True, exist_ok=True)
+                # The last copy was altered on disk and must be left alone
+                (tmp_vault / rel).write_bytes(content if i < 2 else b"tampered")
+                conn.execute(
+                    "INSERT INTO documents (id, job_id, doc_type, original_filename, stored_path,"
+                    " file_hash, file_size_bytes, created_at) VALUES (?, ?, 'cv', 'cv.pdf', ?, ?, ?, '2024-01-01')",
+                    (f"doc-{i}", job_id, rel, file_hash, len(content)),
+                )
+        conn.close()
+
+        stats = migrate_vault(tmp_vault)
+        assert stats["migrated"] == 2
+        assert stats["deduplicated"] == 1
+        assert stats["bytes_reclaimed"] == len(content)
+        assert stats["mismatched"] == 1
+        assert (tmp_vault / blob_path(file_hash)).read_bytes() == content
+        assert not (tmp_vault / f"jobs/{job_ids[0]}/documents/{file_hash[:8]}_cv.pdf").exists()
+        assert (tmp_vault / f"jobs/{job_ids[2]}/documents/{file_hash[:8]}_cv.pdf").exists()
+        assert self._blob_refcount(tmp_vault, file_hash) == 2
+        # Idempotent
+        assert migrate_vault(tmp_vault)["migrated"] == 0
+
+        h = self._auth(token)
+        r = client.get(f"/api/v1/jobs/{job_ids[1]}/documents/doc-1/download", headers=h)
+        assert r.content == content
+
     # --- P4: CV-to-job keyword match score ---
 
     def test_match_with_capture_returns_score(self, client, tmp_vault):
@@ -209,3 +332,279 @@ class TestDocuments:
         r = client.get(f"/api/v1/jobs/{job_id}/documents/{doc_id}/match", headers=h)
         assert r.status_code == 200
         assert r.json()["score"] == 0
+
+    def test_match_uses_cached_document_text(self, client, tmp_vault, monkeypatch):
+        from app.services import match_service
+
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_id = self._create_job(client, token)
+        h = self._auth(token)
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "text_snapshot": "Python developer with Kubernetes experience",
+        }, headers=h)
+        doc_id = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.txt", b"Python developer, Django", "text/plain")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()["id"]
+        # Filled at upload time by a background task
+        assert task_queue.wait_idle(timeout=30)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        tokens = conn.execute("SELECT tokens FROM document_texts").fetchall()
+        conn.close()
+        assert tokens == [("developer django python",)]
+
+        def fail(*args):
+            raise AssertionError("document text should come from the cache")
+        monkeypatch.setattr(match_service, "extract_text_from_file", fail)
+
+        r = client.get(f"/api/v1/jobs/{job_id}/documents/{doc_id}/match", headers=h)
+        assert r.status_code == 200
+        assert r.json()["matched"] == ["developer", "python"]
+
+    def test_match_fills_text_cache_lazily(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_id = self._create_job(client, token)
+        h = self._auth(token)
+        doc_id = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.txt", b"Python developer", "text/plain")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()["id"]
+        assert task_queue.wait_idle(timeout=30)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        with conn:
+            conn.execute("DELETE FROM document_texts")
+
+        client.get(f"/api/v1/jobs/{job_id}/documents/{doc_id}/match", headers=h)
+        assert conn.execute("SELECT tokens FROM document_texts").fetchall() == [("developer python",)]
+        conn.close()
+
+    def test_match_all_ranks_jobs(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        postings = {
+            "Backend": "Python Django PostgreSQL developer",
+            "Data": "Python pandas statistics analyst",
+            "Nurse": "Registered nurse ward shifts",
+        }
+        job_ids = {}
+        for title, text in postings.items():
+            job_ids[title] = client.post("/api/v1/jobs", json={"title": title}, headers=h).json()["id"]
+            client.post(f"/api/v1/jobs/{job_ids[title]}/captures", json={"text_snapshot": text}, headers=h)
+        client.put(f"/api/v1/jobs/{job_ids['Data']}", json={"status": "REJECTED"}, headers=h)
+        doc_id = client.post(
+            f"/api/v1/jobs/{job_ids['Backend']}/documents",
+            files={"file": ("cv.txt", b"Python Django developer, some statistics", "text/plain")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()["id"]
+
+        r = client.post(f"/api/v1/documents/{doc_id}/match-all", json={"limit": 5}, headers=h)
+        assert r.status_code == 200
+        results = r.json()["results"]
+        assert [m["title"] for m in results] == ["Backend", "Data"]  # no overlap with Nurse
+        # "python" appears in two of three jobs, so it weighs less than the rest
+        assert results[0]["score"] == 71.3
+        assert results[0]["matched"] == ["developer", "django", "python"]
+        assert results[0]["missing"] == ["postgresql"]
+
+        r = client.post(f"/api/v1/documents/{doc_id}/match-all", json={"statuses": ["SAVED"]}, headers=h)
+        assert [m["title"] for m in r.json()["results"]] == ["Backend"]
+
+        client.delete(f"/api/v1/jobs/{job_ids['Data']}", headers=h)
+        r = client.post(f"/api/v1/documents/{doc_id}/match-all", headers=h)
+        assert [m["title"] for m in r.json()["results"]] == ["Backend"]
+
+    def test_match_all_backfills_legacy_captures(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = self._create_job(client, token)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        register_sql_functions(conn)
+        with conn:
+            conn.execute(
+                "INSERT INTO captures (id, job_id, capture_method) VALUES (?, ?, 'manual_paste')", ("legacy", job_id),
+            )
+            conn.execute(
+                "INSERT INTO capture_texts (capture_id, codec, body) VALUES (?, 0, ?)",
+                ("legacy", b"Kubernetes platform engineer"),
+            )
+        conn.close()
+        doc_id = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.txt", b"Kubernetes engineer", "text/plain")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()["id"]
+
+        results = client.post(f"/api/v1/documents/{doc_id}/match-all", headers=h).json()["results"]
+        assert [(m["job_id"], m["score"]) for m in results] == [(job_id, 66.7)]  # one job: equal weights
+
+    def test_match_all_missing_document(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        r = client.post("/api/v1/documents/nope/match-all", headers=self._auth(token))
+        assert r.status_code == 404
+
+    def test_match_weights_rare_terms_higher(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_ids = []
+        for text in ["experience kubernetes", "experience cooking", "experience gardening", "experience driving"]:
+            job_id = self._create_job(client, token)
+            client.post(f"/api/v1/jobs/{job_id}/captures", json={"text_snapshot": text}, headers=h)
+            job_ids.append(job_id)
+
+        def score(content):
+            doc_id = client.post(
+                f"/api/v1/jobs/{job_ids[0]}/documents",
+                files={"file": ("cv.txt", content, "text/plain")},
+                data={"doc_type": "cv"},
+                headers=h,
+            ).json()["id"]
+            return client.get(f"/api/v1/jobs/{job_ids[0]}/documents/{doc_id}/match", headers=h).json()
+
+        rare, common = score(b"kubernetes"), score(b"experience")
+        assert rare["score"] > 50 > common["score"]
+        assert rare["missing"] == ["experience"]
+
+    def test_term_stats_follow_capture_inserts_and_job_deletes(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+
+        def stats():
+            df = dict(conn.execute("SELECT term, df FROM term_stats"))
+            return conn.execute("SELECT jobs FROM term_corpus").fetchone()[0], df
+
+        a, b = self._create_job(client, token), self._create_job(client, token)
+        client.post(f"/api/v1/jobs/{a}/captures", json={"text_snapshot": "python rust"}, headers=h)
+        client.post(f"/api/v1/jobs/{a}/captures", json={"text_snapshot": "python golang"}, headers=h)
+        client.post(f"/api/v1/jobs/{b}/captures", json={"text_snapshot": "python"}, headers=h)
+        assert stats() == (2, {"python": 2, "rust": 1, "golang": 1})
+
+        client.delete(f"/api/v1/jobs/{a}", headers=h)
+        assert stats() == (1, {"python": 1})
+        conn.close()
+
+    @staticmethod
+    def _pdf(*pages: str) -> bytes:
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        pdf.set_font("Helvetica", size=12)
+        for text in pages:
+            pdf.add_page()
+            pdf.cell(0, 10, text)
+        return bytes(pdf.output())
+
+    def test_extraction_sniffs_content_and_splits_pages(self, tmp_path, monkeypatch):
+        import zipfile
+
+        from app.services.extraction_service import extract_text
+
+        monkeypatch.setattr(settings, "extract_pages_per_task", 1)
+        pdf = tmp_path / "blob"  # no suffix, like the blob store
+        pdf.write_bytes(self._pdf("kubernetes", "terraform", "golang"))
+        assert extract_text(pdf).split() == ["kubernetes", "terraform", "golang"]
+
+        docx = tmp_path / "cv.bin"
+        with zipfile.ZipFile(docx, "w") as zf:
+            zf.writestr("word/document.xml", "<w:document><w:p><w:t>Rust &amp; Go</w:t></w:p></w:document>")
+        assert extract_text(docx).strip() == "Rust & Go"
+
+        binary = tmp_path / "noise"
+        binary.write_bytes(bytes(range(256)) * 4)
+        assert extract_text(binary) == ""
+
+    def test_extraction_timeout_spares_other_files(self, tmp_path, monkeypatch):
+        import threading
+        import time
+
+        from app.services import extraction_service
+
+        monkeypatch.setattr(extraction_service, "_extractors", [
+            extraction_service.Extractor("slow", lambda head: head.startswith(b"SLOW"), _marked_slow_extract),
+            extraction_service.Extractor("nap", lambda head: head.startswith(b"NAP"), _nap_extract),
+        ])
+        monkeypatch.setattr(settings, "extract_workers", 2)
+        stuck, other = tmp_path / "stuck", tmp_path / "other"
+        stuck.write_bytes(b"SLOW")
+        other.write_bytes(b"NAP")
+
+        monkeypatch.setattr(settings, "extract_timeout_seconds", 1.0)
+        errors = []
+
+        def run_stuck():
+            try:
+                extraction_service.extract_text(stuck)
+            except extraction_service.ExtractionTimeout as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=run_stuck)
+        thread.start()
+        marker = tmp_path / "stuck.started"
+        for _ in range(300):
+            if marker.exists():
+                break
+            time.sleep(0.05)
+        assert marker.exists()
+
+        # Still running when the stuck file's workers are killed
+        monkeypatch.setattr(settings, "extract_timeout_seconds", 30.0)
+        assert extraction_service.extract_text(other) == "finished"
+        thread.join()
+        assert len(errors) == 1
+
+    def test_extraction_timeout_is_reported_and_not_cached(self, client, tmp_vault, monkeypatch):
+        from app.services import extraction_service
+
+        monkeypatch.setattr(extraction_service, "_extractors", [
+            extraction_service.Extractor("slow", lambda head: head.startswith(b"SLOW"), _slow_extract),
+            *extraction_service._extractors,
+        ])
+        monkeypatch.setattr(settings, "extract_timeout_seconds", 0.5)
+        monkeypatch.setattr(settings, "task_max_attempts", 1)
+        token = self._setup_and_unlock(client, tmp_vault)
+        job_id = self._create_job(client, token)
+        h = self._auth(token)
+        doc_id = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.txt", b"SLOW python", "text/plain")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()["id"]
+        assert task_queue.wait_idle(timeout=30)
+
+        r = client.get(f"/api/v1/jobs/{job_id}/documents/{doc_id}/match", headers=h)
+        assert r.status_code == 422
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        assert conn.execute("SELECT COUNT(*) FROM document_texts").fetchone()[0] == 0
+        assert conn.execute("SELECT status FROM tasks WHERE kind = 'extract_document_text'").fetchone() == ("failed",)
+        conn.close()
+
+
+def _marked_slow_extract(path: str, start: int = 0, stop: int | None = None) -> tuple[str, int]:
+    import time
+    from pathlib import Path
+
+    Path(path + ".started").touch()
+    time.sleep(60)
+    return "", 1
+
+
+def _nap_extract(path: str, start: int = 0, stop: int | None = None) -> tuple[str, int]:
+    import time
+
+    time.sleep(3)
+    return "finished", 1
+
+
+def _slow_extract(path: str, start: int = 0, stop: int | None = None) -> tuple[str, int]:
+    # Module-level so extraction workers can unpickle it.
+    import time
+
+    time.sleep(60)
+    return "", 1
@@ -44,6 +44,11 @@ class TestEvents:
         assert events[0]["event_type"] == "SAVED"
         assert events[2]["event_type"] == "INTERVIEW"
 
+        r = client.get(f"/api/v1/jobs/{job_id}/events?view=summary", headers=h)
+        assert [sorted(e) for e in r.json()] == [["event_type", "id", "job_id", "next_action_date", "occurred_at"]] * 3
+        r = client.get(f"/api/v1/jobs/{job_id}/events?fields=event_type", headers=h)
+        assert r.json() == [{"event_type": "SAVED"}, {"event_type": "SHORTLISTED"}, {"event_type": "INTERVIEW"}]
+
     def test_invalid_event_type(self, client, tmp_vault):
         token = self._setup_and_unlock(client, tmp_vault)
         job_id = self._create_job(client, token)
@@ -0,0 +1,206 @@
+import json
+import sqlite3
+
+from app.database import register_sql_functions
+from app.services import match_service
+
+
+class TestNdjsonImport:
+    def _setup_and_unlock(self, client, tmp_vault):
+        client.post("/api/v1/vault/setup", json={
+            "passphrase": "test-passphrase-123",
+            "vault_path": str(tmp_vault),
+        })
+        r = client.post("/api/v1/vault/unlock", json={"passphrase": "test-passphrase-123"})
+        return r.json()["token"]
+
+    def _auth(self, token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def _ndjson(self, *records):
+        return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records) + "\n"
+
+    def test_import_jobs_and_captures(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        posting = "Kubernetes platform engineer building observability pipelines " * 20
+
+        body = self._ndjson(
+            {"title": "Platform Engineer", "organisation": "Acme", "url": "https://acme.example/jobs/1",
+             "status": "SUBMITTED",
+             "captures": [{"url": "https://acme.example/jobs/1", "page_title": "Acme careers",
+                           "text_snapshot": posting}]},
+            {"title": "Data Analyst", "organisation": "Globex"},
+        )
+        r = client.post("/api/v1/import/ndjson", content=body, headers=h)
+        assert r.status_code == 200
+        assert r.json() == {"jobs": 2, "captures": 1, "errors": []}
+
+        jobs = client.get("/api/v1/jobs", headers=h).json()["jobs"]
+        assert {j["title"]: j["status"] for j in jobs} == {"Platform Engineer": "SUBMITTED", "Data Analyst": "SAVED"}
+        imported = next(j for j in jobs if j["title"] == "Platform Engineer")
+        assert imported["capture_count"] == 1
+        assert imported["event_count"] == 1
+
+        # The empty vault's indexes were rebuilt once at the end, and the triggers are back
+        results = client.get("/api/v1/search", params={"q": "observability"}, headers=h).json()
+        assert any(item["job_id"] == imported["id"] for item in results["results"])
+        results = client.get("/api/v1/search", params={"q": "Globex"}, headers=h).json()
+        assert len(results["results"]) == 1
+
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        register_sql_functions(conn)
+        triggers = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert {"jobs_ai", "captures_ai", "capture_texts_ai", "term_stats_ai", "job_term_changes_ai"} <= triggers
+        conn.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('integrity-check')")
+        conn.execute("INSERT INTO captures_fts(captures_fts) VALUES ('integrity-check')")
+        queued = conn.execute("SELECT COUNT(*) FROM tasks WHERE kind = 'fingerprint_captures'").fetchone()[0]
+        assert queued == 1
+
+        # Match terms are stored with the import, and the corpus statistics
+        # agree with what the per-row triggers would have produced
+        assert conn.execute(
+            "SELECT COUNT(*) FROM captures WHERE terms_version IS NULL"
+        ).fetchone()[0] == 0
+        assert dict(conn.execute("SELECT term, df FROM term_stats").fetchall()) == dict(conn.execute(
+            "SELECT term, COUNT(*) FROM job_terms GROUP BY term"
+        ).fetchall())
+        assert conn.execute("SELECT jobs FROM term_corpus").fetchone()[0] == 1
+        assert conn.execute("SELECT job_id FROM job_term_changes").fetchall() == [(imported["id"],)]
+        conn.close()
+        ranked = match_service.rank_jobs({"kubernetes", "observability"})
+        assert [m["job_id"] for m in ranked] == [imported["id"]]
+
+        client.post("/api/v1/jobs", json={"title": "Created Later"}, headers=h)
+        results = client.get("/api/v1/search", params={"q": "Later"}, headers=h).json()
+        assert len(results["results"]) == 1
+
+    def test_import_reports_bad_records_by_line(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/jobs", json={"title": "Existing", "url": "https://acme.example/jobs/1"}, headers=h)
+
+        body = self._ndjson(
+            {"title": "Good One"},
+            "{not json",
+            "",
+            {"organisation": "No title"},
+            {"title": "Bad status", "status": "MAYBE"},
+            {"title": "Already here", "url": "http://www.acme.example/jobs/1/?utm_source=feed"},
+            {"title": "First", "url": "https://globex.example/jobs/9"},
+            {"title": "Second", "captures": [{"url": "https://globex.example/jobs/9#apply"}]},
+        )
+        r = client.post("/api/v1/import/ndjson", content=body, headers=h)
+        assert r.status_code == 200
+        data = r.json()
+        assert data["jobs"] == 2
+        assert data["captures"] == 0
+        errors = {e["line"]: e["error"] for e in data["errors"]}
+        assert sorted(errors) == [2, 4, 5, 6, 8]
+        assert errors[2].startswith("Invalid JSON")
+        assert errors[4].startswith("title:")
+        assert errors[5].startswith("status:")
+        assert errors[6] == "Already in vault: https://acme.example/jobs/1"
+        assert errors[8] == "Duplicate of line 7: https://globex.example/jobs/9"
+
+        titles = {j["title"] for j in client.get("/api/v1/jobs", headers=h).json()["jobs"]}
+        assert titles == {"Existing", "Good One", "First"}
+
+    def test_small_import_indexes_only_new_rows(self, client, tmp_vault, monkeypatch):
+        from app.services import import_service
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        for i in range(3):
+            job_id = client.post("/api/v1/jobs", json={"title": f"Existing {i}"}, headers=h).json()["id"]
+            client.post(f"/api/v1/jobs/{job_id}/captures", json={
+                "text_snapshot": "Greenhouse irrigation", "capture_method": "manual_paste",
+            }, headers=h)
+
+        statements = []
+
+        def traced(conn):
+            register_sql_functions(conn)
+            conn.set_trace_callback(statements.append)
+
+        monkeypatch.setattr(import_service, "register_sql_functions", traced)
+        body = self._ndjson({"title": "Orchardist", "captures": [{"text_snapshot": "Apple pruning"}]})
+        assert client.post("/api/v1/import/ndjson", content=body, headers=h).json()["jobs"] == 1
+        assert not any("'rebuild'" in sql for sql in statements)
+
+        for q, total in (("Orchardist", 1), ("pruning", 1), ("Existing", 3), ("irrigation", 3)):
+            assert client.get("/api/v1/search", params={"q": q}, headers=h).json()["total"] == total
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        register_sql_functions(conn)
+        conn.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('integrity-check')")
+        conn.execute("INSERT INTO captures_fts(captures_fts) VALUES ('integrity-check')")
+        conn.close()
+
+    def test_import_reads_the_body_before_locking_the_vault(self, client, tmp_vault):
+        from app.services.import_service import BulkImporter, parse_import_record
+
+        self._setup_and_unlock(client, tmp_vault)
+        importer = BulkImporter(tmp_vault / "db.sqlite")
+        importer.add(1, parse_import_record(b'{"title": "Spooled"}'))
+
+        # Nothing holds the write lock while records are still arriving
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"), timeout=0, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ROLLBACK")
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+        assert importer.run().jobs == 1
+        assert conn.execute("SELECT title FROM jobs").fetchall() == [("Spooled",)]
+        conn.close()
+
+    def test_import_spans_batches(self, client, tmp_vault, monkeypatch):
+        from app.services import import_service
+        monkeypatch.setattr(import_service, "IMPORT_BATCH_SIZE", 3)
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+
+        body = self._ndjson(*(
+            {"title": f"Job {i}", "url": f"https://example.com/jobs/{i % 7}"} for i in range(10)
+        ))
+        r = client.post("/api/v1/import/ndjson", content=body, headers=h)
+        data = r.json()
+        assert data["jobs"] == 7
+        assert [e["line"] for e in data["errors"]] == [8, 9, 10]
+        assert client.get("/api/v1/jobs", headers=h).json()["total"] == 7
+
+    def test_import_rejects_overlong_lines(self, client, tmp_vault, monkeypatch):
+        from app.routers import imports
+        monkeypatch.setattr(imports, "_LINE_OVERHEAD_BYTES", 100)
+        monkeypatch.setattr(imports.settings, "max_text_snapshot_chars", 10)
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+
+        body = self._ndjson(
+            {"title": "Short"},
+            {"title": "Long", "notes": "x" * 500},
+            {"title": "After"},
+        )
+        r = client.post("/api/v1/import/ndjson", content=body, headers=h)
+        assert r.json()["jobs"] == 2
+        assert r.json()["errors"] == [{"line": 2, "error": "Line too long"}]
+
+    def test_overlong_line_is_skipped_as_it_streams(self):
+        import asyncio
+
+        from app.routers.imports import _ndjson_lines
+
+        async def chunks():
+            yield b'{"title": "a"}\n' + b"x" * 8
+            for _ in range(5):
+                yield b"x" * 8  # never buffered past the limit
+            yield b'x\n{"title": "b"}\n' + b"y" * 20
+
+        async def collect():
+            return [item async for item in _ndjson_lines(chunks(), 16)]
+
+        assert asyncio.run(collect()) == [(1, b'{"title": "a"}'), (2, None), (3, b'{"title": "b"}'), (4, None)]
+
+    def test_import_requires_auth(self, client, tmp_vault):
+        self._setup_and_unlock(client, tmp_vault)
+        r = client.post("/api/v1/import/ndjson", content='{"title": "x"}\n',
+                        headers={"Authorization": "Bearer invalid_token"})
+        assert r.status_code == 401
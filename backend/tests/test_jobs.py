@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 
 
 class TestJobsCRUD:
@@ -82,6 +83,344 @@ class TestJobsCRUD:
         r = client.get("/api/v1/jobs?status=SUBMITTED", headers=h)
         assert r.json()["total"] == 0
 
+    def test_list_jobs_query_count_is_constant(self, client, tmp_vault, test_async_engine):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        engine = test_async_engine.sync_engine
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        def _count_list_queries():
+            statements.clear()
+            event.listen(engine, "before_cursor_execute", _record)
+            try:
+                r = client.get("/api/v1/jobs?per_page=100", headers=h)
+            finally:
+                event.remove(engine, "before_cursor_execute", _record)
+            assert r.status_code == 200
+            return len(statements)
+
+        job_id = client.post("/api/v1/jobs", json={"title": "Job 0"}, headers=h).json()["id"]
+        client.post(f"/api/v1/jobs/{job_id}/tags", json={"name": "remote"}, headers=h)
+        small = _count_list_queries()
+
+        for i in range(1, 15):
+            r = client.post("/api/v1/jobs", json={"title": f"Job {i}"}, headers=h)
+            client.post(f"/api/v1/jobs/{r.json()['id']}/tags", json={"name": "remote"}, headers=h)
+        large = _count_list_queries()
+
+        assert small == large
+
+    def test_list_jobs_includes_counts_and_tags(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = client.post("/api/v1/jobs", json={"title": "Tagged"}, headers=h).json()["id"]
+        client.post("/api/v1/jobs", json={"title": "Plain"}, headers=h)
+        client.post(f"/api/v1/jobs/{job_id}/tags", json={"name": "priority"}, headers=h)
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "text_snapshot": "posting", "capture_method": "manual_paste",
+        }, headers=h)
+
+        jobs = {j["title"]: j for j in client.get("/api/v1/jobs", headers=h).json()["jobs"]}
+        assert jobs["Tagged"]["tags"] == ["priority"]
+        assert jobs["Tagged"]["capture_count"] == 1
+        assert jobs["Tagged"]["event_count"] == 1
+        assert jobs["Plain"]["tags"] == []
+        assert jobs["Plain"]["capture_count"] == 0
+
+    def test_list_jobs_projection(self, client, tmp_vault, test_async_engine):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        for i in range(3):
+            job_id = client.post("/api/v1/jobs", json={"title": f"Job {i}", "notes": "..."}, headers=h).json()["id"]
+            client.post(f"/api/v1/jobs/{job_id}/tags", json={"name": "remote"}, headers=h)
+        engine = test_async_engine.sync_engine
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            r = client.get("/api/v1/jobs?view=summary&per_page=2", headers=h)
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+        assert r.status_code == 200
+        body = r.json()
+        assert list(body["jobs"][0]) == ["id", "title", "organisation", "status", "deadline_date", "updated_at"]
+        assert body["total"] == 3 and body["next_cursor"]
+        assert not any("notes" in s or "tags" in s for s in statements)
+
+        r = client.get(f"/api/v1/jobs?fields=tags,title&tag=remote&per_page=2&cursor={body['next_cursor']}", headers=h)
+        [job] = r.json()["jobs"]
+        assert list(job) == ["title", "tags"] and job["tags"] == ["remote"]
+        assert job["title"] not in [j["title"] for j in body["jobs"]]
+
+        r = client.get("/api/v1/jobs?fields=title,secret", headers=h)
+        assert r.status_code == 400
+
     def test_requires_auth(self, client, tmp_vault):
         r = client.post("/api/v1/jobs", json={"title": "Test"})
         assert r.status_code == 422  # missing header
+
+    def test_cursor_pagination_walks_all_jobs(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        for i in range(5):
+            client.post("/api/v1/jobs", json={"title": f"Job {i}"}, headers=h)
+
+        seen: list[str] = []
+        r = client.get("/api/v1/jobs?per_page=2&total=none", headers=h).json()
+        assert r["total"] is None
+        seen.extend(j["id"] for j in r["jobs"])
+        while r["next_cursor"]:
+            r = client.get(f"/api/v1/jobs?per_page=2&cursor={r['next_cursor']}&total=none", headers=h).json()
+            seen.extend(j["id"] for j in r["jobs"])
+
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+        page_mode = client.get("/api/v1/jobs?per_page=5", headers=h).json()
+        assert [j["id"] for j in page_mode["jobs"]] == seen
+        assert page_mode["next_cursor"] is None
+
+    def test_cursor_respects_status_filter(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        for i in range(3):
+            client.post("/api/v1/jobs", json={"title": f"Saved {i}"}, headers=h)
+        job_id = client.post("/api/v1/jobs", json={"title": "Applied"}, headers=h).json()["id"]
+        client.put(f"/api/v1/jobs/{job_id}", json={"status": "SUBMITTED"}, headers=h)
+
+        first = client.get("/api/v1/jobs?status=SAVED&per_page=2", headers=h).json()
+        assert first["total"] == 3
+        second = client.get(
+            f"/api/v1/jobs?status=SAVED&per_page=2&cursor={first['next_cursor']}", headers=h
+        ).json()
+        titles = [j["title"] for j in first["jobs"] + second["jobs"]]
+        assert sorted(titles) == ["Saved 0", "Saved 1", "Saved 2"]
+        assert second["next_cursor"] is None
+
+    def test_estimated_total(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/jobs", json={"title": "Job 1"}, headers=h)
+        client.post("/api/v1/jobs", json={"title": "Job 2"}, headers=h)
+
+        r = client.get("/api/v1/jobs?total=estimate", headers=h).json()
+        assert r["total_is_estimate"] is True
+        assert r["total"] >= 2
+        r = client.get("/api/v1/jobs?status=SAVED&total=estimate", headers=h).json()
+        assert r["total"] == 2
+
+    def test_invalid_cursor_rejected(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        r = client.get("/api/v1/jobs?cursor=not-a-cursor", headers=self._auth(token))
+        assert r.status_code == 400
+
+    def test_text_filter_uses_fts(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/jobs", json={"title": "Kubernetes Engineer", "organisation": "Acme"}, headers=h)
+        client.post("/api/v1/jobs", json={"title": "Data Analyst", "notes": "acme referral"}, headers=h)
+        client.post("/api/v1/jobs", json={"title": "Chef"}, headers=h)
+
+        r = client.get("/api/v1/jobs?q=acme", headers=h).json()
+        assert r["total"] == 2
+        r = client.get("/api/v1/jobs?q=kuber", headers=h).json()
+        assert [j["title"] for j in r["jobs"]] == ["Kubernetes Engineer"]
+        r = client.get("/api/v1/jobs?q=kuber&prefix=false", headers=h).json()
+        assert r["total"] == 0
+        # FTS operators in user input are treated as plain words, not syntax
+        r = client.get('/api/v1/jobs?q="acme" NEAR(', headers=h)
+        assert r.status_code == 200
+
+    def test_text_filter_combines_with_status_and_tag(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        a = client.post("/api/v1/jobs", json={"title": "Python Developer"}, headers=h).json()["id"]
+        b = client.post("/api/v1/jobs", json={"title": "Python Tutor"}, headers=h).json()["id"]
+        client.put(f"/api/v1/jobs/{b}", json={"status": "SUBMITTED"}, headers=h)
+        client.post(f"/api/v1/jobs/{a}/tags", json={"name": "remote"}, headers=h)
+
+        r = client.get("/api/v1/jobs?q=python&status=SUBMITTED", headers=h).json()
+        assert [j["id"] for j in r["jobs"]] == [b]
+        r = client.get("/api/v1/jobs?q=python&tag=remote", headers=h).json()
+        assert [j["id"] for j in r["jobs"]] == [a]
+        r = client.get("/api/v1/jobs?q=!!!", headers=h).json()
+        assert r["total"] == 0
+
+    def test_delete_job_with_children(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = client.post("/api/v1/jobs", json={"title": "Busy Job"}, headers=h).json()["id"]
+        client.post(f"/api/v1/jobs/{job_id}/tags", json={"name": "remote"}, headers=h)
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "text_snapshot": "posting", "capture_method": "manual_paste",
+        }, headers=h)
+
+        assert client.delete(f"/api/v1/jobs/{job_id}", headers=h).status_code == 200
+        tags = client.get("/api/v1/tags", headers=h).json()
+        assert tags[0]["job_count"] == 0
+        tag_id = tags[0]["id"]
+
+        other = client.post("/api/v1/jobs", json={"title": "Other"}, headers=h).json()["id"]
+        client.post(f"/api/v1/jobs/{other}/tags", json={"name": "remote"}, headers=h)
+        assert client.delete(f"/api/v1/tags/{tag_id}", headers=h).status_code == 200
+        assert client.get(f"/api/v1/jobs/{other}", headers=h).json()["tags"] == []
+
+    def test_similar_jobs(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        postings = {
+            "Backend": "Python Django PostgreSQL Kubernetes developer",
+            "Platform": "Python Django Kubernetes Terraform developer",
+            "Data": "Python Spark Airflow developer",
+            "Chef": "Pastry croissants sourdough",
+        }
+        ids = {}
+        for title, text in postings.items():
+            ids[title] = client.post("/api/v1/jobs", json={"title": title}, headers=h).json()["id"]
+            client.post(f"/api/v1/jobs/{ids[title]}/captures", json={"text_snapshot": text}, headers=h)
+        client.put(f"/api/v1/jobs/{ids['Data']}", json={"status": "SUBMITTED"}, headers=h)
+
+        r = client.get(f"/api/v1/jobs/{ids['Backend']}/similar", headers=h)
+        assert r.status_code == 200
+        results = r.json()["results"]
+        assert [m["title"] for m in results] == ["Platform", "Data"]
+        assert 1 > results[0]["similarity"] > results[1]["similarity"] > 0
+        assert results[0]["shared_keywords"][:2] == ["django", "kubernetes"]
+
+        r = client.get(f"/api/v1/jobs/{ids['Backend']}/similar?status=SUBMITTED", headers=h)
+        assert [m["title"] for m in r.json()["results"]] == ["Data"]
+
+        client.delete(f"/api/v1/jobs/{ids['Platform']}", headers=h)
+        r = client.get(f"/api/v1/jobs/{ids['Backend']}/similar?limit=1", headers=h)
+        assert [m["title"] for m in r.json()["results"]] == ["Data"]
+        assert client.get("/api/v1/jobs/missing/similar", headers=h).status_code == 404
+
+
+def test_similarity_pruning_is_exact(monkeypatch):
+    import math
+    import random
+
+    from app.services import match_service
+    from app.services.match_service import _JobTermIndex
+
+    # Without the postings budget the cut-off is safe, never approximate
+    monkeypatch.setattr(match_service, "_SIMILAR_POSTINGS_BUDGET", 10**9)
+
+    rng = random.Random(3)
+    vocab = [f"t{i}" for i in range(400)]
+    zipf = [1 / (i + 1) for i in range(len(vocab))]
+    rows = sorted(
+        (f"job{j:03d}", term)
+        for j in range(300)
+        for term in set(rng.choices(vocab, weights=zipf, k=40))
+    )
+    df: dict[str, int] = {}
+    for _, term in rows:
+        df[term] = df.get(term, 0) + 1
+    index = _JobTermIndex(rows, df.items(), 300, seq=0)
+
+    def brute(i):
+        idf = index.idf
+        scores = []
+        for j, terms in enumerate(index.terms):
+            dot = sum(idf[t] ** 2 for t in index.terms[i] & terms)
+            if j != i and dot:
+                scores.append((dot / (index.norms[i] * index.norms[j]), j))
+        return sorted(scores, reverse=True)[:5]
+
+    for i in range(0, 300, 7):
+        got = index.similar(i, 5)
+        assert [j for _, j in got] == [j for _, j in brute(i)]
+        assert all(math.isclose(a, b) for (a, _), (b, _) in zip(got, brute(i)))
+
+
+def test_term_index_is_patched_not_rebuilt(client, tmp_vault):
+    import sqlite3
+
+    from app.database import init_db, register_sql_functions
+    from app.services import match_service
+
+    init_db(tmp_vault / "db.sqlite")
+    conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+    conn.execute("PRAGMA foreign_keys=ON")
+    register_sql_functions(conn)
+    now = "2026-01-01T00:00:00Z"
+    with conn:
+        for j in range(60):
+            conn.execute("INSERT INTO jobs (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                         (f"job{j}", f"Job {j}", now, now))
+            conn.executemany("INSERT INTO job_terms (job_id, term) VALUES (?, ?)",
+                             [(f"job{j}", t) for t in ("python", f"skill{j % 10}", f"unique{j}")])
+
+    first = match_service.similar_jobs("job1", limit=5)
+    assert {m["job_id"] for m in first} == {"job11", "job21", "job31", "job41", "job51"}
+    with match_service._job_term_index() as built:
+        # Other matchers are not held up while this one reads the index
+        assert match_service._index_lock.acquire(timeout=1)
+        match_service._index_lock.release()
+
+    with conn:
+        conn.execute("INSERT INTO job_terms (job_id, term) VALUES ('job1', 'unique2')")
+        conn.execute("DELETE FROM jobs WHERE id = 'job11'")
+    results = match_service.similar_jobs("job1", limit=5)
+    assert results[0]["job_id"] == "job2"
+    assert {m["job_id"] for m in results[1:]} == {"job21", "job31", "job41", "job51"}
+    with match_service._job_term_index() as patched:
+        assert patched.changed > 0  # a patched copy, not a fresh build
+        assert "job11" not in patched.positions
+    # The index a query already holds is never modified under it
+    assert "job11" in built.positions
+    assert built.postings["unique2"] == [built.positions["job2"]]
+    conn.close()
+
+
+def test_term_index_rebuilds_in_background(client, tmp_vault, monkeypatch):
+    import sqlite3
+    import threading
+
+    from app.database import init_db
+    from app.services import match_service
+
+    init_db(tmp_vault / "db.sqlite")
+    conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+    now = "2026-01-01T00:00:00Z"
+    with conn:
+        for j in range(40):
+            conn.execute("INSERT INTO jobs (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                         (f"job{j}", f"Job {j}", now, now))
+            conn.executemany("INSERT INTO job_terms (job_id, term) VALUES (?, ?)",
+                             [(f"job{j}", t) for t in ("python", f"skill{j % 4}")])
+    with match_service._job_term_index() as built:
+        pass
+
+    # Hold the next full build until the old index has served a query
+    release = threading.Event()
+    original = match_service._JobTermIndex.__init__
+
+    def slow_init(self, *args, **kwargs):
+        assert release.wait(timeout=30)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(match_service._JobTermIndex, "__init__", slow_init)
+    with conn:  # more than 5% of the jobs change, so a rebuild is due
+        conn.executemany("INSERT INTO job_terms (job_id, term) VALUES (?, ?)",
+                         [(f"job{j}", "golang") for j in range(10)])
+    conn.close()
+
+    results = match_service.similar_jobs("job0", limit=3)
+    assert results[0]["job_id"] in {"job4", "job8"}
+    with match_service._job_term_index() as patched:
+        assert patched.changed > 0
+        assert "golang" in patched.terms[patched.positions["job1"]]
+    assert "golang" not in built.terms[built.positions["job1"]]
+
+    release.set()
+    match_service._builder.join(timeout=30)
+    with match_service._job_term_index() as rebuilt:
+        assert rebuilt is not patched
+        assert rebuilt.changed == 0
@@ -1,3 +1,6 @@
+from app.config import settings
+
+
 class TestSearch:
     def _setup_and_unlock(self, client, tmp_vault):
         client.post("/api/v1/vault/setup", json={
@@ -124,3 +127,101 @@ class TestSearch:
         token = self._setup_and_unlock(client, tmp_vault)
         r = client.get("/api/v1/search?q=test&scope=invalid", headers=self._auth(token))
         assert r.status_code == 422
+
+    def test_search_sees_writes_after_connection_reuse(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/jobs", json={"title": "Astronomer"}, headers=h)
+        assert client.get("/api/v1/search?q=Astronomer", headers=h).json()["total"] == 1
+
+        client.post("/api/v1/jobs", json={"title": "Astronomer II"}, headers=h)
+        assert client.get("/api/v1/search?q=Astronomer", headers=h).json()["total"] == 2
+
+    def test_read_pool_reuses_connections(self, client, tmp_vault):
+        from app.database import read_connection
+        self._setup_and_unlock(client, tmp_vault)
+
+        with read_connection() as first:
+            pass
+        with read_connection() as second:
+            assert second is first
+            assert second.execute("PRAGMA query_only").fetchone()[0] == 1
+
+    def test_scope_all_pages_merged_results(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        for i in range(3):
+            job_id = client.post("/api/v1/jobs", json={"title": f"Geologist {i}"}, headers=h).json()["id"]
+            client.post(f"/api/v1/jobs/{job_id}/captures", json={
+                "text_snapshot": "Geologist wanted " + "filler " * i,
+                "capture_method": "manual_paste",
+            }, headers=h)
+
+        first = client.get("/api/v1/search?q=Geologist&scope=all&per_page=4", headers=h).json()
+        second = client.get("/api/v1/search?q=Geologist&scope=all&per_page=4&page=2", headers=h).json()
+        assert first["total"] == 6
+        assert second["total"] == 6
+        assert len(first["results"]) == 4
+        assert len(second["results"]) == 2
+
+        ranks = [r["rank"] for r in first["results"] + second["results"]]
+        assert ranks == sorted(ranks)
+
+    def test_title_weight_outranks_notes(self, client, tmp_vault, monkeypatch):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/jobs", json={"title": "Zeppelin Pilot"}, headers=h)
+        client.post("/api/v1/jobs", json={"title": "Pilot", "notes": "zeppelin"}, headers=h)
+
+        r = client.get("/api/v1/search?q=zeppelin&scope=jobs", headers=h).json()
+        assert r["results"][0]["job_title"] == "Zeppelin Pilot"
+
+        monkeypatch.setattr(settings, "jobs_fts_weights", [1.0, 1.0, 1.0, 50.0])
+        r = client.get("/api/v1/search?q=zeppelin&scope=jobs", headers=h).json()
+        assert r["results"][0]["job_title"] == "Pilot"
+
+    def test_repeat_search_served_from_cache_until_data_changes(self, client, tmp_vault, monkeypatch):
+        from app.services import search_service
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        client.post("/api/v1/jobs", json={"title": "Botanist"}, headers=h)
+
+        calls = []
+        page_sql = search_service._page_sql
+        monkeypatch.setattr(search_service, "_page_sql", lambda scope: calls.append(scope) or page_sql(scope))
+
+        client.get("/api/v1/search?q=Botanist", headers=h)
+        client.get("/api/v1/search?q=Botanist", headers=h)
+        assert len(calls) == 1
+
+        client.post("/api/v1/jobs", json={"title": "Botanist II"}, headers=h)
+        r = client.get("/api/v1/search?q=Botanist", headers=h).json()
+        assert len(calls) == 2
+        assert r["total"] == 2
+
+    def test_cached_pages_are_private_copies_and_follow_capture_texts(self, client, tmp_vault):
+        import sqlite3
+        from app.database import register_sql_functions
+        from app.services.search_service import search_fts
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = client.post("/api/v1/jobs", json={"title": "Curator"}, headers=h).json()["id"]
+        client.post(f"/api/v1/jobs/{job_id}/captures", json={
+            "url": "https://museum.example/jobs/1", "page_title": "Museum",
+            "text_snapshot": "Herbarium specimens", "capture_method": "manual_paste",
+        }, headers=h)
+
+        results, _ = search_fts("Herbarium")
+        results[0]["snippet"] = "tampered"
+        results.clear()
+        results, total = search_fts("Herbarium")
+        assert total == 1
+        assert results[0]["snippet"] != "tampered"
+
+        # Dropping only the stored text must not leave a stale page behind
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        register_sql_functions(conn)
+        with conn:
+            conn.execute("DELETE FROM capture_texts")
+        conn.close()
+        assert search_fts("Herbarium") == ([], 0)
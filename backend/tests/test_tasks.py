@@ -0,0 +1,209 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.config import settings
+from app.services import task_service
+from app.services.task_service import TaskQueue, new_task, task_handler, task_queue
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Register test-only handlers without leaking them into other tests."""
+    monkeypatch.setattr(task_service, "_handlers", dict(task_service._handlers))
+    return task_service._handlers
+
+
+class TestTasks:
+    def _setup_and_unlock(self, client, tmp_vault):
+        client.post("/api/v1/vault/setup", json={
+            "passphrase": "test-passphrase-123",
+            "vault_path": str(tmp_vault),
+        })
+        r = client.post("/api/v1/vault/unlock", json={"passphrase": "test-passphrase-123"})
+        return r.json()["token"]
+
+    def _auth(self, token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def _enqueue(self, test_db, *tasks):
+        ids = [t.id for t in tasks]
+        with test_db() as db:
+            db.add_all(tasks)
+            db.commit()
+        return ids
+
+    def test_background_verify(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        h = self._auth(token)
+        job_id = client.post("/api/v1/jobs", json={"title": "Test Job"}, headers=h).json()["id"]
+        doc = client.post(
+            f"/api/v1/jobs/{job_id}/documents",
+            files={"file": ("cv.pdf", b"some bytes", "application/pdf")},
+            data={"doc_type": "cv"},
+            headers=h,
+        ).json()
+
+        r = client.post(f"/api/v1/jobs/{job_id}/documents/{doc['id']}/verify", headers=h)
+        assert r.status_code == 202
+        task_id = r.json()["task_id"]
+        assert task_queue.wait_idle(timeout=30)
+
+        task = client.get(f"/api/v1/tasks/{task_id}", headers=h).json()
+        assert task["status"] == "succeeded"
+        assert task["attempts"] == 1
+        assert task["result"]["verified"] is True
+        assert task["result"]["stored_hash"] == doc["file_hash"]
+
+        # GET stays read-only and answers inline
+        r = client.get(f"/api/v1/jobs/{job_id}/documents/{doc['id']}/verify?background=true", headers=h)
+        assert r.status_code == 200
+        assert r.json()["verified"] is True
+        conn = sqlite3.connect(str(tmp_vault / "db.sqlite"))
+        assert conn.execute("SELECT COUNT(*) FROM tasks WHERE kind = 'verify_document'").fetchone()[0] == 1
+        conn.close()
+
+    def test_failed_attempts_are_retried(self, client, tmp_vault, test_db, handlers, monkeypatch):
+        token = self._setup_and_unlock(client, tmp_vault)
+        monkeypatch.setattr(settings, "task_retry_backoff_seconds", 0)
+        calls = []
+
+        @task_handler("test_flaky")
+        def flaky(ctx):
+            calls.append(ctx.attempt)
+            if ctx.attempt < 2:
+                raise RuntimeError("transient")
+            return {"ok": True}
+
+        (task_id,) = self._enqueue(test_db, new_task("test_flaky", {}))
+        task_queue.notify()
+        assert task_queue.wait_idle(timeout=30)
+
+        data = client.get(f"/api/v1/tasks/{task_id}", headers=self._auth(token)).json()
+        assert calls == [1, 2]
+        assert data["status"] == "succeeded"
+        assert data["attempts"] == 2
+        assert data["result"] == {"ok": True}
+
+    def test_gives_up_after_max_attempts(self, client, tmp_vault, test_db, handlers, monkeypatch):
+        token = self._setup_and_unlock(client, tmp_vault)
+        monkeypatch.setattr(settings, "task_retry_backoff_seconds", 0)
+
+        @task_handler("test_broken")
+        def broken(ctx):
+            raise RuntimeError("always")
+
+        task_id, unknown_id = self._enqueue(
+            test_db, new_task("test_broken", {}, max_attempts=2), new_task("test_unregistered", {}),
+        )
+        task_queue.notify()
+        assert task_queue.wait_idle(timeout=30)
+
+        data = client.get(f"/api/v1/tasks/{task_id}", headers=self._auth(token)).json()
+        assert data["status"] == "failed"
+        assert data["attempts"] == 2
+        assert "always" in data["error"]
+        # Unknown kinds are not retried
+        data = client.get(f"/api/v1/tasks/{unknown_id}", headers=self._auth(token)).json()
+        assert data["status"] == "failed"
+        assert data["attempts"] == 1
+
+    def test_claims_by_priority_then_age(self, client, tmp_vault, test_db, handlers):
+        self._setup_and_unlock(client, tmp_vault)
+        task_handler("test_noop")(lambda ctx: None)
+        low, high, later = (new_task("test_noop", {}, priority=p) for p in (0, 10, 0))
+        later.created_at = "9999-01-01T00:00:00Z"
+        later_id, low_id, high_id = self._enqueue(test_db, later, low, high)
+
+        queue = TaskQueue()
+        queue._db_path = settings.db_path
+        conn = queue._connect()
+        try:
+            claimed = [queue._claim(conn, ["io"])["id"] for _ in range(3)]
+            assert queue._claim(conn, ["io"]) is None
+            assert queue._claim(conn, ["cpu"]) is None
+        finally:
+            conn.close()
+        assert claimed == [high_id, low_id, later_id]
+
+    def test_interrupted_tasks_resume_on_start(self, client, tmp_vault, test_db, handlers):
+        token = self._setup_and_unlock(client, tmp_vault)
+        task_handler("test_noop")(lambda ctx: {"attempt": ctx.attempt})
+        task = new_task("test_noop", {})
+        task.status = "running"
+        task.attempts = 1
+        (task_id,) = self._enqueue(test_db, task)
+
+        task_queue.start()
+        assert task_queue.wait_idle(timeout=30)
+
+        data = client.get(f"/api/v1/tasks/{task_id}", headers=self._auth(token)).json()
+        assert data["status"] == "succeeded"
+        assert data["result"] == {"attempt": 2}
+
+    def test_concurrent_notify_starts_one_dispatcher(self, client, tmp_vault, test_db):
+        import threading
+        self._setup_and_unlock(client, tmp_vault)
+
+        def dispatchers():
+            return {t for t in threading.enumerate() if t.name == "task-dispatcher"}
+
+        def notify_together(queue):
+            barrier = threading.Barrier(8)
+            threads = [threading.Thread(target=lambda: (barrier.wait(), queue.notify())) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        before = dispatchers()
+        queue = TaskQueue()
+        stop = queue.stop
+        # Widen the window between the running check and the spawn
+        queue.stop = lambda: (time.sleep(0.05), stop())
+        try:
+            notify_together(queue)
+            assert len(dispatchers() - before) == 1
+
+            task = new_task("test_noop", {})
+            task.status = "running"
+            (task_id,) = self._enqueue(test_db, task)
+            notify_together(queue)
+            assert len(dispatchers() - before) == 1
+            # Left to the dispatcher that is already running it
+            conn = sqlite3.connect(str(settings.db_path))
+            try:
+                status = conn.execute("SELECT status FROM tasks WHERE id = ?", (task_id,)).fetchone()[0]
+            finally:
+                conn.close()
+            assert status == "running"
+        finally:
+            queue.stop()
+
+    def test_old_succeeded_tasks_are_pruned(self, client, tmp_vault, test_db):
+        self._setup_and_unlock(client, tmp_vault)
+        old_done, new_done, old_failed = (new_task("test_noop", {}) for _ in range(3))
+        old_done.status = "succeeded"
+        old_done.finished_at = "2000-01-01T00:00:00Z"
+        new_done.status = "succeeded"
+        new_done.finished_at = "9999-01-01T00:00:00Z"
+        old_failed.status = "failed"
+        old_failed.finished_at = "2000-01-01T00:00:00Z"
+        old_id, new_id, failed_id = self._enqueue(test_db, old_done, new_done, old_failed)
+
+        queue = TaskQueue()
+        queue._db_path = settings.db_path
+        conn = queue._connect()
+        try:
+            assert queue._prune(conn) == 1
+            remaining = {row["id"] for row in conn.execute("SELECT id FROM tasks")}
+        finally:
+            conn.close()
+        assert old_id not in remaining
+        assert {new_id, failed_id} <= remaining
+
+    def test_get_missing_task(self, client, tmp_vault):
+        token = self._setup_and_unlock(client, tmp_vault)
+        r = client.get("/api/v1/tasks/nope", headers=self._auth(token))
+        assert r.status_code == 404
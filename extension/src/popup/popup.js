@@ -140,6 +140,16 @@ async function showUnlocked() {
           hint.style.display = 'block';
         }
       }
+
+      // Cheap check before the user fills in the form and sends the full page
+      if (pageData.url) {
+        const tokenRes = await browserAPI.runtime.sendMessage({ action: 'getToken' });
+        const token = tokenRes && tokenRes.token ? tokenRes.token : null;
+        const lookup = await api('GET', '/captures/lookup?url=' + encodeURIComponent(pageData.url), token);
+        if (lookup.ok && lookup.body.job) {
+          showResult('error', 'Already in vault: "' + lookup.body.job.title + '"');
+        }
+      }
     }
   } catch (e) {
     document.getElementById('preview-title').textContent = 'Could not extract page data';
@@ -33,7 +33,8 @@ export function JobListPage() {
         page,
       });
       setJobs(res.jobs);
-      setTotal(res.total);
+      // Exact totals are the default, so total is only null if total=none was sent.
+      setTotal(res.total ?? res.jobs.length);
     } catch { /* ignore */ }
     setLoading(false);
   };
@@ -35,9 +35,11 @@ export interface Job {
 
 export interface JobListResponse {
   jobs: Job[];
-  total: number;
+  total: number | null;  // null when requested with total=none
   page: number;
   per_page: number;
+  next_cursor: string | null;
+  total_is_estimate: boolean;
 }
 
 export interface Capture {
@@ -48,6 +50,7 @@ export interface Capture {
   text_snapshot: string | null;
   html_path: string | null;
   pdf_path: string | null;
+  pdf_status?: "pending" | "ready" | "failed" | null;
   capture_method: string;
   captured_at: string;
 }